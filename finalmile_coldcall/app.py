@@ -1,10 +1,22 @@
 """Main Flask application for Reddit outreach dashboard."""
 
+import atexit
+import json
 import os
-from flask import Flask, render_template, request, redirect, url_for, flash, jsonify
-from models import db
+import time
+from datetime import datetime
+from typing import Optional
+import click
+import gazetteer
+from flask import Flask, Response, render_template, request, redirect, url_for, flash, jsonify
+from event_hub import get_event_hub
+from listing_archive import ListingArchive
+from models import db, create_missing_columns, create_missing_indexes, create_search_index
+from storage import init_storage
 from config import config
-from services.outreach_service import OutreachService
+from services.outreach_service import OutreachService, serialize_post
+from services.job_service import JobService, RefreshWorker
+from services.status_buffer import StatusWriteBuffer
 
 
 def create_app(config_name: str = None) -> Flask:
@@ -24,104 +36,279 @@ def create_app(config_name: str = None) -> Flask:
     app.config.from_object(config[config_name])
     
     # Initialize extensions
-    db.init_app(app)
+    init_storage(app)
     
     # Initialize services
     outreach_service = OutreachService(app.config)
+    job_service = JobService(outreach_service)
+    refresh_worker = RefreshWorker(app, job_service, app.config.get('REFRESH_WORKER_POLL_SECONDS', 5))
+    app.extensions['refresh_worker'] = refresh_worker
+    status_buffer = StatusWriteBuffer(
+        app, outreach_service,
+        flush_interval=app.config.get('AUTO_MARK_FLUSH_MS', 250) / 1000,
+        max_batch=app.config.get('AUTO_MARK_FLUSH_MAX_EVENTS', 50)
+    )
+    app.extensions['status_buffer'] = status_buffer
+    # Write out buffered clicks before the interpreter exits
+    atexit.register(status_buffer.stop)
     
     # Register routes
-    register_routes(app, outreach_service)
+    register_routes(app, outreach_service, job_service, refresh_worker, status_buffer)
     
     # Register CLI commands
-    register_cli_commands(app, outreach_service)
+    register_cli_commands(app, outreach_service, job_service)
     
     return app
 
 
-def register_routes(app: Flask, outreach_service: OutreachService) -> None:
+def register_routes(
+    app: Flask, outreach_service: OutreachService, job_service: JobService,
+    refresh_worker: RefreshWorker, status_buffer: StatusWriteBuffer
+) -> None:
     """Register all application routes."""
     
+    def enqueue_refresh(backfill: bool = False) -> Optional[int]:
+        """
+        Queue a refresh (or join the one in flight) and flash what happened.
+        
+        Returns:
+            Id of the job the dashboard should follow, or None if a recent
+            refresh was reused and there is nothing to wait for
+        """
+        job, created = job_service.enqueue_refresh(backfill=backfill)
+        if created:
+            refresh_worker.wake()
+            flash('Refresh started. New posts will appear when it finishes.', 'info')
+        elif job.status in ('queued', 'running'):
+            flash('A refresh is already running. New posts will appear when it finishes.', 'info')
+        else:
+            flash(f'Posts were refreshed at {job.finished_at:%H:%M:%S} UTC; showing those results.', 'info')
+            return None
+        return job.id
+    
     @app.route('/')
     def dashboard():
         """Main dashboard showing posts and outreach status."""
-        page = request.args.get('page', 1, type=int)
         status_filter = request.args.get('status', 'all')
+        search_query = request.args.get('q', '').strip()
+        state = request.args.get('state', '').strip().upper()
+        city = request.args.get('city', '').strip()
+        after = request.args.get('after')
+        before = request.args.get('before')
         auto_refresh = request.args.get('auto_refresh', 'false')
+        refresh_job = request.args.get('refresh_job', type=int)
         
-        # Auto-refresh posts on first load
+        # Auto-refresh posts on first load, in the background
         if auto_refresh == 'true':
             try:
-                result = outreach_service.refresh_posts()
-                flash(
-                    f'Auto-refreshed: Added {result["new_posts"]} new posts, '
-                    f'updated {result["updated_posts"]}.', 
-                    'success'
-                )
+                refresh_job = enqueue_refresh()
             except Exception as e:
                 flash(f'Auto-refresh error: {str(e)}', 'error')
         
-        posts = outreach_service.get_posts(page, status_filter, per_page=app.config.get('POSTS_PER_PAGE', 20))
+        per_page = app.config.get('POSTS_PER_PAGE', 20)
+        try:
+            if search_query:
+                # Search results page by offset; the cursors are offsets
+                offset = int(after or before or 0)
+                posts = outreach_service.search_posts(
+                    search_query, status_filter, per_page, offset, state=state, city=city
+                )
+            else:
+                posts = outreach_service.get_posts_page(
+                    status_filter, per_page, after=after, before=before, state=state, city=city
+                )
+        except ValueError as e:
+            flash(str(e), 'error')
+            if search_query:
+                posts = outreach_service.search_posts(search_query, status_filter, per_page, state=state, city=city)
+            else:
+                posts = outreach_service.get_posts_page(status_filter, per_page, state=state, city=city)
+        facets = outreach_service.get_location_facets(status_filter, state or None)
         message_content = outreach_service.get_active_message_template()
+        # Search stops counting at SEARCH_COUNT_LIMIT
+        total_label = posts.total
+        if search_query and posts.total >= app.config.get('SEARCH_COUNT_LIMIT', 10000):
+            total_label = f'{posts.total}+'
         
         return render_template(
             'dashboard.html', 
             posts=posts, 
+            total_label=total_label,
             message_content=message_content, 
-            status_filter=status_filter
+            status_filter=status_filter,
+            search_query=search_query,
+            state=state,
+            city=city,
+            facets=facets,
+            # Query arguments every tab and page link keeps
+            filter_args={key: value for key, value in (('q', search_query), ('state', state), ('city', city)) if value},
+            refresh_job=refresh_job,
+            events_url=url_for('events')
         )
     
     @app.route('/refresh_posts')
     def refresh_posts():
-        """Fetch new posts from Reddit and update database."""
+        """Queue a background refresh of posts from Reddit."""
+        backfill = request.args.get('backfill', 'false') == 'true'
         try:
-            result = outreach_service.refresh_posts()
-            flash(
-                f'Successfully added {result["new_posts"]} new posts and '
-                f'updated {result["updated_posts"]} existing posts.', 
-                'success'
-            )
+            job_id = enqueue_refresh(backfill=backfill)
+            return redirect(url_for('dashboard', refresh_job=job_id))
         except Exception as e:
             flash(f'Error refreshing posts: {str(e)}', 'error')
         
         return redirect(url_for('dashboard'))
     
+    @app.route('/jobs/<int:job_id>')
+    def job_status(job_id: int):
+        """Report progress and result of a refresh job."""
+        try:
+            job = job_service.get_job(job_id)
+            if not job:
+                return jsonify({'error': f'Job {job_id} not found'}), 404
+            return jsonify(job.to_dict())
+        except Exception as e:
+            return jsonify({'error': str(e)}), 500
+    
+    def respond(success: bool, message: str, category: str):
+        """Answer fetch() calls with JSON and page navigations with a flash and redirect."""
+        if request.accept_mimetypes.best == 'application/json':
+            return jsonify({'success': success, 'message': message})
+        flash(message, category)
+        return redirect(url_for('dashboard'))
+    
     @app.route('/mark_sent/<username>')
     def mark_sent(username: str):
         """Mark a user as having been contacted."""
         try:
             if outreach_service.mark_as_sent(username):
-                flash(f'Marked {username} as sent.', 'success')
-            else:
-                flash(f'User {username} not found.', 'error')
+                return respond(True, f'Marked {username} as sent.', 'success')
+            return respond(False, f'User {username} not found.', 'error')
         except Exception as e:
-            flash(f'Error marking as sent: {str(e)}', 'error')
-        
-        return redirect(url_for('dashboard'))
+            return respond(False, f'Error marking as sent: {str(e)}', 'error')
     
     @app.route('/mark_not_sent/<username>')
     def mark_not_sent(username: str):
         """Mark a user as not sent (undo)."""
         try:
+            status_buffer.discard([username])
             if outreach_service.mark_as_not_sent(username):
-                flash(f'Marked {username} as not sent.', 'info')
-            else:
-                flash(f'User {username} not found.', 'error')
+                return respond(True, f'Marked {username} as not sent.', 'info')
+            return respond(False, f'User {username} not found.', 'error')
         except Exception as e:
-            flash(f'Error marking as not sent: {str(e)}', 'error')
-        
-        return redirect(url_for('dashboard'))
+            return respond(False, f'Error marking as not sent: {str(e)}', 'error')
+    
+    def set_status_batch(status: str):
+        """Apply a status to the usernames posted as JSON or form data."""
+        payload = request.get_json(silent=True) or {}
+        usernames = payload.get('usernames') if payload else request.form.getlist('usernames')
+        if not isinstance(usernames, list) or not all(isinstance(name, str) for name in usernames):
+            return jsonify({'success': False, 'message': 'usernames must be a list of strings'}), 400
+        max_batch = app.config.get('MAX_BATCH_SIZE', 1000)
+        if len(usernames) > max_batch:
+            return jsonify({'success': False, 'message': f'At most {max_batch} usernames per request'}), 400
+        try:
+            if status == 'Not Sent':
+                status_buffer.discard(usernames)
+            result = outreach_service.set_status_many(usernames, status)
+            return jsonify({
+                'success': True,
+                'message': f'Marked {len(result["updated"])} users as {status.lower()}.',
+                **result
+            })
+        except ValueError as e:
+            return jsonify({'success': False, 'message': str(e)}), 400
+        except Exception as e:
+            return jsonify({'success': False, 'message': f'Error: {str(e)}'}), 500
+    
+    @app.route('/mark_sent_batch', methods=['POST'])
+    def mark_sent_batch():
+        """Mark many users as contacted in one transaction."""
+        return set_status_batch('Sent')
+    
+    @app.route('/mark_not_sent_batch', methods=['POST'])
+    def mark_not_sent_batch():
+        """Mark many users as not sent (undo) in one transaction."""
+        return set_status_batch('Not Sent')
     
     @app.route('/auto_mark_sent/<username>')
     def auto_mark_sent(username: str):
-        """Automatically mark a user as sent when profile link is clicked."""
+        """
+        Automatically mark a user as sent when profile link is clicked.
+        
+        The click is queued in the write-behind buffer and acknowledged
+        straight away; it reaches the database with the next batched flush.
+        """
         try:
-            if outreach_service.mark_as_sent(username):
-                return jsonify({'success': True, 'message': f'Marked {username} as sent.'})
-            else:
-                return jsonify({'success': False, 'message': f'User {username} not found.'})
+            status_buffer.add(username)
+            return jsonify({'success': True, 'queued': True, 'message': f'Marked {username} as sent.'}), 202
         except Exception as e:
             return jsonify({'success': False, 'message': f'Error: {str(e)}'}), 500
     
+    @app.route('/events')
+    def events():
+        """Stream live stats, new posts and status changes as Server-Sent Events."""
+        hub = get_event_hub()
+        subscription = hub.subscribe(request.headers.get('Last-Event-ID', type=int))
+        
+        def stream():
+            try:
+                yield 'retry: 3000\n\n'
+                while True:
+                    event = subscription.get(timeout=15)
+                    if event is None:
+                        # Comment line keeps proxies from closing an idle stream
+                        yield ': keep-alive\n\n'
+                        continue
+                    event_id, name, data = event
+                    id_line = f'id: {event_id}\n' if event_id else ''
+                    yield f'{id_line}event: {name}\ndata: {json.dumps(data)}\n\n'
+            finally:
+                hub.unsubscribe(subscription)
+        
+        return Response(
+            stream(),
+            mimetype='text/event-stream',
+            headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+        )
+    
+    @app.route('/search')
+    def search():
+        """Search post titles and locations; JSON results, best matches first."""
+        search_query = request.args.get('q', '').strip()
+        status_filter = request.args.get('status', 'all')
+        limit = request.args.get('limit', app.config.get('POSTS_PER_PAGE', 20), type=int)
+        offset = request.args.get('offset', 0, type=int)
+        state = request.args.get('state')
+        city = request.args.get('city')
+        if not search_query:
+            return jsonify({'error': 'Missing search query (q)'}), 400
+        max_limit = app.config.get('SEARCH_MAX_LIMIT', 1000)
+        if not 1 <= limit <= max_limit:
+            return jsonify({'error': f'limit must be between 1 and {max_limit}'}), 400
+        try:
+            page = outreach_service.search_posts(search_query, status_filter, limit, offset, state=state, city=city)
+            return jsonify({
+                'query': search_query,
+                'status': status_filter,
+                'total': page.total,
+                'total_capped': page.total >= app.config.get('SEARCH_COUNT_LIMIT', 10000),
+                'offset': page.start - 1,
+                'next_offset': int(page.next_cursor) if page.next_cursor else None,
+                'posts': [serialize_post(post) for post in page.items],
+            })
+        except Exception as e:
+            return jsonify({'error': str(e)}), 500
+    
+    @app.route('/facets')
+    def facets():
+        """Post counts per state and city for the location filters (JSON)."""
+        try:
+            return jsonify(outreach_service.get_location_facets(
+                request.args.get('status', 'all'), request.args.get('state')
+            ))
+        except Exception as e:
+            return jsonify({'error': str(e)}), 500
+    
     @app.route('/stats')
     def stats():
         """Show outreach statistics."""
@@ -130,24 +317,174 @@ def register_routes(app: Flask, outreach_service: OutreachService) -> None:
             return jsonify(statistics)
         except Exception as e:
             return jsonify({'error': str(e)}), 500
+    
+    @app.route('/location_cache_stats')
+    def location_cache_stats():
+        """Show location parse cache hit/miss counters."""
+        try:
+            return jsonify(outreach_service.reddit_service.get_location_cache_stats())
+        except Exception as e:
+            return jsonify({'error': str(e)}), 500
+    
+    @app.route('/auto_mark_stats')
+    def auto_mark_stats():
+        """Show pending and flushed counters of the auto-mark write buffer."""
+        try:
+            return jsonify(status_buffer.stats())
+        except Exception as e:
+            return jsonify({'error': str(e)}), 500
+    
+    @app.route('/fetch_scheduler_stats')
+    def fetch_scheduler_stats():
+        """Show Reddit request budget, queue and throttling counters."""
+        try:
+            return jsonify(outreach_service.reddit_service.get_fetch_scheduler_stats())
+        except Exception as e:
+            return jsonify({'error': str(e)}), 500
+    
+    @app.route('/known_posts_stats')
+    def known_posts_stats():
+        """Show size and hit rate of the already-stored posts filter."""
+        try:
+            return jsonify(outreach_service.get_known_posts_stats())
+        except Exception as e:
+            return jsonify({'error': str(e)}), 500
+    
+    @app.route('/http_cache_stats')
+    def http_cache_stats():
+        """Show listing response cache hit rate and size."""
+        try:
+            return jsonify(outreach_service.reddit_service.get_http_cache_stats())
+        except Exception as e:
+            return jsonify({'error': str(e)}), 500
 
 
-def register_cli_commands(app: Flask, outreach_service: OutreachService) -> None:
+def register_cli_commands(app: Flask, outreach_service: OutreachService, job_service: JobService) -> None:
     """Register CLI commands."""
     
     @app.cli.command()
     def init_db():
         """Initialize the database."""
         db.create_all()
+        create_missing_columns()
+        create_missing_indexes()
+        create_search_index()
         outreach_service.create_default_template()
+        outreach_service.link_locations()
+        outreach_service.reconcile_counters()
         print('Database initialized successfully!')
     
     @app.cli.command()
-    def refresh_data():
-        """Refresh data from Reddit."""
+    def reconcile_stats():
+        """Recompute the statistics counters from the posts table."""
+        try:
+            statistics = outreach_service.reconcile_counters()
+            print(
+                f'Counters rebuilt: {statistics["total_posts"]} posts, {statistics["sent_posts"]} sent, '
+                f'{statistics["unique_locations"]} locations'
+            )
+        except Exception as e:
+            print(f'Error: {str(e)}')
+    
+    @app.cli.command()
+    @click.option('--backfill', is_flag=True, help='Walk past already-seen posts to pick up older ones.')
+    def refresh_data(backfill):
+        """Refresh data from Reddit (runs the refresh job inline)."""
+        try:
+            requested_at = datetime.utcnow()
+            job = job_service.run_refresh_inline(backfill=backfill)
+            if job.created_at < requested_at:
+                print(f'Another refresh was already running or just finished; sharing job {job.id}.')
+            if job.status != 'succeeded':
+                print(f'Error: {job.error}')
+                return
+            result = job.result
+            print(
+                f'Job {job.id}: added {result["new_posts"]} new posts, updated {result["updated_posts"]} '
+                f'({result["pages_fetched"]} pages fetched)'
+            )
+        except Exception as e:
+            print(f'Error: {str(e)}')
+    
+    @app.cli.command()
+    @click.option('--all', 'relink', is_flag=True, help='Re-normalize every post, not only unlinked ones.')
+    def link_locations(relink):
+        """Point posts at their normalized (city, state) location row."""
+        try:
+            result = outreach_service.link_locations(relink=relink, progress=lambda stage: click.echo(stage, err=True))
+            click.echo(f'Scanned {result["scanned"]} posts: {result["linked"]} linked')
+        except Exception as e:
+            print(f'Error: {str(e)}')
+    
+    @app.cli.command()
+    @click.option('--since', type=click.DateTime(formats=['%Y-%m-%d']), help='First UTC day to replay.')
+    @click.option('--until', type=click.DateTime(formats=['%Y-%m-%d']), help='Last UTC day to replay.')
+    @click.option('--subreddit', 'subreddits', multiple=True, help='Only replay this subreddit (repeatable).')
+    @click.option('--archive', 'archive_path', help='Archive directory (defaults to LISTING_ARCHIVE_PATH).')
+    def replay_archive(since, until, subreddits, archive_path):
+        """Re-process archived Reddit listing pages without touching the network."""
+        try:
+            started = time.perf_counter()
+            result = outreach_service.replay_archive(
+                start=since.date() if since else None,
+                end=until.date() if until else None,
+                subreddits=list(subreddits) or None,
+                archive=ListingArchive(archive_path) if archive_path else None,
+                progress=print
+            )
+            elapsed = time.perf_counter() - started
+            print(
+                f'Replayed {result["pages"]} pages in {elapsed:.1f}s: {result["matched_posts"]} matching posts, '
+                f'{result["new_posts"]} new, {result["updated_posts"]} updated'
+            )
+        except Exception as e:
+            print(f'Error: {str(e)}')
+    
+    @app.cli.command()
+    @click.option('--workers', type=int, help='Parser processes (defaults to the CPU count).')
+    @click.option('--chunk-size', type=int, default=2000, show_default=True, help='Rows read and parsed per chunk.')
+    @click.option('--dry-run', is_flag=True, help='Print the location changes as a diff without writing them.')
+    def reparse_locations(workers, chunk_size, dry_run):
+        """Re-derive every post's location from its title with the current parser."""
+        def show_change(username, title, old, new):
+            click.echo(f'@@ u/{username}: {title}')
+            click.echo(f'- {old}')
+            click.echo(f'+ {new}')
+        
+        try:
+            started = time.perf_counter()
+            result = outreach_service.reparse_locations(
+                workers=workers,
+                chunk_size=chunk_size,
+                dry_run=dry_run,
+                on_change=show_change if dry_run else None,
+                progress=lambda stage: click.echo(stage, err=True)
+            )
+            elapsed = time.perf_counter() - started
+            verb = 'would change' if dry_run else 'updated'
+            click.echo(
+                f'Scanned {result["scanned"]} posts in {elapsed:.1f}s '
+                f'({result["scanned"] / elapsed if elapsed else 0:,.0f}/s): {result["changed"]} {verb}',
+                err=True
+            )
+        except Exception as e:
+            print(f'Error: {str(e)}')
+    
+    @app.cli.command()
+    @click.argument('source', type=click.Path(exists=True, dir_okay=False))
+    @click.option('--output', help='Index file to write (defaults to GAZETTEER_PATH).')
+    def build_gazetteer(source, output):
+        """Compile a Census places Gazetteer file (.txt or .zip) into the lookup index."""
+        output = output or app.config['GAZETTEER_PATH']
         try:
-            result = outreach_service.refresh_posts()
-            print(f'Added {result["new_posts"]} new posts, updated {result["updated_posts"]}')
+            started = time.perf_counter()
+            os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+            result = gazetteer.build_gazetteer(gazetteer.read_census_places(source), output)
+            click.echo(
+                f'Wrote {result["names"]} place names ({result["ambiguous"]} in several states, '
+                f'{result["bytes"] / 2 ** 20:.1f} MiB) to {output} in {time.perf_counter() - started:.1f}s'
+            )
+            click.echo('Run `flask reparse-locations` and `flask link-locations --all` to apply it to stored posts.')
         except Exception as e:
             print(f'Error: {str(e)}')
 
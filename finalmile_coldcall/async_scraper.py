@@ -0,0 +1,167 @@
+"""Concurrent multi-subreddit scraper on a shared asyncio HTTP client.
+
+Every listing is walked by a ``scrape_reddit.ListingWalk``, so matching,
+location parsing and high-water marks behave exactly like the blocking
+scraper. Pages within one listing are still fetched in order (each needs the
+previous ``after`` token), but all listings are walked at the same time over
+one keep-alive connection pool, so a refresh takes about as long as the
+slowest subreddit rather than the sum of all of them. Requests still draw on
+the shared ``FetchScheduler`` budget and are retried by it. Response cache
+reads and writes (blocking SQLite calls) and archiving of fetched pages
+(gzip and a file append) run in worker threads and never stall the other
+walks.
+"""
+
+import asyncio
+from typing import Awaitable, Callable, Dict, Iterable, List, NamedTuple, Optional, Tuple
+from urllib.parse import urlsplit
+
+import httpx
+
+from constants import REDDIT_BASE_URL, REQUEST_HEADERS
+from fetch_scheduler import FetchScheduler, get_scheduler
+from listing_archive import archive_page
+from listing_json import parse_listing
+from response_cache import lookup, settle
+from phrase_matcher import WeightedPhrases
+from scrape_reddit import HighWaterMark, ListingScan, ListingWalk
+
+# Called after every consumed page, e.g. to stream its matches downstream
+PageCallback = Callable[[ListingWalk], Awaitable[None]]
+
+
+class ListingTarget(NamedTuple):
+    """A subreddit listing and the weighted phrases that make one of its posts a lead."""
+
+    subreddit: str
+    target_phrases: WeightedPhrases = (("GOT THE KEY", 1.0),)
+    sort: str = "new"
+    min_score: float = 1.0
+
+
+class HostLimiter:
+    """Hand out one semaphore per host to cap concurrent requests to it."""
+
+    def __init__(self, per_host: int):
+        self.per_host = per_host
+        self._semaphores: Dict[str, asyncio.Semaphore] = {}
+
+    def __call__(self, url: str) -> asyncio.Semaphore:
+        host = urlsplit(url).netloc
+        semaphore = self._semaphores.get(host)
+        if semaphore is None:
+            semaphore = self._semaphores[host] = asyncio.Semaphore(self.per_host)
+        return semaphore
+
+
+async def _walk_listing(
+    client: httpx.AsyncClient, limiter: HostLimiter, scheduler: FetchScheduler, walk: ListingWalk,
+    on_page: Optional[PageCallback] = None
+) -> ListingScan:
+    """Drive one listing walk to completion."""
+
+    async def send(params, headers):
+        async with limiter(walk.url):
+            return await client.get(walk.url, params=params, headers=headers)
+
+    while not walk.done:
+        try:
+            params = walk.next_params()
+            cached = await asyncio.to_thread(lookup, walk.url, params)
+            if cached is not None and cached.fresh:
+                body = cached.body
+            else:
+                headers = cached.validators() if cached is not None else {}
+                response = await scheduler.run_async(lambda: send(params, headers), walk.subreddit_name)
+                body = await asyncio.to_thread(settle, walk.subreddit_name, walk.url, params, response, cached)
+                if response.status_code != 304:
+                    await asyncio.to_thread(archive_page, walk.subreddit_name, walk.sort, params.get("after"), body)
+            walk.consume(parse_listing(body))
+            scheduler.note_page(walk.subreddit_name, walk.fresh_ratio)
+        except Exception as e:
+            walk.fail(e)
+            continue
+        if on_page:
+            await on_page(walk)
+    return walk.result()
+
+
+async def scan_listings_async(
+    targets: Iterable[ListingTarget],
+    max_posts: int = 50,
+    high_water_marks: Optional[Dict[Tuple[str, str], HighWaterMark]] = None,
+    backfill: bool = False,
+    max_connections: int = 10,
+    per_host_limit: int = 4,
+    timeout: float = 10.0,
+    base_url: str = REDDIT_BASE_URL,
+    on_page: Optional[PageCallback] = None,
+    defer_locations: bool = False,
+) -> Dict[ListingTarget, ListingScan]:
+    """
+    Walk several subreddit listings concurrently.
+
+    Args:
+        targets: Listings to walk.
+        max_posts: Maximum number of matching posts per listing.
+        high_water_marks: Previous marks keyed by (subreddit, sort).
+        backfill: Keep walking past the high-water marks.
+        max_connections: Size of the shared connection pool.
+        per_host_limit: Maximum concurrent requests to one host.
+        timeout: Per-request timeout in seconds.
+        base_url: Root URL serving the listings.
+        on_page: Awaited with the walk after each page it consumes; a slow
+            callback holds back that listing's next request (backpressure).
+        defer_locations: Leave locations as None for a later stage to parse.
+
+    Returns:
+        ListingScan for every target, in the order given.
+    """
+    targets = list(targets)
+    marks = high_water_marks or {}
+    limiter = HostLimiter(per_host_limit)
+    scheduler = get_scheduler()
+    limits = httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections)
+    walks = [
+        ListingWalk(
+            target.subreddit,
+            target.target_phrases,
+            max_posts,
+            target.sort,
+            marks.get((target.subreddit, target.sort)),
+            backfill,
+            base_url,
+            defer_locations,
+            target.min_score,
+        )
+        for target in targets
+    ]
+    async with httpx.AsyncClient(
+        headers=REQUEST_HEADERS, limits=limits, timeout=timeout, follow_redirects=True
+    ) as client:
+        scans = await asyncio.gather(*(_walk_listing(client, limiter, scheduler, walk, on_page) for walk in walks))
+    return dict(zip(targets, scans))
+
+
+def scan_listings(
+    targets: Iterable[ListingTarget],
+    max_posts: int = 50,
+    high_water_marks: Optional[Dict[Tuple[str, str], HighWaterMark]] = None,
+    backfill: bool = False,
+    max_connections: int = 10,
+    per_host_limit: int = 4,
+    timeout: float = 10.0,
+    base_url: str = REDDIT_BASE_URL,
+    on_page: Optional[PageCallback] = None,
+    defer_locations: bool = False,
+) -> Dict[ListingTarget, ListingScan]:
+    """Blocking wrapper around ``scan_listings_async`` for Flask views and the CLI."""
+    return asyncio.run(scan_listings_async(
+        targets, max_posts, high_water_marks, backfill, max_connections, per_host_limit, timeout,
+        base_url, on_page, defer_locations
+    ))
+
+
+def merge_posts(scans: Iterable[ListingScan]) -> List[Tuple[str, str, str]]:
+    """Flatten listing scans into one list of (title, location, username) tuples."""
+    return [post for scan in scans for post in scan.posts]
@@ -0,0 +1,6 @@
+"""Microbenchmarks for the Reddit outreach pipeline.
+
+Run from the ``finalmile_coldcall`` directory, e.g.::
+
+    python -m benchmarks.bench_location_parser
+"""
@@ -0,0 +1,179 @@
+"""Benchmark the memory-mapped gazetteer: build, open, lookups and parsing.
+
+Usage (from the ``finalmile_coldcall`` directory)::
+
+    python -m benchmarks.bench_gazetteer [--source 2023_Gaz_place_national.zip]
+        [--names 32000] [--titles 5000] [--repeat 5] [--workers 4]
+
+Compiles a Census places Gazetteer file given with ``--source``, or else
+``--names`` synthetic place names (about one in ten in several states), into
+a temporary index and prints:
+
+* build time and index size;
+* time to open the index, and to look up a hit and a miss (not memoized);
+* parser titles/sec without and with the gazetteer, on the
+  ``bench_location_parser`` corpus plus as many titles naming a gazetteer
+  place (half of them with its state), and how many of those each parses to
+  exactly that "City, ST" (names in several states given without one
+  cannot be);
+* on Linux, the resident and proportional size of the mapping while
+  ``--workers`` other processes have it open and fully read, which shows the
+  pages are shared rather than copied per process.
+"""
+
+import argparse
+import mmap
+import multiprocessing
+import os
+import random
+import tempfile
+import time
+from typing import Dict, Iterator, List, Tuple
+
+from benchmarks.bench_location_parser import build_corpus
+from constants import STATE_FULL_MAP
+from gazetteer import Gazetteer, build_gazetteer, place_key, read_census_places
+from location_parser import LocationParser
+
+_SYLLABLES = ["ar", "bel", "car", "dan", "el", "fair", "glen", "har", "ing", "lake", "mont", "nor",
+              "ost", "pine", "ridge", "sel", "ton", "ville", "wood", "ber", "ford", "ly", "mar", "ro"]
+
+
+def synthetic_places(count: int, seed: int = 0) -> Iterator[Tuple[str, str, str]]:
+    """(display name, key, state) for ``count`` made-up names, some in several states."""
+    rng = random.Random(seed)
+    states = sorted(STATE_FULL_MAP)
+    seen = set()
+    while len(seen) < count:
+        words = [
+            "".join(rng.choice(_SYLLABLES) for _ in range(rng.randint(2, 3))).capitalize()
+            for _ in range(rng.choice((1, 1, 1, 2, 2, 3)))
+        ]
+        name = " ".join(words)
+        key = place_key(name)
+        if key in seen:
+            continue
+        seen.add(key)
+        for state in rng.sample(states, 1 if rng.random() < 0.9 else rng.randint(2, 4)):
+            yield name, key, state
+
+
+def best_of(repeat: int, function, *args) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function(*args)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def place_titles(places: List[Tuple[str, str]], size: int, seed: int = 3) -> List[Tuple[str, str]]:
+    """(title, expected location) for titles naming a gazetteer place, with and without its state."""
+    rng = random.Random(seed)
+    shapes = [
+        lambda name, state: f"Got the keys in {name}, {state}! $315k",
+        lambda name, state: f"Closed on our first home in {name} today $289k",
+        lambda name, state: f"We did it! {name} {STATE_FULL_MAP.get(state, state)} townhouse",
+        lambda name, state: f"32M single, closed on a condo in {name}!",
+    ]
+    titles = []
+    for _ in range(size):
+        name, state = rng.choice(places)
+        titles.append((rng.choice(shapes)(name, state), f"{name}, {state}"))
+    return titles
+
+
+def touch_pages(gazetteer: Gazetteer) -> None:
+    """Read one byte of every page of the mapping, faulting all of it in."""
+    sum(gazetteer._map[offset] for offset in range(0, len(gazetteer._map), mmap.PAGESIZE))
+
+
+def _hold_open(path: str, ready, done) -> None:
+    gazetteer = Gazetteer(path)
+    touch_pages(gazetteer)
+    ready.set()
+    done.wait()
+    gazetteer.close()
+
+
+def mapping_sizes(path: str) -> Dict[str, int]:
+    """Rss, Pss and Shared (kB) of this process's mapping of ``path``, from /proc."""
+    sizes = {"Rss": 0, "Pss": 0, "Shared": 0}
+    inside = False
+    with open("/proc/self/smaps") as smaps:
+        for line in smaps:
+            fields = line.split()
+            if "-" in fields[0] and len(fields) >= 5:
+                inside = fields[-1] == os.path.realpath(path)
+            elif inside:
+                name = fields[0].rstrip(":")
+                if name in ("Rss", "Pss"):
+                    sizes[name] += int(fields[1])
+                elif name in ("Shared_Clean", "Shared_Dirty"):
+                    sizes["Shared"] += int(fields[1])
+    return sizes
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--source", help="Census places Gazetteer file (.txt or .zip)")
+    parser.add_argument("--names", type=int, default=32000, help="synthetic names when no --source")
+    parser.add_argument("--titles", type=int, default=5000)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--workers", type=int, default=4)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "us_places.idx")
+        places = list(read_census_places(args.source) if args.source else synthetic_places(args.names))
+        start = time.perf_counter()
+        result = build_gazetteer(places, path)
+        print(f"built {result['names']:,} names ({result['ambiguous']:,} in several states) "
+              f"in {time.perf_counter() - start:.2f}s: {result['bytes'] / 2 ** 20:.2f} MiB")
+
+        opened = best_of(args.repeat, lambda: Gazetteer(path).close())
+        gazetteer = Gazetteer(path)
+        names = [display for display, _, _ in places[::max(1, len(places) // 2000)]]
+
+        def lookups(suffix):
+            gazetteer._lookup_key.cache_clear()
+            return [gazetteer.lookup(name + suffix) for name in names]
+
+        hit = best_of(args.repeat, lookups, "") / len(names)
+        miss = best_of(args.repeat, lookups, "qz") / len(names)
+        print(f"open {opened * 1e6:.0f} us, uncached lookup hit {hit * 1e6:.2f} us, miss {miss * 1e6:.2f} us")
+
+        rng = random.Random(1)
+        sample = [(display, state) for display, _, state in rng.sample(places, min(500, len(places)))]
+        named = place_titles(sample, args.titles - args.titles // 2)
+        corpus = build_corpus(args.titles // 2) + [title for title, _ in named]
+        plain, compiled = LocationParser(), LocationParser(gazetteer=gazetteer)
+        for label, location_parser in (("without gazetteer", plain), ("with gazetteer", compiled)):
+            seconds = best_of(args.repeat, lambda: [location_parser.parse(title) for title in corpus])
+            exact = sum(location_parser.parse(title) == expected for title, expected in named)
+            print(f"{label:<18} {len(corpus) / seconds:>9,.0f} titles/sec, "
+                  f"{exact}/{len(named)} place titles parsed to their 'City, ST'")
+
+        if os.path.exists("/proc/self/smaps") and args.workers:
+            context = multiprocessing.get_context("spawn")
+            done = context.Event()
+            workers = []
+            for _ in range(args.workers):
+                ready = context.Event()
+                worker = context.Process(target=_hold_open, args=(path, ready, done))
+                worker.start()
+                workers.append((worker, ready))
+            for _, ready in workers:
+                ready.wait()
+            touch_pages(gazetteer)
+            sizes = mapping_sizes(path)
+            print(f"mapping with {args.workers + 1} processes: Rss {sizes['Rss']} kB, "
+                  f"Pss {sizes['Pss']} kB, shared {sizes['Shared']} kB")
+            done.set()
+            for worker, _ in workers:
+                worker.join()
+        gazetteer.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+"""Benchmark the known-posts filter: memory, lookups and skipped refresh work.
+
+Usage (from the ``finalmile_coldcall`` directory)::
+
+    python -m benchmarks.bench_known_posts [--entries 1000000] [--rows 100000]
+        [--chunk 500] [--repeat 5] [--database-url sqlite:///path/to.db]
+
+Prints:
+
+* ``warm`` time for ``--entries`` synthetic pairs, the filter's bytes per
+  entry, and the peak memory traced while warming;
+* ``contains`` time for a hit and a miss, and ``add_many`` time per pair
+  including the merges it triggers;
+* with ``--rows`` posts stored through ``OutreachService.upsert_posts``,
+  the time to handle a ``--chunk`` of already-stored posts the way the
+  refresh did before (parse every location, then upsert and commit, which
+  changes nothing) and with the filter (one ``contains`` per post).
+"""
+
+import argparse
+import os
+import random
+import tempfile
+import time
+import tracemalloc
+from typing import List, Tuple
+
+from flask import Flask
+
+from benchmarks.bench_location_parser import build_corpus
+from config import config
+from known_posts import KnownPosts
+from models import db
+from scrape_reddit import parse_location_from_title
+from services.outreach_service import OutreachService
+
+
+def make_pairs(count: int, offset: int = 0) -> List[Tuple[str, str]]:
+    """(username, title) pairs shaped like stored posts."""
+    titles = build_corpus(1000)
+    return [(f"user_{offset + index:08d}", titles[index % len(titles)]) for index in range(count)]
+
+
+def best_of(repeat: int, function) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def filter_numbers(entries: int, repeat: int) -> None:
+    pairs = make_pairs(entries)
+    known = KnownPosts(max_entries=entries * 2)
+    seconds = best_of(repeat, lambda: known.warm(iter(pairs)))
+    # Traced separately, as tracing slows the warm several times over
+    tracemalloc.start()
+    known.warm(iter(pairs))
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    stats = known.stats()
+    print(f"warm {entries:,} entries in {seconds:.2f}s: {stats['bytes'] / entries:.1f} bytes/entry "
+          f"({stats['bytes'] / 2 ** 20:.1f} MiB), peak while warming {peak / 2 ** 20:.1f} MiB")
+
+    probes = pairs[::max(1, entries // 10000)]
+    missing = make_pairs(len(probes), offset=entries)
+    hit = best_of(repeat, lambda: [known.contains(username, title) for username, title in probes]) / len(probes)
+    miss = best_of(repeat, lambda: [known.contains(username, title) for username, title in missing]) / len(missing)
+
+    new = make_pairs(entries // 4, offset=entries * 4)
+    start = time.perf_counter()
+    for first in range(0, len(new), 500):
+        known.add_many(new[first:first + 500])
+    added = (time.perf_counter() - start) / len(new)
+    print(f"contains hit {hit * 1e6:.2f} us, miss {miss * 1e6:.2f} us; "
+          f"add_many {added * 1e6:.2f} us/pair over {len(new):,} pairs (merges included)")
+
+
+def refresh_numbers(rows: int, chunk: int, repeat: int, database_url: str) -> None:
+    app = Flask(__name__)
+    app.config.from_object(config['default'])
+    app.config['SQLALCHEMY_DATABASE_URI'] = database_url
+    db.init_app(app)
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        service = OutreachService()
+        pairs = make_pairs(rows)
+        for first in range(0, rows, 5000):
+            service.upsert_posts([(title, parse_location_from_title(title), username)
+                                  for username, title in pairs[first:first + 5000]])
+            db.session.commit()
+        known = KnownPosts(max_entries=rows)
+        known.warm(iter(pairs))
+
+        sample = random.Random(0).sample(pairs, chunk)
+
+        def database_path():
+            service.upsert_posts([(title, parse_location_from_title(title), username)
+                                  for username, title in sample])
+            db.session.commit()
+
+        def filtered():
+            [(username, title) for username, title in sample if not known.contains(username, title)]
+
+        before = best_of(repeat, database_path)
+        after = best_of(repeat, filtered)
+        print(f"chunk of {chunk} stored posts out of {rows:,}: parse + upsert {before * 1000:.1f} ms, "
+              f"filter {after * 1000:.2f} ms ({before / after:,.0f}x)")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--entries", type=int, default=1000000)
+    parser.add_argument("--rows", type=int, default=100000)
+    parser.add_argument("--chunk", type=int, default=500)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--database-url")
+    args = parser.parse_args()
+
+    filter_numbers(args.entries, args.repeat)
+    with tempfile.TemporaryDirectory() as tmp:
+        refresh_numbers(args.rows, args.chunk, args.repeat,
+                        args.database_url or f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+
+
+if __name__ == "__main__":
+    main()
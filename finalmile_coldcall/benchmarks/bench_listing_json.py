@@ -0,0 +1,117 @@
+"""Benchmark listing-page decoding: ``response.json()`` vs field-selective parsing.
+
+Usage (from the ``finalmile_coldcall`` directory)::
+
+    python -m benchmarks.bench_listing_json [--pages 20] [--page-size 100] [--lean] [--repeat 5]
+
+Pages are generated by ``benchmarks.fake_reddit`` with every field a real
+listing carries (``--lean`` keeps only the handful the fake normally sends)
+and decoded three ways:
+
+* ``response.json()``: the previous path, a full decode through httpx;
+* ``selective (json)``: ``listing_json.parse_listing`` on the standard
+  library fallback;
+* ``selective (orjson)``: the same with orjson, if it is installed.
+
+For each path it reports the time per page (best of ``--repeat``), the
+tracemalloc peak while decoding one page, and the memory and number of
+blocks still held by the decoded result, i.e. what a caller keeping the page
+around pays. Every path must yield the same posts.
+"""
+
+import argparse
+import json
+import sys
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, List
+
+import httpx
+
+import listing_json
+from listing_json import LISTING_FIELDS, parse_listing
+from benchmarks.fake_reddit import FakeReddit
+
+
+def make_pages(count: int, page_size: int, full_posts: bool) -> List[bytes]:
+    fake = FakeReddit(count * page_size, full_posts=full_posts)
+    pages = []
+    after = None
+    for _ in range(count):
+        page = fake.listing("Bench", after, page_size)
+        after = page["data"]["after"]
+        pages.append(json.dumps(page).encode())
+    return pages
+
+
+def with_stdlib(function: Callable[[bytes], Any]) -> Callable[[bytes], Any]:
+    """Run ``function`` with orjson hidden from ``listing_json``."""
+
+    def run(raw: bytes) -> Any:
+        saved, listing_json.orjson = listing_json.orjson, None
+        try:
+            return function(raw)
+        finally:
+            listing_json.orjson = saved
+
+    return run
+
+
+def posts_of(page: Dict[str, Any]) -> List[tuple]:
+    return [tuple(child["data"].get(field) for field in LISTING_FIELDS) for child in page["data"]["children"]]
+
+
+def measure(decode: Callable[[bytes], Any], pages: List[bytes], repeat: int) -> Dict[str, float]:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for raw in pages:
+            decode(raw)
+        best = min(best, time.perf_counter() - start)
+
+    raw = pages[len(pages) // 2]
+    tracemalloc.start()
+    decode(raw)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    tracemalloc.start()
+    blocks_before = sys.getallocatedblocks()
+    kept = decode(raw)
+    retained_blocks = sys.getallocatedblocks() - blocks_before
+    retained = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del kept
+    return {"ms": best / len(pages) * 1000, "peak": peak, "retained": retained, "blocks": retained_blocks}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--pages", type=int, default=20)
+    parser.add_argument("--page-size", type=int, default=100)
+    parser.add_argument("--lean", action="store_true", help="only the fields the fake normally sends")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    pages = make_pages(args.pages, args.page_size, not args.lean)
+    print(f"{len(pages)} pages x {args.page_size} posts, {sum(map(len, pages)) / len(pages) / 1024:,.0f} KiB per page")
+
+    paths = {"response.json()": lambda raw: httpx.Response(200, content=raw).json()}
+    paths["selective (json)"] = with_stdlib(parse_listing)
+    if listing_json.orjson is not None:
+        paths["selective (orjson)"] = parse_listing
+    else:
+        print("orjson is not installed; skipping its path")
+
+    expected = [posts_of(paths["response.json()"](raw)) for raw in pages]
+    print(f"{'path':<20} {'ms/page':>8} {'peak KiB':>9} {'kept KiB':>9} {'kept blocks':>12}")
+    for name, decode in paths.items():
+        if [posts_of(decode(raw)) for raw in pages] != expected:
+            raise SystemExit(f"{name} extracted different posts")
+        stats = measure(decode, pages, args.repeat)
+        print(f"{name:<20} {stats['ms']:>8.2f} {stats['peak'] / 1024:>9,.0f} "
+              f"{stats['retained'] / 1024:>9,.0f} {stats['blocks']:>12,}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+"""Benchmark state/city facets: the location index vs string matching.
+
+Usage (from the ``finalmile_coldcall`` directory)::
+
+    python -m benchmarks.bench_location_facets [--rows 1000000] [--repeat 5]
+        [--database-url sqlite:///path/to.db]
+
+Loads synthetic posts through ``OutreachService.upsert_posts`` (so every row
+is linked to its ``locations`` row and counted in ``post_counters``), with
+locations drawn from ``AIRPORT_MAP`` plus bare state names, skewed so a few
+states hold most posts. Then times, best of ``--repeat``:
+
+* a first and a tenth dashboard page filtered by a large, a medium and a
+  small state, and by one city, through ``get_posts_page``;
+* the same first page found the way the string column allows, with
+  ``location LIKE '%, ST'`` (which also misses bare state names);
+* ``get_location_facets`` and a filtered ``count_posts``.
+
+It also prints the query plan of a state-filtered page.
+"""
+
+import argparse
+import os
+import random
+import tempfile
+import time
+from collections import Counter
+from typing import List, Tuple
+
+from flask import Flask
+from sqlalchemy import text
+
+from config import config
+from constants import AIRPORT_MAP, STATE_FULL_MAP
+from models import db, OutreachStatus
+from services.outreach_service import OutreachService
+
+
+def make_locations(rng: random.Random) -> List[Tuple[str, float]]:
+    """(location string, weight): airport cities, weighted by a Zipf-like rank, and state names."""
+    labels = sorted(set(AIRPORT_MAP.values()))
+    rng.shuffle(labels)
+    weighted = [(label, 1 / (rank + 1)) for rank, label in enumerate(labels)]
+    weighted += [(name, 0.01) for name in STATE_FULL_MAP.values()]
+    return weighted
+
+
+def seed(service: OutreachService, rows: int, batch: int = 5000) -> float:
+    rng = random.Random(0)
+    labels, weights = zip(*make_locations(rng))
+    start = time.perf_counter()
+    for first in range(0, rows, batch):
+        posts = []
+        for location in rng.choices(labels, weights, k=min(batch, rows - first)):
+            posts.append((f"Got the keys in {location}! #{first + len(posts)}", location,
+                          f"user_{first + len(posts):07d}"))
+        service.upsert_posts(posts)
+        db.session.commit()
+    return time.perf_counter() - start
+
+
+def best_of(repeat: int, function) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        db.session.expunge_all()
+        start = time.perf_counter()
+        function()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def tenth_page(service: OutreachService, **facet) -> None:
+    page = service.get_posts_page(**facet)
+    for _ in range(9):
+        page = service.get_posts_page(after=page.next_cursor, **facet)
+
+
+def like_page(state: str) -> None:
+    OutreachStatus.query.filter(OutreachStatus.location.like(f"%, {state}")).order_by(
+        OutreachStatus.created_at.desc(), OutreachStatus.id.desc()
+    ).limit(21).all()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1000000)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--database-url")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        app = Flask(__name__)
+        app.config.from_object(config['default'])
+        app.config['SQLALCHEMY_DATABASE_URI'] = (
+            args.database_url or f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+        )
+        db.init_app(app)
+        with app.app_context():
+            db.drop_all()
+            db.create_all()
+            service = OutreachService()
+            seconds = seed(service, args.rows)
+            print(f"seeded {args.rows:,} rows in {seconds:.1f}s")
+
+            states = Counter({facet['state']: facet['posts'] for facet in service.get_location_facets()['states']})
+            ranked = [state for state, _ in states.most_common()]
+            picks = [ranked[0], ranked[len(ranked) // 4], ranked[-1]]
+            city = service.get_location_facets(state=picks[0])['cities'][0]['city']
+
+            plan = db.session.execute(text(
+                "EXPLAIN QUERY PLAN " + str(
+                    service._filter_location(OutreachStatus.query, picks[0], None)
+                    .order_by(OutreachStatus.created_at.desc(), OutreachStatus.id.desc()).limit(21)
+                    .statement.compile(db.engine, compile_kwargs={"literal_binds": True})
+                )
+            )).all()
+            print("plan:", "; ".join(row[-1] for row in plan))
+
+            print(f"{'facet':<22} {'posts':>8} {'page 1 ms':>10} {'page 10 ms':>11} {'LIKE ms':>9}")
+            for state in picks:
+                first = best_of(args.repeat, lambda: service.get_posts_page(state=state))
+                tenth = best_of(args.repeat, lambda: tenth_page(service, state=state)) / 10
+                like = best_of(args.repeat, lambda: like_page(state))
+                print(f"{'state=' + state:<22} {states[state]:>8,} {first * 1000:>10.2f} "
+                      f"{tenth * 1000:>11.2f} {like * 1000:>9.2f}")
+            city_posts = service.count_posts(city=city)
+            first = best_of(args.repeat, lambda: service.get_posts_page(city=city))
+            tenth = best_of(args.repeat, lambda: tenth_page(service, city=city)) / 10
+            print(f"{'city=' + city:<22} {city_posts:>8,} {first * 1000:>10.2f} {tenth * 1000:>11.2f}")
+
+            facets = best_of(args.repeat, service.get_location_facets)
+            count = best_of(args.repeat, lambda: service.count_posts(state=picks[0]))
+            print(f"get_location_facets {facets * 1000:.2f} ms, count_posts(state) {count * 1000:.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+"""Compare the compiled location parser against the original regex cascade.
+
+Usage (from the ``finalmile_coldcall`` directory)::
+
+    python -m benchmarks.bench_location_parser [--titles 5000] [--repeat 3]
+
+Prints titles/sec for both parsers on a synthetic corpus of realistic and
+pathological titles, and the number of titles where the results differ.
+"""
+
+import argparse
+import random
+import re
+import time
+from typing import Callable, List
+
+from constants import AIRPORT_MAP, KNOWN_CITIES, LOCATION_PATTERNS, STATE_FULL_MAP, STATE_MAP
+from location_parser import LocationParser
+
+
+def legacy_parse_location_from_title(title: str) -> str:
+    """The regex cascade that ``scrape_reddit`` used before ``location_parser``."""
+    normalized = re.sub(r"[|/]", " ", title)
+    stripped = re.sub(r"\([^)]*\)", "", normalized)
+
+    for pat in LOCATION_PATTERNS:
+        match = re.search(pat, stripped, re.IGNORECASE)
+        if match:
+            city = match.group(1).strip()
+            state = match.group(2).strip()
+            city = re.sub(r"\b(Area|County|Metro)\b", "", city, flags=re.IGNORECASE).strip()
+            if len(state) != 2:
+                state = STATE_MAP.get(state, state)
+            return f"{city}, {state}"
+
+    airport_match = re.search(r"([A-Za-z\s]{3,15})\s+([A-Z]{3})\b", stripped)
+    if airport_match:
+        city_part = airport_match.group(1).strip()
+        code = airport_match.group(2)
+        if code in AIRPORT_MAP:
+            return AIRPORT_MAP[code]
+        return f"{city_part} {code}"
+
+    airport_alone = re.search(r"\b(" + "|".join(AIRPORT_MAP.keys()) + r")\b\s+[$]?\d", stripped)
+    if airport_alone:
+        code = airport_alone.group(1)
+        return AIRPORT_MAP.get(code, code)
+
+    state_only = re.search(r"\b([A-Z]{2})\b", stripped)
+    if state_only:
+        state = state_only.group(1)
+        return STATE_FULL_MAP.get(state, state)
+
+    city_before_price = re.search(r"\b(" + "|".join(KNOWN_CITIES) + r")\b", stripped, re.IGNORECASE)
+    if city_before_price:
+        return city_before_price.group(0)
+
+    fallback = re.search(r"(.+?)\s+[$]\d", stripped)
+    if fallback:
+        loc = fallback.group(1).strip()
+        loc_clean = re.sub(r"\b(Metro|Area|County)\b", "", loc, flags=re.IGNORECASE).strip()
+        generic_prefixes = {
+            "i did it", "i did, it", "we did it", "we did, it", "finally did it",
+            "finally did, it", "finally did", "got the keys", "got keys", "got the",
+            "we got the", "we finally", "i opted", "first home", "dream come",
+            "saving paid", "first month", "we did", "i did",
+        }
+        matched_generic = None
+        for word in generic_prefixes:
+            if loc_clean.lower().startswith(word):
+                matched_generic = word
+                remaining = loc_clean[len(word):].strip(", ").strip()
+                if remaining.lower() in (c.lower() for c in KNOWN_CITIES):
+                    return remaining
+                for city in KNOWN_CITIES:
+                    if city.lower() in remaining.lower():
+                        return city
+                break
+        if not matched_generic:
+            return loc_clean
+        return "Unknown"
+
+    for city in KNOWN_CITIES:
+        if city.lower() in stripped.lower():
+            return city
+
+    return "Unknown"
+
+
+_OPENERS = [
+    "Got the keys!", "Finally did it", "We did it", "First home", "Closed today",
+    "After 2 years of saving", "GOT THE KEY", "Dream come true", "so happy",
+]
+_PRICES = ["$450k", "$1.2M", "$315,000", "564k", "$289k", "3.25% rate"]
+_FILLER = (
+    "after a long search we finally found the one with a big yard for the dogs "
+    "and a short commute for both of us and honestly it still does not feel real"
+)
+
+
+def build_corpus(size: int, seed: int = 7) -> List[str]:
+    """Generate a deterministic mix of title shapes seen on r/FirstTimeHomeBuyer."""
+    rng = random.Random(seed)
+    cities = list(dict.fromkeys(KNOWN_CITIES))
+    states = list(STATE_MAP.items())
+    airports = list(AIRPORT_MAP)
+    shapes: List[Callable[[], str]] = [
+        lambda: f"{rng.choice(_OPENERS)} {rng.choice(cities)}, {rng.choice(states)[1]} {rng.choice(_PRICES)}",
+        lambda: f"{rng.choice(cities)} {rng.choice(states)[1]} {rng.choice(_PRICES)} - {rng.choice(_OPENERS)}",
+        lambda: f"{rng.choice(cities)}, {rng.choice(states)[0]} $300k",
+        lambda: f"{rng.choice(airports)} {rng.choice(_PRICES)} {rng.choice(_OPENERS)}",
+        lambda: f"{rng.choice(_OPENERS)}!!! {rng.choice(airports)} area | {rng.choice(_PRICES)}",
+        lambda: f"{rng.choice(_OPENERS)} {rng.choice(cities)} $350k",
+        lambda: f"32M single, closed on a condo in {rng.choice(cities)}!",
+        lambda: f"{rng.choice(_OPENERS)}!!! {_FILLER} ({rng.choice(cities)})",
+        lambda: f"{rng.choice(_OPENERS)}!!! {_FILLER} {_FILLER}",
+    ]
+    return [rng.choice(shapes)() for _ in range(size)]
+
+
+def _time(parse: Callable[[str], str], corpus: List[str], repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for title in corpus:
+            parse(title)
+        best = min(best, time.perf_counter() - start)
+    return len(corpus) / best
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--titles", type=int, default=5000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    corpus = build_corpus(args.titles)
+    compiled = LocationParser()
+
+    legacy_rate = _time(legacy_parse_location_from_title, corpus, args.repeat)
+    compiled_rate = _time(compiled.parse, corpus, args.repeat)
+    mismatches = sum(
+        legacy_parse_location_from_title(title) != compiled.parse(title) for title in corpus
+    )
+
+    print(f"titles:     {len(corpus)}")
+    print(f"legacy:     {legacy_rate:,.0f} titles/sec")
+    print(f"compiled:   {compiled_rate:,.0f} titles/sec ({compiled_rate / legacy_rate:.1f}x)")
+    print(f"mismatches: {mismatches}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""Benchmark the compiled phrase matcher against per-phrase substring tests.
+
+Usage (from the ``finalmile_coldcall`` directory)::
+
+    python -m benchmarks.bench_phrase_matcher [--posts 2000] [--body-repeat 40]
+        [--sizes 1 4 16 64 256 1024] [--repeat 3]
+
+Posts come from ``benchmarks.fake_reddit`` with bodies stretched to a few KB
+(``--body-repeat``). For each phrase-list size the configured
+``TARGET_PHRASES`` are padded with synthetic three-word phrases drawn from
+real-estate vocabulary, then every post is scanned two ways:
+
+* ``naive``: the previous matcher, lowercasing flair, title and body and
+  testing each phrase with ``in`` (stopping at the first hit, as it did);
+* ``compiled``: ``PhraseMatcher.scan``, which reports every phrase found.
+
+``naive`` grows linearly with the list. ``compiled`` does the same up to
+``DIRECT_SCAN_LIMIT`` phrases (a little slower, since it finds every phrase
+rather than stopping at the first hit) and then stays roughly flat. Both must
+agree on which posts match.
+"""
+
+import argparse
+import random
+import time
+from typing import Dict, List, Sequence, Tuple
+
+from config import Config
+from phrase_matcher import PhraseMatcher
+from benchmarks.fake_reddit import FakeReddit
+
+VOCABULARY = [
+    "offer", "accepted", "appraisal", "inspection", "escrow", "closing", "keys", "mortgage",
+    "lender", "rate", "down", "payment", "realtor", "condo", "townhouse", "house", "first",
+    "home", "buyer", "signed", "papers", "title", "survey", "credit", "approved", "under",
+    "contract", "moving", "finally", "officially", "dream", "zillow", "pmi", "fha", "va",
+]
+
+Post = Tuple[str, str, str]
+
+
+def make_posts(count: int, body_repeat: int) -> List[Post]:
+    fake = FakeReddit(count, flair_ratio=0.3)
+    posts = []
+    for position in range(count):
+        data = fake.post("Bench", position)["data"]
+        body = data["selftext"] * body_repeat
+        posts.append((data["link_flair_text"] or "", data["title"], body))
+    return posts
+
+
+def make_phrases(size: int, rng: random.Random) -> Dict[str, float]:
+    phrases = dict(list(Config.TARGET_PHRASES.items())[:size])
+    while len(phrases) < size:
+        phrases[" ".join(rng.sample(VOCABULARY, 3))] = 1.0
+    return phrases
+
+
+def naive_matches(phrases: Sequence[str], flair: str, title: str, body: str) -> bool:
+    if flair:
+        flair = flair.lower()
+        if any(phrase in flair for phrase in phrases):
+            return True
+    title = title.lower()
+    if any(phrase in title for phrase in phrases):
+        return True
+    body = body.lower()
+    return any(phrase in body for phrase in phrases)
+
+
+def best_of(repeat: int, function) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--posts", type=int, default=2000)
+    parser.add_argument("--body-repeat", type=int, default=40, help="copies of the generated body per post")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1, 4, 16, 64, 256, 1024])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    posts = make_posts(args.posts, args.body_repeat)
+    average_chars = sum(len(field) for post in posts for field in post) / len(posts)
+    print(f"{len(posts):,} posts, {average_chars:,.0f} chars each on average")
+    print(f"{'phrases':>8} {'naive µs/post':>14} {'compiled µs/post':>17} {'matches':>8}")
+    rng = random.Random(0)
+    for size in args.sizes:
+        phrases = make_phrases(size, rng)
+        lowered = [phrase.lower() for phrase in phrases]
+        matcher = PhraseMatcher(phrases)
+
+        naive = [naive_matches(lowered, *post) for post in posts]
+        compiled = [bool(matcher.scan(*post).phrases) for post in posts]
+        if naive != compiled:
+            raise SystemExit(f"matchers disagree at {size} phrases")
+
+        naive_seconds = best_of(args.repeat, lambda: [naive_matches(lowered, *post) for post in posts])
+        compiled_seconds = best_of(args.repeat, lambda: [matcher.scan(*post) for post in posts])
+        print(f"{size:>8} {naive_seconds / len(posts) * 1e6:>14.1f} "
+              f"{compiled_seconds / len(posts) * 1e6:>17.1f} {sum(compiled):>8,}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,187 @@
+"""Benchmark the full refresh pipeline against the offline Reddit stand-in.
+
+Usage (from the ``finalmile_coldcall`` directory)::
+
+    python -m benchmarks.bench_refresh_e2e [--subreddits 4] [--posts 2000] [--flair-ratio 0.3]
+        [--latency-ms 0] [--jitter-ms 0] [--rate-limit-ratio 0] [--runs 3] [--trace-memory]
+        [--full-posts] [--http-cache] [--http-cache-ttl 60]
+
+Starts ``benchmarks.fake_reddit`` on a free port, points ``Config`` at it and
+runs the real ``OutreachService.refresh_posts(backfill=True)`` into a fresh
+SQLite database per run, so every listing is walked to its end. For each run
+it reports pages/sec and posts/sec over the whole refresh, the busy time of
+each pipeline stage (fetch, including HTTP, JSON decoding and phrase
+matching in ``ListingWalk.consume``; location parsing; database writes), how
+long the write stage sat waiting for input, and peak memory. Stage times
+overlap, so they can add up to more than the total.
+
+The listing response cache is off unless ``--http-cache`` is given; then one
+cache file is shared by all runs, so later runs show refreshes served from
+it (``--http-cache-ttl 0`` makes every lookup a conditional request that the
+stand-in answers with 304).
+
+``--full-posts`` serves pages with every field a real listing carries, which
+makes JSON decoding a realistic share of the fetch stage.
+
+The location cache is kept in memory only, so the first run parses every
+title and later runs mostly hit the cache.
+"""
+
+import argparse
+import os
+import resource
+import tempfile
+import time
+import tracemalloc
+from typing import Dict
+
+from flask import Flask
+
+from config import Config, config
+from fetch_scheduler import get_scheduler
+from models import db, create_search_index
+from response_cache import get_response_cache
+from scrape_reddit import ListingWalk
+from services.outreach_service import OutreachService
+from storage import init_storage
+from benchmarks.fake_reddit import FakeReddit, serve
+
+
+class ConsumeTimer:
+    """Wrap ``ListingWalk.consume`` to time phrase matching and count scanned posts."""
+
+    def __init__(self):
+        self.seconds = 0.0
+        self.posts = 0
+        self._consume = ListingWalk.consume
+
+    def install(self) -> None:
+        timer = self
+
+        def consume(walk, data):
+            start = time.perf_counter()
+            try:
+                return timer._consume(walk, data)
+            finally:
+                timer.seconds += time.perf_counter() - start
+                timer.posts += len(data["data"]["children"])
+
+        ListingWalk.consume = consume
+
+    def reset(self) -> None:
+        self.seconds = 0.0
+        self.posts = 0
+
+
+def configure(base_url: str, args: argparse.Namespace) -> None:
+    """Point the app's configuration at the stand-in before anything reads it."""
+    Config.REDDIT_BASE_URL = base_url
+    Config.SUBREDDIT_TARGETS = {f"BenchSub{i}": [args.phrase] for i in range(args.subreddits)}
+    Config.SUBREDDIT_PRIORITIES = {}
+    Config.BACKFILL_MAX_POSTS = args.posts
+    # The benchmark measures the pipeline, not the production request budget
+    Config.REDDIT_REQUESTS_PER_MINUTE = 10 ** 7
+    Config.REDDIT_REQUEST_BURST = 10 ** 4
+    Config.LOCATION_CACHE_PATH = ""
+    Config.LISTING_ARCHIVE_PATH = ""
+    Config.HTTP_CACHE_PATH = ""
+
+
+def run_once(path: str, timer: ConsumeTimer, trace_memory: bool) -> Dict[str, float]:
+    app = Flask(__name__)
+    app.config.from_object(config["default"])
+    app.config["SQLALCHEMY_DATABASE_URI"] = f"sqlite:///{path}"
+    init_storage(app)
+    with app.app_context():
+        db.create_all()
+        create_search_index()
+        service = OutreachService()
+        retries_before = get_scheduler().stats()["retries"]
+        timer.reset()
+        if trace_memory:
+            tracemalloc.start()
+        start = time.perf_counter()
+        result = service.refresh_posts(backfill=True)
+        end = time.perf_counter()
+        traced_peak = tracemalloc.get_traced_memory()[1] if trace_memory else 0
+        if trace_memory:
+            tracemalloc.stop()
+        retries = get_scheduler().stats()["retries"] - retries_before
+        db.session.remove()
+        db.engine.dispose()
+
+    timings = result["timings"]
+    return {
+        "total": end - start,
+        "pages": result["pages_fetched"],
+        "posts": timer.posts,
+        "leads": result["new_posts"],
+        "fetch": timings["fetch"]["busy_seconds"],
+        "match": timer.seconds,
+        "parse": timings["parse"]["busy_seconds"],
+        "db": timings["write"]["busy_seconds"],
+        "db_idle": timings["write"]["input_wait_seconds"],
+        "retries": retries,
+        "traced_peak": traced_peak,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--subreddits", type=int, default=4)
+    parser.add_argument("--posts", type=int, default=2000, help="posts per subreddit")
+    parser.add_argument("--flair-ratio", type=float, default=0.3)
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--jitter-ms", type=float, default=0.0)
+    parser.add_argument("--rate-limit-ratio", type=float, default=0.0)
+    parser.add_argument("--retry-after", type=float, default=0.1)
+    parser.add_argument("--phrase", default="GOT THE KEY")
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--trace-memory", action="store_true",
+                        help="report the tracemalloc peak (slows the run down)")
+    parser.add_argument("--full-posts", action="store_true", help="serve real-sized posts")
+    parser.add_argument("--http-cache", action="store_true", help="share a listing response cache across runs")
+    parser.add_argument("--http-cache-ttl", type=float, default=60.0)
+    args = parser.parse_args()
+
+    fake = FakeReddit(
+        args.posts, args.flair_ratio, args.latency_ms, args.jitter_ms,
+        args.rate_limit_ratio, args.retry_after, full_posts=args.full_posts,
+    )
+    server = serve(fake)
+    configure(f"http://127.0.0.1:{server.server_port}", args)
+    timer = ConsumeTimer()
+    timer.install()
+
+    print(f"{args.subreddits} subreddits x {args.posts:,} posts, flair ratio {args.flair_ratio:g}, "
+          f"latency {args.latency_ms:g}+{args.jitter_ms:g}ms, 429 ratio {args.rate_limit_ratio:g}")
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            if args.http_cache:
+                Config.HTTP_CACHE_PATH = os.path.join(tmp, "http_cache.db")
+                Config.HTTP_CACHE_TTL_SECONDS = args.http_cache_ttl
+            for run in range(1, args.runs + 1):
+                stats = run_once(os.path.join(tmp, f"run{run}.db"), timer, args.trace_memory)
+                peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+                memory = f"peak RSS {peak_rss:.0f} MiB"
+                if args.trace_memory:
+                    memory += f", traced peak {stats['traced_peak'] / 2 ** 20:.1f} MiB"
+                print(
+                    f"  run {run}: {stats['total']:6.2f}s  {stats['pages'] / stats['total']:7.1f} pages/s  "
+                    f"{stats['posts'] / stats['total']:8,.0f} posts/s  {stats['leads']:,} leads  "
+                    f"fetch {stats['fetch']:.2f}s (match {stats['match']:.2f}s)  parse {stats['parse']:.2f}s  "
+                    f"db {stats['db']:.2f}s (idle {stats['db_idle']:.2f}s)  "
+                    f"retries {stats['retries']}  {memory}"
+                )
+            cache = get_response_cache()
+            if cache is not None:
+                cached = cache.stats()
+                print(f"  http cache: {cached['hits']} hits, {cached['revalidated']} revalidated, "
+                      f"{cached['misses']} misses, hit rate {cached['hit_rate']}%, {cached['bytes'] / 2 ** 20:.1f} MiB")
+    finally:
+        server.shutdown()
+    print(f"  server: {fake.stats()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""Benchmark the bulk upsert path behind ``OutreachService.refresh_posts``.
+
+Usage (from the ``finalmile_coldcall`` directory)::
+
+    python -m benchmarks.bench_refresh_upsert [--sizes 10000 100000] [--legacy-max 10000]
+        [--database-url sqlite:///path/to.db]
+
+For each size it times an initial load of synthetic posts into an empty
+table, then a second pass where 10% of the titles changed. The original
+one-query-per-post loop is timed as well for sizes up to ``--legacy-max``.
+"""
+
+import argparse
+import os
+import tempfile
+import time
+from typing import Dict, List, Tuple
+
+from flask import Flask
+
+from config import config
+from models import db, OutreachStatus, create_search_index
+from services.outreach_service import OutreachService
+
+
+def synthetic_posts(size: int, changed_every: int = 0) -> List[Tuple[str, str, str]]:
+    """Build ``size`` posts; every ``changed_every``-th one gets an edited title."""
+    posts = []
+    for i in range(size):
+        title = f"Got the keys! Reno, NV ${300 + i % 500}k #{i}"
+        if changed_every and i % changed_every == 0:
+            title += " (edited)"
+        posts.append((title, "Reno, NV", f"user_{i:07d}"))
+    return posts
+
+
+def legacy_upsert(posts: List[Tuple[str, str, str]]) -> Dict[str, int]:
+    """The per-post loop ``refresh_posts`` used before the bulk path."""
+    new_posts_count = 0
+    updated_posts_count = 0
+    for title, location, username in posts:
+        existing = OutreachStatus.query.filter_by(username=username).first()
+        if existing:
+            if existing.post_title != title:
+                existing.post_title = title
+                existing.location = location
+                updated_posts_count += 1
+        else:
+            db.session.add(OutreachStatus(
+                username=username,
+                post_title=title,
+                post_url=f"https://www.reddit.com/user/{username}/",
+                location=location,
+                status='Not Sent'
+            ))
+            new_posts_count += 1
+    db.session.commit()
+    return {'new_posts': new_posts_count, 'updated_posts': updated_posts_count}
+
+
+def _timed(label: str, func, posts) -> None:
+    db.session.expunge_all()
+    start = time.perf_counter()
+    result = func(posts)
+    elapsed = time.perf_counter() - start
+    print(f"  {label:<22} {elapsed:8.3f}s  {len(posts) / elapsed:>10,.0f} posts/sec  {result}")
+
+
+def run(app: Flask, size: int, include_legacy: bool) -> None:
+    service = OutreachService()
+
+    def bulk(posts):
+        result = service.upsert_posts(posts)
+        db.session.commit()
+        return result
+
+    print(f"{size:,} posts")
+    with app.app_context():
+        variants = [("bulk", bulk)] + ([("legacy", legacy_upsert)] if include_legacy else [])
+        for label, func in variants:
+            db.drop_all()
+            db.create_all()
+            create_search_index()
+            _timed(f"{label} insert", func, synthetic_posts(size))
+            _timed(f"{label} 10% changed", func, synthetic_posts(size, changed_every=10))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000])
+    parser.add_argument("--legacy-max", type=int, default=10000)
+    parser.add_argument("--database-url")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        app = Flask(__name__)
+        app.config.from_object(config['default'])
+        app.config['SQLALCHEMY_DATABASE_URI'] = (
+            args.database_url or f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+        )
+        db.init_app(app)
+        for size in args.sizes:
+            run(app, size, include_legacy=size <= args.legacy_max)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""Measure how ``OutreachService.reparse_locations`` scales with worker processes.
+
+Usage (from the ``finalmile_coldcall`` directory)::
+
+    python -m benchmarks.bench_reparse_locations [--rows 1000000] [--workers 1 2 4 8]
+        [--chunk-size 2000]
+
+Seeds a table of ``--rows`` posts with varied titles and a stale location,
+then times a dry run (read, parse, diff) for each worker count, followed by
+one real run that writes every changed row back.
+"""
+
+import argparse
+import os
+import random
+import tempfile
+import time
+
+from flask import Flask
+
+from config import Config, config
+from models import db
+from services.outreach_service import OutreachService
+from storage import init_storage
+from benchmarks.fake_reddit import AIRPORTS, CITIES, TITLE_SHAPES
+
+
+def seed(service: OutreachService, rows: int) -> None:
+    rng = random.Random(0)
+    batch = []
+    for i in range(rows):
+        city, abbr, state = rng.choice(CITIES)
+        title = rng.choice(TITLE_SHAPES).format(
+            city=city, abbr=abbr, state=state, airport=rng.choice(AIRPORTS), price=rng.randint(150, 900)
+        ) + f" #{i}"
+        batch.append((title, "Stale", f"user_{i:07d}"))
+        if len(batch) == 50000:
+            service.upsert_posts(batch)
+            db.session.commit()
+            batch = []
+    if batch:
+        service.upsert_posts(batch)
+        db.session.commit()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1000000)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, os.cpu_count() or 1])
+    parser.add_argument("--chunk-size", type=int, default=2000)
+    args = parser.parse_args()
+    Config.LOCATION_CACHE_PATH = ""
+
+    with tempfile.TemporaryDirectory() as tmp:
+        app = Flask(__name__)
+        app.config.from_object(config["default"])
+        app.config["SQLALCHEMY_DATABASE_URI"] = f"sqlite:///{os.path.join(tmp, 'reparse.db')}"
+        init_storage(app)
+        with app.app_context():
+            db.create_all()
+            service = OutreachService()
+            start = time.perf_counter()
+            seed(service, args.rows)
+            print(f"seeded {args.rows:,} rows in {time.perf_counter() - start:.1f}s ({os.cpu_count()} CPUs)")
+
+            baseline = None
+            for workers in sorted(set(args.workers)):
+                start = time.perf_counter()
+                result = service.reparse_locations(workers=workers, chunk_size=args.chunk_size, dry_run=True)
+                elapsed = time.perf_counter() - start
+                baseline = baseline or elapsed
+                print(f"  dry run, {workers:>2} workers  {elapsed:7.2f}s  {result['scanned'] / elapsed:9,.0f} rows/s  "
+                      f"speedup {baseline / elapsed:4.1f}x  {result['changed']:,} changed")
+
+            workers = max(args.workers)
+            start = time.perf_counter()
+            result = service.reparse_locations(workers=workers, chunk_size=args.chunk_size)
+            elapsed = time.perf_counter() - start
+            print(f"  write,   {workers:>2} workers  {elapsed:7.2f}s  {result['scanned'] / elapsed:9,.0f} rows/s  "
+                  f"{result['updated']:,} updated")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""Benchmark replaying the raw-listing archive into the database.
+
+Usage (from the ``finalmile_coldcall`` directory)::
+
+    python -m benchmarks.bench_replay_archive [--days 90] [--pages-per-day 40]
+        [--subreddits 2] [--flair-ratio 0.3] [--archive PATH]
+
+Writes a synthetic archive (``benchmarks.fake_reddit`` listings, one
+partition per subreddit and day) unless ``--archive`` points at a real one,
+then times ``OutreachService.replay_archive`` into a fresh SQLite database
+and again over the now-populated one. Because the input is fixed, the
+numbers are comparable across parser and storage changes.
+"""
+
+import argparse
+import json
+import os
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+
+from flask import Flask
+
+from config import Config, config
+from listing_archive import ListingArchive
+from models import db
+from services.outreach_service import OutreachService
+from storage import init_storage
+from benchmarks.fake_reddit import FakeReddit
+
+PAGE_SIZE = 25
+
+
+def build_archive(archive: ListingArchive, args: argparse.Namespace) -> None:
+    """Archive ``--pages-per-day`` pages per subreddit for each of ``--days`` days."""
+    fake = FakeReddit(args.days * args.pages_per_day * PAGE_SIZE, args.flair_ratio)
+    first_day = datetime.now(timezone.utc) - timedelta(days=args.days)
+    start = time.perf_counter()
+    for day in range(args.days):
+        fetched_at = (first_day + timedelta(days=day)).timestamp()
+        for subreddit in range(args.subreddits):
+            name = f"BenchSub{subreddit}"
+            after = None
+            # Each day continues the listing where the previous day stopped
+            offset = day * args.pages_per_day * PAGE_SIZE
+            if offset:
+                after = fake.post(name, offset - 1)["data"]["name"]
+            for _ in range(args.pages_per_day):
+                page = fake.listing(name, after, PAGE_SIZE)
+                archive.append(name, "new", after, json.dumps(page).encode(), fetched_at)
+                after = page["data"]["after"]
+    elapsed = time.perf_counter() - start
+    stats = archive.stats()
+    print(f"archived {stats['pages_written']:,} pages in {elapsed:.1f}s: "
+          f"{stats['raw_bytes'] / 2 ** 20:.1f} MiB raw, {stats['compressed_bytes'] / 2 ** 20:.1f} MiB gzipped "
+          f"({stats['compression_ratio']}x)")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--days", type=int, default=90)
+    parser.add_argument("--pages-per-day", type=int, default=40)
+    parser.add_argument("--subreddits", type=int, default=2)
+    parser.add_argument("--flair-ratio", type=float, default=0.3)
+    parser.add_argument("--archive", help="replay an existing archive instead of a synthetic one")
+    args = parser.parse_args()
+
+    Config.SUBREDDIT_TARGETS = {f"BenchSub{i}": [Config.TARGET_FLAIR] for i in range(args.subreddits)}
+    Config.LOCATION_CACHE_PATH = ""
+
+    with tempfile.TemporaryDirectory() as tmp:
+        archive = ListingArchive(args.archive or os.path.join(tmp, "archive"))
+        if not args.archive:
+            build_archive(archive, args)
+
+        app = Flask(__name__)
+        app.config.from_object(config["default"])
+        app.config["SQLALCHEMY_DATABASE_URI"] = f"sqlite:///{os.path.join(tmp, 'replay.db')}"
+        init_storage(app)
+        with app.app_context():
+            db.create_all()
+            service = OutreachService()
+            for label in ("empty database", "populated database"):
+                start = time.perf_counter()
+                result = service.replay_archive(archive=archive)
+                elapsed = time.perf_counter() - start
+                print(f"  replay into {label:<18} {elapsed:6.2f}s  {result['pages'] / elapsed:8,.0f} pages/s  "
+                      f"{result['pages'] * PAGE_SIZE / elapsed:9,.0f} posts/s  {result}")
+
+
+if __name__ == "__main__":
+    main()
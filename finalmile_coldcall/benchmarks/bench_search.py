@@ -0,0 +1,135 @@
+"""Benchmark title search: the FTS5 index vs the LIKE scan it replaces.
+
+Usage (from the ``finalmile_coldcall`` directory)::
+
+    python -m benchmarks.bench_search [--rows 1000000] [--repeat 5] [--like-max 200000]
+        [--optimize] [--database-url sqlite:///path/to.db]
+
+Seeds ``outreach_status`` with synthetic first-home titles (the search index
+is kept up to date by its triggers, so the seeding time includes them), then
+times ``OutreachService.search_posts`` for a first page of results with and
+without a status filter. Queries cover a city, a common word, a two-word
+phrase, a prefix and a rare token. The LIKE fallback is timed on the same
+queries while ``--rows`` is at most ``--like-max`` (it matches substrings,
+so its counts differ slightly; only the index's are shown).
+
+Seeding leaves the index in the many segments incremental inserts produce;
+``--optimize`` merges them first, which mostly speeds up prefix queries.
+The synthetic titles are repetitive, so every word matches a large share of
+the table: this is the slow end for ranking.
+"""
+
+import argparse
+import os
+import random
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from flask import Flask
+from sqlalchemy import text
+
+import services.outreach_service as outreach_service
+from config import config
+from models import db, create_search_index
+from services.outreach_service import OutreachService
+
+CITIES = [
+    "Austin, TX", "Reno, NV", "Boise, ID", "Tampa, FL", "Denver, CO", "Columbus, OH",
+    "Raleigh, NC", "Phoenix, AZ", "Nashville, TN", "Portland, OR", "Omaha, NE", "Tucson, AZ",
+]
+HOMES = ["condo", "townhouse", "house", "duplex", "bungalow", "ranch"]
+LOANS = ["FHA loan", "VA loan", "conventional loan", "cash offer", "USDA loan"]
+OPENERS = ["Got the keys", "Closed today", "Offer accepted", "Finally homeowners", "Under contract"]
+
+QUERIES = ['Austin', 'condo', '"VA loan"', 'town', 'Tucson duplex', 'zzrare']
+
+
+def seed(rows: int, batch: int = 20000) -> float:
+    rng = random.Random(0)
+    start_time = datetime(2024, 1, 1)
+    insert_sql = text(
+        "INSERT INTO outreach_status (username, post_title, post_url, location, status, created_at) "
+        "VALUES (:username, :post_title, :post_url, :location, :status, :created_at)"
+    )
+    start = time.perf_counter()
+    for first in range(0, rows, batch):
+        params = []
+        for i in range(first, min(first + batch, rows)):
+            city = rng.choice(CITIES)
+            title = (f"{rng.choice(OPENERS)}! {rng.choice(HOMES)} in {city.split(',')[0]} "
+                     f"with a {rng.choice(LOANS)}")
+            if i % 100000 == 0:
+                title += " zzrare"
+            params.append({
+                'username': f"user_{i:07d}",
+                'post_title': title,
+                'post_url': f"https://www.reddit.com/user/user_{i:07d}/",
+                'location': city,
+                'status': 'Sent' if i % 4 == 0 else 'Not Sent',
+                'created_at': start_time + timedelta(seconds=i),
+            })
+        db.session.execute(insert_sql, params)
+        db.session.commit()
+    return time.perf_counter() - start
+
+
+def best_of(repeat: int, function) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        db.session.expunge_all()
+        start = time.perf_counter()
+        function()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1000000)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--like-max", type=int, default=200000, help="largest table the LIKE scan is timed on")
+    parser.add_argument("--optimize", action="store_true", help="merge the index segments before timing")
+    parser.add_argument("--database-url")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        app = Flask(__name__)
+        app.config.from_object(config['default'])
+        app.config['SQLALCHEMY_DATABASE_URI'] = (
+            args.database_url or f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+        )
+        db.init_app(app)
+        with app.app_context():
+            db.drop_all()
+            db.create_all()
+            create_search_index()
+            seconds = seed(args.rows)
+            print(f"seeded {args.rows:,} rows in {seconds:.1f}s ({args.rows / seconds:,.0f} rows/sec, triggers on)")
+            if args.optimize:
+                start = time.perf_counter()
+                db.session.execute(text("INSERT INTO outreach_status_fts (outreach_status_fts) VALUES ('optimize')"))
+                db.session.commit()
+                print(f"optimized the index in {time.perf_counter() - start:.1f}s")
+
+            service = OutreachService()
+            paths = {"fts": outreach_service.search_index_supported}
+            if args.rows <= args.like_max:
+                paths["like"] = lambda: False
+            print(f"{'query':<16} {'status':<9} {'matches':>9} "
+                  + " ".join(f"{name + ' ms':>9}" for name in paths))
+            for query in QUERIES:
+                for status in ('all', 'Not Sent'):
+                    timings = []
+                    for name, supported in paths.items():
+                        outreach_service.search_index_supported = supported
+                        if name == "fts":
+                            total = service.search_posts(query, status).total
+                        timings.append(best_of(args.repeat, lambda: service.search_posts(query, status)))
+                    outreach_service.search_index_supported = paths["fts"]
+                    print(f"{query:<16} {status:<9} {total:>9,} "
+                          + " ".join(f"{seconds * 1000:>9.1f}" for seconds in timings))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,325 @@
+"""Offline stand-in for Reddit's public listing JSON.
+
+Usage (from the ``finalmile_coldcall`` directory)::
+
+    python -m benchmarks.fake_reddit [--port 8765] [--posts 2000] [--flair-ratio 0.3]
+        [--latency-ms 0] [--jitter-ms 0] [--rate-limit-ratio 0] [--retry-after 1] [--full-posts]
+
+then run the app with ``REDDIT_BASE_URL=http://127.0.0.1:8765``.
+
+``GET /r/<subreddit>/<sort>.json`` returns a listing page shaped like
+Reddit's (``data.children[].data`` with ``name``, ``created_utc``, ``title``,
+``selftext``, ``author`` and ``link_flair_text``, plus ``data.after``). Every
+subreddit holds ``--posts`` synthetic posts, newest first, generated
+deterministically from the post's position so pagination is stable across
+requests and runs. ``limit`` (default 25, max 100) and ``after`` behave like
+Reddit's. Each request can be delayed, and a share of requests answered with
+429 and ``Retry-After`` to exercise the fetch scheduler. Listings carry an
+``ETag`` and answer a matching ``If-None-Match`` with ``304 Not Modified``. With
+``--full-posts`` every post also carries the ~100 other fields Reddit sends
+(URLs, vote counts, award lists, a preview with resolutions, ...), so pages
+are about the size of real ones.
+"""
+
+import argparse
+import json
+import random
+import threading
+import time
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+CITIES = [
+    ("Reno", "NV", "Nevada"), ("Austin", "TX", "Texas"), ("Denver", "CO", "Colorado"),
+    ("Columbus", "OH", "Ohio"), ("Raleigh", "NC", "North Carolina"), ("Boise", "ID", "Idaho"),
+    ("Tampa", "FL", "Florida"), ("Spokane", "WA", "Washington"), ("Omaha", "NE", "Nebraska"),
+    ("Salt Lake City", "UT", "Utah"), ("Grand Rapids", "MI", "Michigan"), ("Tucson", "AZ", "Arizona"),
+]
+AIRPORTS = ["RNO", "DFW", "ATL", "PDX", "BNA", "MSP"]
+
+# Title shapes seen on r/FirstTimeHomeBuyer, from easy to parse to no location at all
+TITLE_SHAPES = [
+    "Got the keys! {city}, {abbr} ${price}k",
+    "Closed today in {city} {abbr} {price}k at 6.1%",
+    "{city}, {state} $ {price}k first home!!",
+    "First time buyer - {city} {state} ${price}k",
+    "We did it ({airport}) - {price}k townhouse",
+    "After 2 years of looking we finally closed",
+]
+OTHER_FLAIRS = ["Need Advice", "Rant", "Question", None]
+TARGET_FLAIR = "GOT THE KEY"
+
+# Fields a real listing carries on every post besides the ones the scraper reads
+FULL_POST_FIELDS: Dict[str, Any] = {
+    "approved_at_utc": None, "approved_by": None, "archived": False, "author_flair_background_color": None,
+    "author_flair_css_class": None, "author_flair_richtext": [], "author_flair_template_id": None,
+    "author_flair_text": None, "author_flair_text_color": None, "author_flair_type": "text",
+    "author_is_blocked": False, "author_patreon_flair": False, "author_premium": False,
+    "allow_live_comments": False, "all_awardings": [], "awarders": [], "banned_at_utc": None,
+    "banned_by": None, "can_gild": False, "can_mod_post": False, "category": None, "clicked": False,
+    "content_categories": None, "contest_mode": False, "discussion_type": None, "distinguished": None,
+    "domain": "self.FirstTimeHomeBuyer", "downs": 0, "edited": False, "gilded": 0, "gildings": {},
+    "hidden": False, "hide_score": False, "is_created_from_ads_ui": False, "is_crosspostable": True,
+    "is_meta": False, "is_original_content": False, "is_reddit_media_domain": False, "is_robot_indexable": True,
+    "is_self": True, "is_video": False, "likes": None, "link_flair_background_color": "#46d160",
+    "link_flair_css_class": None, "link_flair_template_id": "7e5a3c2e-0000-11ec-9d3b-0e8d8c1b4f47",
+    "link_flair_text_color": "dark", "link_flair_type": "richtext", "locked": False, "media": None,
+    "media_embed": {}, "media_only": False, "mod_note": None, "mod_reason_by": None, "mod_reason_title": None,
+    "mod_reports": [], "no_follow": False, "num_crossposts": 0, "num_reports": None, "over_18": False,
+    "parent_whitelist_status": "all_ads", "pinned": False, "post_hint": "image", "pwls": 6, "quarantine": False,
+    "removal_reason": None, "removed_by": None, "removed_by_category": None, "report_reasons": None,
+    "saved": False, "secure_media": None, "secure_media_embed": {}, "send_replies": True, "spoiler": False,
+    "stickied": False, "subreddit_id": "t5_2sqvd", "subreddit_name_prefixed": "r/FirstTimeHomeBuyer",
+    "subreddit_subscribers": 612345, "subreddit_type": "public", "suggested_sort": None,
+    "thumbnail": "self", "thumbnail_height": None, "thumbnail_width": None, "top_awarded_type": None,
+    "total_awards_received": 0, "treatment_tags": [], "ups": 0, "upvote_ratio": 0.97, "user_reports": [],
+    "view_count": None, "visited": False, "whitelist_status": "all_ads", "wls": 6,
+}
+PREVIEW_WIDTHS = [108, 216, 320, 640, 960, 1080]
+
+# Fullnames encode the post's position so ``after`` can be decoded without state
+POSITIONS_PER_SUBREDDIT = 10 ** 7
+BASE36 = "0123456789abcdefghijklmnopqrstuvwxyz"
+
+
+def to_base36(number: int) -> str:
+    digits = ""
+    while True:
+        number, remainder = divmod(number, 36)
+        digits = BASE36[remainder] + digits
+        if not number:
+            return digits
+
+
+class FakeReddit:
+    """Synthetic subreddits and the failure modes to inject while serving them."""
+
+    def __init__(
+        self,
+        posts_per_subreddit: int = 2000,
+        flair_ratio: float = 0.3,
+        latency_ms: float = 0.0,
+        jitter_ms: float = 0.0,
+        rate_limit_ratio: float = 0.0,
+        retry_after: float = 1.0,
+        seed: int = 0,
+        full_posts: bool = False,
+    ):
+        """
+        Args:
+            posts_per_subreddit: Length of every listing.
+            flair_ratio: Share of posts flaired with the target flair.
+            latency_ms: Delay added to every response.
+            jitter_ms: Random extra delay, uniform in [0, jitter_ms].
+            rate_limit_ratio: Share of requests answered with 429.
+            retry_after: Retry-After seconds sent with a 429.
+            seed: Varies the generated posts.
+            full_posts: Add every other field a real listing carries.
+        """
+        self.posts_per_subreddit = posts_per_subreddit
+        self.flair_ratio = flair_ratio
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.rate_limit_ratio = rate_limit_ratio
+        self.retry_after = retry_after
+        self.seed = seed
+        self.full_posts = full_posts
+        self.started = time.time()
+        self._lock = threading.Lock()
+        self._random = random.Random(seed)
+        self.requests = 0
+        self.throttled = 0
+        self.not_modified = 0
+
+    def _subreddit_id(self, subreddit: str) -> int:
+        return zlib.crc32(subreddit.lower().encode()) % 1000
+
+    def post(self, subreddit: str, position: int) -> Dict[str, Any]:
+        """Build the post at ``position`` (0 is the newest) of a subreddit's listing."""
+        subreddit_id = self._subreddit_id(subreddit)
+        rng = random.Random(f"{self.seed}:{subreddit_id}:{position}")
+        city, abbr, state = rng.choice(CITIES)
+        title = rng.choice(TITLE_SHAPES).format(
+            city=city, abbr=abbr, state=state, airport=rng.choice(AIRPORTS), price=rng.randint(150, 900)
+        )
+        flair = TARGET_FLAIR if rng.random() < self.flair_ratio else rng.choice(OTHER_FLAIRS)
+        post_id = to_base36(subreddit_id * POSITIONS_PER_SUBREDDIT + position)
+        data = {
+            "name": "t3_" + post_id,
+            "created_utc": float(int(self.started) - position * 60),
+            "title": title,
+            "selftext": "Long story short, we are homeowners. " * rng.randint(1, 8),
+            "author": f"u{subreddit_id:03d}_{position:07d}",
+            "link_flair_text": flair,
+            "subreddit": subreddit,
+            "num_comments": rng.randint(0, 200),
+            "score": rng.randint(0, 2000),
+        }
+        if self.full_posts:
+            data.update(self._full_fields(subreddit, post_id, title, flair, data["created_utc"]))
+        return {"kind": "t3", "data": data}
+
+    def _full_fields(self, subreddit: str, post_id: str, title: str, flair: Optional[str],
+                     created_utc: float) -> Dict[str, Any]:
+        """Build the fields only ``full_posts`` listings carry."""
+        slug = "_".join(title.lower().split())[:50]
+        image = f"https://preview.redd.it/{post_id}.jpg"
+        return {
+            **FULL_POST_FIELDS,
+            "id": post_id,
+            "created": created_utc,
+            "permalink": f"/r/{subreddit}/comments/{post_id}/{slug}/",
+            "url": f"https://www.reddit.com/r/{subreddit}/comments/{post_id}/{slug}/",
+            "link_flair_richtext": [{"e": "text", "t": flair}] if flair else [],
+            "selftext_html": "&lt;!-- SC_OFF --&gt;&lt;div class=\"md\"&gt;&lt;p&gt;"
+                             + title + "&lt;/p&gt;&lt;/div&gt;&lt;!-- SC_ON --&gt;",
+            "title_html": None,
+            "preview": {
+                "images": [{
+                    "source": {"url": f"{image}?width=3024&amp;format=pjpg&amp;auto=webp", "width": 3024, "height": 4032},
+                    "resolutions": [
+                        {"url": f"{image}?width={width}&amp;crop=smart&amp;auto=webp", "width": width,
+                         "height": width * 4 // 3}
+                        for width in PREVIEW_WIDTHS
+                    ],
+                    "variants": {},
+                    "id": f"img{post_id}",
+                }],
+                "enabled": False,
+            },
+        }
+
+    def listing(self, subreddit: str, after: Optional[str], limit: int) -> Dict[str, Any]:
+        """Build one listing page starting after the fullname ``after``."""
+        start = 0
+        if after:
+            start = int(after.split("_", 1)[1], 36) % POSITIONS_PER_SUBREDDIT + 1
+        end = min(start + limit, self.posts_per_subreddit)
+        children = [self.post(subreddit, position) for position in range(start, end)]
+        return {
+            "kind": "Listing",
+            "data": {
+                "after": children[-1]["data"]["name"] if children and end < self.posts_per_subreddit else None,
+                "before": None,
+                "dist": len(children),
+                "children": children,
+            },
+        }
+
+    def next_response(self) -> Tuple[bool, float]:
+        """Count a request and decide (throttle it?, delay seconds)."""
+        with self._lock:
+            self.requests += 1
+            throttle = self._random.random() < self.rate_limit_ratio
+            if throttle:
+                self.throttled += 1
+            delay = (self.latency_ms + self._random.uniform(0, self.jitter_ms)) / 1000
+        return throttle, delay
+
+    def note_not_modified(self) -> None:
+        with self._lock:
+            self.not_modified += 1
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"requests": self.requests, "throttled": self.throttled, "not_modified": self.not_modified}
+
+
+def make_handler(fake: FakeReddit):
+    """Build a request handler class bound to ``fake``."""
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_GET(self):
+            url = urlsplit(self.path)
+            parts = url.path.strip("/").split("/")
+            if len(parts) != 3 or parts[0] != "r" or not parts[2].endswith(".json"):
+                return self._send(404, {"message": "Not Found", "error": 404})
+
+            throttle, delay = fake.next_response()
+            if delay:
+                time.sleep(delay)
+            if throttle:
+                return self._send(429, {"message": "Too Many Requests", "error": 429},
+                                  {"Retry-After": f"{fake.retry_after:g}"})
+
+            query = parse_qs(url.query)
+            limit = max(1, min(int(query.get("limit", ["25"])[0]), 100))
+            after = query.get("after", [None])[0]
+            payload = json.dumps(fake.listing(parts[1], after, limit)).encode()
+            etag = f'"{zlib.crc32(payload):08x}"'
+            if self.headers.get("If-None-Match") == etag:
+                fake.note_not_modified()
+                self.send_response(304)
+                self.send_header("ETag", etag)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+            self._send(200, payload, {"ETag": etag})
+
+        def _send(self, status: int, body: Any, headers: Optional[Dict[str, str]] = None):
+            payload = body if isinstance(body, bytes) else json.dumps(body).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json; charset=UTF-8")
+            self.send_header("Content-Length", str(len(payload)))
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+
+def serve(fake: FakeReddit, host: str = "127.0.0.1", port: int = 0) -> ThreadingHTTPServer:
+    """
+    Serve ``fake`` from a daemon thread.
+
+    Args:
+        fake: Listing generator to serve.
+        host: Interface to bind.
+        port: Port to bind; 0 picks a free one.
+
+    Returns:
+        The running server; its base URL is ``http://host:server.server_port``.
+        Call ``shutdown()`` to stop it.
+    """
+    server = ThreadingHTTPServer((host, port), make_handler(fake))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="fake-reddit", daemon=True).start()
+    return server
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--posts", type=int, default=2000, help="posts per subreddit")
+    parser.add_argument("--flair-ratio", type=float, default=0.3)
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--jitter-ms", type=float, default=0.0)
+    parser.add_argument("--rate-limit-ratio", type=float, default=0.0)
+    parser.add_argument("--retry-after", type=float, default=1.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--full-posts", action="store_true", help="include every field Reddit sends")
+    args = parser.parse_args()
+
+    fake = FakeReddit(
+        args.posts, args.flair_ratio, args.latency_ms, args.jitter_ms,
+        args.rate_limit_ratio, args.retry_after, args.seed, args.full_posts,
+    )
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(fake))
+    print(f"Serving fake Reddit on http://{args.host}:{server.server_port} (Ctrl+C to stop)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print(f"\n{fake.stats()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+"""Load-test the SQLite storage profiles with concurrent dashboard reads and status writes.
+
+Usage (from the ``finalmile_coldcall`` directory)::
+
+    python -m benchmarks.load_sqlite_profile [--profiles default production]
+        [--threads 8] [--seconds 10] [--write-ratio 0.2] [--posts 5000]
+
+Each profile gets a fresh database file seeded with ``--posts`` posts. Worker
+threads then loop for ``--seconds``: a read renders what the dashboard needs
+(one page of posts and the statistics), a write marks a random user as sent
+or not sent. Throughput, latency percentiles and failed operations ("database
+is locked") are reported per profile.
+"""
+
+import argparse
+import os
+import random
+import tempfile
+import threading
+import time
+from typing import Dict, List
+
+from flask import Flask
+
+from config import config
+from models import db
+from services.outreach_service import OutreachService
+from storage import init_storage, pragma_values
+
+
+def percentile(samples: List[float], fraction: float) -> float:
+    """Return the ``fraction`` percentile of ``samples`` in milliseconds."""
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))] * 1000
+
+
+def make_app(profile: str, path: str) -> Flask:
+    """Build a bare app on ``path`` using ``profile``."""
+    app = Flask(__name__)
+    app.config.from_object(config['default'])
+    app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{path}"
+    app.config['SQLITE_PROFILE'] = profile
+    init_storage(app)
+    return app
+
+
+def seed(app: Flask, size: int) -> List[str]:
+    """Load ``size`` synthetic posts and return their usernames."""
+    posts = [(f"Got the keys! Reno, NV #{i}", "Reno, NV", f"user_{i:07d}") for i in range(size)]
+    with app.app_context():
+        db.create_all()
+        service = OutreachService()
+        service.upsert_posts(posts)
+        db.session.commit()
+        service.reconcile_counters()
+    return [username for _, _, username in posts]
+
+
+def worker(app: Flask, usernames: List[str], write_ratio: float, deadline: float,
+           results: Dict[str, List], lock: threading.Lock) -> None:
+    service = OutreachService()
+    reads: List[float] = []
+    writes: List[float] = []
+    errors = 0
+    rng = random.Random()
+    with app.app_context():
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            try:
+                if rng.random() < write_ratio:
+                    username = rng.choice(usernames)
+                    if rng.random() < 0.5:
+                        service.mark_as_sent(username)
+                    else:
+                        service.mark_as_not_sent(username)
+                    writes.append(time.perf_counter() - start)
+                else:
+                    service.get_posts_page(rng.choice([None, 'Sent', 'Not Sent']), per_page=20)
+                    service.get_statistics()
+                    db.session.rollback()  # end the read transaction like a request would
+                    reads.append(time.perf_counter() - start)
+            except Exception:
+                db.session.rollback()
+                errors += 1
+        db.session.remove()
+    with lock:
+        results['reads'].extend(reads)
+        results['writes'].extend(writes)
+        results['errors'].append(errors)
+
+
+def run(profile: str, args: argparse.Namespace, tmp: str) -> None:
+    path = os.path.join(tmp, f"{profile}.db")
+    app = make_app(profile, path)
+    usernames = seed(app, args.posts)
+    with app.app_context(), db.engine.connect() as connection:
+        pragmas = pragma_values(connection)
+
+    results: Dict[str, List] = {'reads': [], 'writes': [], 'errors': []}
+    lock = threading.Lock()
+    deadline = time.perf_counter() + args.seconds
+    threads = [
+        threading.Thread(target=worker, args=(app, usernames, args.write_ratio, deadline, results, lock))
+        for _ in range(args.threads)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    reads, writes, errors = results['reads'], results['writes'], sum(results['errors'])
+    print(f"{profile}: {pragmas}")
+    print(f"  reads   {len(reads) / args.seconds:>8,.0f}/s  p50 {percentile(reads, 0.5):7.2f}ms"
+          f"  p95 {percentile(reads, 0.95):7.2f}ms")
+    print(f"  writes  {len(writes) / args.seconds:>8,.0f}/s  p50 {percentile(writes, 0.5):7.2f}ms"
+          f"  p95 {percentile(writes, 0.95):7.2f}ms")
+    print(f"  failed  {errors}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--profiles", nargs="+", default=["default", "production"])
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--write-ratio", type=float, default=0.2)
+    parser.add_argument("--posts", type=int, default=5000)
+    args = parser.parse_args()
+
+    print(f"{args.threads} threads, {args.seconds:g}s per profile, {args.write_ratio:.0%} writes, {args.posts:,} posts")
+    with tempfile.TemporaryDirectory() as tmp:
+        for profile in args.profiles:
+            run(profile, args, tmp)
+
+
+if __name__ == "__main__":
+    main()
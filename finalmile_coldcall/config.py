@@ -8,14 +8,117 @@ class Config:
     SECRET_KEY = os.environ.get('SECRET_KEY') or 'your-secret-key-change-in-production'
     SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL') or 'sqlite:///reddit_outreach.db'
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+    # SQLite storage profile: 'default' (driver defaults) or 'production'
+    # (WAL, tuned pragmas, sized pool); see storage.py
+    SQLITE_PROFILE = os.environ.get('SQLITE_PROFILE', 'default')
+    SQLITE_POOL_SIZE = 10
+    SQLITE_POOL_OVERFLOW = 10
     
     # Reddit scraping settings
+    # Root URL for listings; point at benchmarks/fake_reddit.py to run offline
+    REDDIT_BASE_URL = os.environ.get('REDDIT_BASE_URL', 'https://www.reddit.com')
     SUBREDDIT_NAME = 'FirstTimeHomeBuyer'
     TARGET_FLAIR = 'GOT THE KEY'
+    SUBREDDIT_SORT = 'new'
     MAX_POSTS_TO_FETCH = 50
+    # Phrases (case-insensitive) that mark a post as a lead, with weights. A
+    # post is a lead when the weights of the phrases found in its flair,
+    # title and body add up to MATCH_MIN_SCORE, so weaker phrases only count
+    # together with another hit.
+    TARGET_PHRASES = {
+        TARGET_FLAIR: 1.0,
+        'closed today': 1.0,
+        'closed on our': 1.0,
+        'closing day': 1.0,
+        'just closed': 1.0,
+        'we closed': 1.0,
+        'keys in hand': 1.0,
+        'officially homeowners': 1.0,
+        'officially a homeowner': 1.0,
+        'new homeowners': 0.5,
+        'first home': 0.5,
+        'signed the papers': 0.5,
+        'moving in': 0.5,
+    }
+    MATCH_MIN_SCORE = 1.0
+    # Listings scraped concurrently on each refresh: subreddit -> phrases
+    # matched against flair, title and body (a list, or phrase -> weight)
+    SUBREDDIT_TARGETS = {
+        SUBREDDIT_NAME: TARGET_PHRASES,
+    }
+    HTTP_MAX_CONNECTIONS = 10
+    HTTP_PER_HOST_LIMIT = 4
+    # Global Reddit request budget; 429s and 5xx responses are retried with
+    # jittered exponential backoff up to REDDIT_MAX_RETRIES times
+    REDDIT_REQUESTS_PER_MINUTE = int(os.environ.get('REDDIT_REQUESTS_PER_MINUTE', 30))
+    REDDIT_REQUEST_BURST = 5
+    REDDIT_MAX_RETRIES = 4
+    # Higher-priority subreddits are served first when requests queue for
+    # the budget; busy subreddits are boosted automatically
+    SUBREDDIT_PRIORITIES = {
+        SUBREDDIT_NAME: 1,
+    }
+    # Match limit for backfill runs, which walk past the high-water mark
+    BACKFILL_MAX_POSTS = 500
+    # Refresh pipeline: pages buffered between the fetch, parse and write
+    # stages, the most posts upserted per committed chunk, and how long a
+    # chunk may wait to fill before it is committed anyway
+    REFRESH_QUEUE_SIZE = 8
+    REFRESH_WRITE_CHUNK_SIZE = 500
+    REFRESH_WRITE_INTERVAL_SECONDS = 0.5
+    # Refreshes skip posts whose title is the one stored for their author,
+    # checked against an in-memory filter of 12 bytes per username (120 MB at
+    # 10M, see known_posts.py); it loads the newest posts up to this many
+    # (0 disables)
+    KNOWN_POSTS_MAX_ENTRIES = int(os.environ.get('KNOWN_POSTS_MAX_ENTRIES', 10000000))
+    
+    # Background refresh worker: how often it checks for queued jobs, and
+    # how long a job may stay running before it is marked failed
+    REFRESH_WORKER_POLL_SECONDS = 5
+    REFRESH_JOB_TIMEOUT_SECONDS = 600
+    # A running job renews a lease of this many seconds; a job whose lease
+    # lapsed belongs to a process that died, and is marked failed
+    REFRESH_JOB_LEASE_SECONDS = 30
+    # Refresh requests within this many seconds of the last successful
+    # refresh reuse its result instead of scraping again
+    REFRESH_MIN_INTERVAL_SECONDS = int(os.environ.get('REFRESH_MIN_INTERVAL_SECONDS', 60))
+    
+    # Raw listing pages are appended here, gzipped and partitioned by UTC
+    # day, so they can be replayed later (empty disables the archive)
+    LISTING_ARCHIVE_PATH = os.environ.get('LISTING_ARCHIVE_PATH', 'listing_archive')
+    
+    # Listing responses are served from this cache for HTTP_CACHE_TTL_SECONDS
+    # (or a per-subreddit TTL), then revalidated with ETag/Last-Modified when
+    # Reddit sent them; bodies beyond HTTP_CACHE_MAX_BYTES are evicted least
+    # recently used first (empty path disables the cache)
+    HTTP_CACHE_PATH = os.environ.get('HTTP_CACHE_PATH', 'http_cache.db')
+    HTTP_CACHE_TTL_SECONDS = float(os.environ.get('HTTP_CACHE_TTL_SECONDS', 60))
+    HTTP_CACHE_TTLS = {}
+    HTTP_CACHE_MAX_BYTES = 64 * 2 ** 20
+    
+    # Location parse cache (empty path keeps it in memory only)
+    LOCATION_CACHE_PATH = os.environ.get('LOCATION_CACHE_PATH', 'location_cache.db')
+    LOCATION_CACHE_SIZE = 10000
+    # Compiled US places index (`flask build-gazetteer`); the parser resolves
+    # place names against it when the file exists
+    GAZETTEER_PATH = os.environ.get('GAZETTEER_PATH', str(Path(__file__).parent / 'data' / 'us_places.idx'))
     
     # Dashboard settings
     POSTS_PER_PAGE = 20
+    # Most usernames accepted by one batch status update
+    MAX_BATCH_SIZE = 1000
+    # Search ranks (and pages through) only the newest SEARCH_RANK_WINDOW
+    # matches, and counts matches up to SEARCH_COUNT_LIMIT
+    SEARCH_RANK_WINDOW = 1000
+    SEARCH_COUNT_LIMIT = 10000
+    # Most results returned by one /search request
+    SEARCH_MAX_LIMIT = 1000
+    # Most cities listed in the location facet
+    FACET_CITY_LIMIT = 50
+    # Profile-link clicks are buffered and written together every
+    # AUTO_MARK_FLUSH_MS milliseconds, or sooner once this many are waiting
+    AUTO_MARK_FLUSH_MS = int(os.environ.get('AUTO_MARK_FLUSH_MS', 250))
+    AUTO_MARK_FLUSH_MAX_EVENTS = 50
     
     # Message template
     DEFAULT_MESSAGE = """Hey!
@@ -34,6 +137,7 @@ class DevelopmentConfig(Config):
 class ProductionConfig(Config):
     """Production configuration."""
     DEBUG = False
+    SQLITE_PROFILE = os.environ.get('SQLITE_PROFILE', 'production')
 
 
 config = {
@@ -2,7 +2,8 @@
 
 import us
 
-# Regex patterns for extracting city/state from titles
+# Regex patterns for extracting city/state from titles (the original cascade;
+# location_parser implements the same shapes without regex backtracking)
 LOCATION_PATTERNS = [
     r"([A-Za-z\s]+?),\s*([A-Z]{2})\b",         # City, ST
     r"([A-Za-z\s]+?)\s+([A-Z]{2})\b",          # City ST (word boundary)
@@ -125,6 +126,9 @@ KNOWN_CITIES = [
     "Manchester", "South Windsor", "Glastonbury", "Farmington", "Enfield", "Vernon",
 ]
 
+# Root of the public Reddit JSON listings
+REDDIT_BASE_URL = "https://www.reddit.com"
+
 # Default request headers for Reddit API
 REQUEST_HEADERS = {
     "User-Agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/131.0.0.0 Safari/537.36"
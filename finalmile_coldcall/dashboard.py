@@ -1,16 +1,18 @@
 """Flask dashboard for Reddit outreach tracking."""
 
-from flask import Flask, render_template, request, redirect, url_for, flash, jsonify
-from models import db, OutreachStatus, MessageTemplate
+from flask import Flask, render_template, request, redirect, url_for, flash, jsonify, abort
+from models import db, MessageTemplate
 from scrape_reddit import get_recent_posts_with_user_and_location
+from services.outreach_service import OutreachService
 import os
 
 app = Flask(__name__)
 app.config['SECRET_KEY'] = 'your-secret-key-change-in-production'
-app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///reddit_outreach.db'
+app.config['SQLALCHEMY_DATABASE_URI'] = os.environ.get('DATABASE_URL') or 'sqlite:///reddit_outreach.db'
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 
 db.init_app(app)
+outreach_service = OutreachService()
 
 # Default message template
 DEFAULT_MESSAGE = """Hey!
@@ -21,9 +23,11 @@ If you're up for it, I'd love to have a quick 15 minute chat sometime this week.
 @app.route('/')
 def dashboard():
     """Main dashboard showing posts and outreach status."""
-    page = request.args.get('page', 1, type=int)
     per_page = 20
     status_filter = request.args.get('status', 'all')
+    search_query = request.args.get('q', '').strip()
+    state = request.args.get('state', '').strip().upper()
+    city = request.args.get('city', '').strip()
     auto_refresh = request.args.get('auto_refresh', 'false')
     
     # Auto-refresh posts on first load
@@ -35,47 +39,55 @@ def dashboard():
                 max_posts=50
             )
             
-            new_posts_count = 0
-            updated_posts_count = 0
-            
-            for title, location, username in reddit_posts:
-                existing = OutreachStatus.query.filter_by(username=username).first()
-                post_url = f"https://www.reddit.com/user/{username}/"
-                
-                if existing:
-                    if existing.post_title != title:
-                        existing.post_title = title
-                        existing.location = location
-                        updated_posts_count += 1
-                else:
-                    new_post = OutreachStatus(
-                        username=username,
-                        post_title=title,
-                        post_url=post_url,
-                        location=location,
-                        status='Not Sent'
-                    )
-                    db.session.add(new_post)
-                    new_posts_count += 1
-            
+            result = outreach_service.upsert_posts(reddit_posts)
             db.session.commit()
-            flash(f'Auto-refreshed: Added {new_posts_count} new posts, updated {updated_posts_count}.', 'success')
+            flash(f'Auto-refreshed: Added {result["new_posts"]} new posts, updated {result["updated_posts"]}.', 'success')
             
         except Exception as e:
             flash(f'Auto-refresh error: {str(e)}', 'error')
     
-    query = OutreachStatus.query.order_by(OutreachStatus.created_at.desc())
-    
-    if status_filter != 'all':
-        query = query.filter_by(status=status_filter)
-    
-    posts = query.paginate(page=page, per_page=per_page, error_out=False)
+    after = request.args.get('after')
+    before = request.args.get('before')
+    try:
+        if search_query:
+            # Search results page by offset; the cursors are offsets
+            posts = outreach_service.search_posts(
+                search_query, status_filter, per_page, int(after or before or 0), state=state, city=city
+            )
+        else:
+            posts = outreach_service.get_posts_page(
+                status_filter, per_page, after=after, before=before, state=state, city=city
+            )
+    except ValueError as e:
+        flash(str(e), 'error')
+        if search_query:
+            posts = outreach_service.search_posts(search_query, status_filter, per_page, state=state, city=city)
+        else:
+            posts = outreach_service.get_posts_page(status_filter, per_page, state=state, city=city)
+    facets = outreach_service.get_location_facets(status_filter, state or None)
     
     # Get active message template
     template = MessageTemplate.query.filter_by(is_active=True).first()
     message_content = template.content if template else DEFAULT_MESSAGE
     
-    return render_template('dashboard.html', posts=posts, message_content=message_content, status_filter=status_filter)
+    # Search stops counting at SEARCH_COUNT_LIMIT
+    total_label = posts.total
+    if search_query and posts.total >= outreach_service.config.SEARCH_COUNT_LIMIT:
+        total_label = f'{posts.total}+'
+    
+    return render_template(
+        'dashboard.html',
+        posts=posts,
+        total_label=total_label,
+        message_content=message_content,
+        status_filter=status_filter,
+        search_query=search_query,
+        state=state,
+        city=city,
+        facets=facets,
+        # Query arguments every tab and page link keeps
+        filter_args={key: value for key, value in (('q', search_query), ('state', state), ('city', city)) if value}
+    )
 
 @app.route('/refresh_posts')
 def refresh_posts():
@@ -88,36 +100,10 @@ def refresh_posts():
             max_posts=50
         )
         
-        new_posts_count = 0
-        updated_posts_count = 0
-        
-        for title, location, username in reddit_posts:
-            # Check if user already exists
-            existing = OutreachStatus.query.filter_by(username=username).first()
-            
-            post_url = f"https://www.reddit.com/user/{username}/"
-            
-            if existing:
-                # Update existing record if post title changed
-                if existing.post_title != title:
-                    existing.post_title = title
-                    existing.location = location
-                    updated_posts_count += 1
-            else:
-                # Create new record
-                new_post = OutreachStatus(
-                    username=username,
-                    post_title=title,
-                    post_url=post_url,
-                    location=location,
-                    status='Not Sent'
-                )
-                db.session.add(new_post)
-                new_posts_count += 1
-        
+        result = outreach_service.upsert_posts(reddit_posts)
         db.session.commit()
         
-        flash(f'Successfully added {new_posts_count} new posts and updated {updated_posts_count} existing posts.', 'success')
+        flash(f'Successfully added {result["new_posts"]} new posts and updated {result["updated_posts"]} existing posts.', 'success')
         
     except Exception as e:
         flash(f'Error refreshing posts: {str(e)}', 'error')
@@ -127,42 +113,23 @@ def refresh_posts():
 @app.route('/mark_sent/<username>')
 def mark_sent(username):
     """Mark a user as having been contacted."""
-    user_status = OutreachStatus.query.filter_by(username=username).first_or_404()
-    user_status.mark_as_sent()
+    if not outreach_service.mark_as_sent(username):
+        abort(404)
     flash(f'Marked {username} as sent.', 'success')
     return redirect(url_for('dashboard'))
 
 @app.route('/mark_not_sent/<username>')
 def mark_not_sent(username):
     """Mark a user as not sent (undo)."""
-    user_status = OutreachStatus.query.filter_by(username=username).first_or_404()
-    user_status.status = 'Not Sent'
-    user_status.sent_at = None
-    db.session.commit()
+    if not outreach_service.mark_as_not_sent(username):
+        abort(404)
     flash(f'Marked {username} as not sent.', 'info')
     return redirect(url_for('dashboard'))
 
 @app.route('/stats')
 def stats():
     """Show outreach statistics."""
-    total_posts = OutreachStatus.query.count()
-    sent_posts = OutreachStatus.query.filter_by(status='Sent').count()
-    not_sent_posts = OutreachStatus.query.filter_by(status='Not Sent').count()
-    
-    # Get unique locations
-    locations = db.session.query(OutreachStatus.location).filter(
-        OutreachStatus.location != 'Unknown',
-        OutreachStatus.location.isnot(None)
-    ).distinct().all()
-    location_count = len(locations)
-    
-    return jsonify({
-        'total_posts': total_posts,
-        'sent_posts': sent_posts,
-        'not_sent_posts': not_sent_posts,
-        'unique_locations': location_count,
-        'sent_percentage': round((sent_posts / total_posts * 100) if total_posts > 0 else 0, 1)
-    })
+    return jsonify(outreach_service.get_statistics())
 
 @app.cli.command()
 def init_db():
@@ -179,6 +146,7 @@ def init_db():
         db.session.add(default_template)
         db.session.commit()
     
+    outreach_service.reconcile_counters()
     print('Database initialized successfully!')
 
 if __name__ == '__main__':
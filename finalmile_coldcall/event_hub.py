@@ -0,0 +1,147 @@
+"""In-process fan-out of dashboard events to Server-Sent Events streams.
+
+Services publish an event once after the change is committed; every open
+``/events`` stream receives it from its own bounded queue. A short history is
+kept so a reconnecting browser can resume from its ``Last-Event-ID``. A
+subscriber that falls too far behind is sent a single ``resync`` event
+instead of an unbounded backlog.
+"""
+
+import queue
+import threading
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional, Set, Tuple
+
+Event = Tuple[int, str, Any]
+
+
+class Subscription:
+    """One stream's view of the hub."""
+
+    def __init__(self, max_queue: int):
+        self._queue: "queue.Queue[Event]" = queue.Queue(max_queue)
+        self._overflowed = threading.Event()
+
+    def put(self, event: Event) -> bool:
+        """Queue an event; returns False if the subscriber has fallen behind."""
+        if self._overflowed.is_set():
+            return False
+        try:
+            self._queue.put_nowait(event)
+            return True
+        except queue.Full:
+            self._overflowed.set()
+            return False
+
+    def get(self, timeout: Optional[float] = None) -> Optional[Event]:
+        """
+        Wait for the next event.
+
+        Returns:
+            (id, name, data), a ``resync`` event after an overflow, or None
+            if nothing arrived within ``timeout``
+        """
+        if self._overflowed.is_set():
+            self._overflowed.clear()
+            with self._queue.mutex:
+                self._queue.queue.clear()
+            return (0, 'resync', {})
+        try:
+            return self._queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+
+class EventHub:
+    """Thread-safe publish/subscribe hub."""
+
+    def __init__(self, max_queue: int = 100, history: int = 200):
+        """
+        Args:
+            max_queue: Events buffered per subscriber before it must resync.
+            history: Recent events kept for ``Last-Event-ID`` replay.
+        """
+        self.max_queue = max_queue
+        self._history: Deque[Event] = deque(maxlen=history)
+        self._subscribers: Set[Subscription] = set()
+        self._lock = threading.Lock()
+        self._last_id = 0
+        self.published = 0
+        self.dropped = 0
+
+    def publish(self, name: str, data: Any) -> int:
+        """
+        Broadcast an event to every subscriber.
+
+        Args:
+            name: SSE event name, e.g. 'stats'
+            data: JSON-serializable payload
+
+        Returns:
+            Id assigned to the event
+        """
+        with self._lock:
+            self._last_id += 1
+            event = (self._last_id, name, data)
+            self._history.append(event)
+            self.published += 1
+            for subscription in self._subscribers:
+                if not subscription.put(event):
+                    self.dropped += 1
+            return self._last_id
+
+    def subscribe(self, last_event_id: Optional[int] = None) -> Subscription:
+        """
+        Open a subscription, replaying events after ``last_event_id``.
+
+        Args:
+            last_event_id: Id of the last event the client saw, if reconnecting
+
+        Returns:
+            New Subscription; pass it to ``unsubscribe`` when the stream ends
+        """
+        subscription = Subscription(self.max_queue)
+        with self._lock:
+            if last_event_id is not None:
+                missed: List[Event] = [event for event in self._history if event[0] > last_event_id]
+                oldest = self._history[0][0] if self._history else self._last_id + 1
+                if last_event_id + 1 < oldest or last_event_id > self._last_id:
+                    # Part of the gap has left the history, or the server restarted
+                    subscription.put((0, 'resync', {}))
+                for event in missed:
+                    subscription.put(event)
+            self._subscribers.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        """Stop delivering events to a subscription."""
+        with self._lock:
+            self._subscribers.discard(subscription)
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get hub counters.
+
+        Returns:
+            Dictionary with subscriber count and published/dropped events
+        """
+        with self._lock:
+            return {
+                'subscribers': len(self._subscribers),
+                'published': self.published,
+                'dropped': self.dropped,
+                'last_event_id': self._last_id,
+            }
+
+
+_event_hub: Optional[EventHub] = None
+_event_hub_lock = threading.Lock()
+
+
+def get_event_hub() -> EventHub:
+    """Return the process-wide hub."""
+    global _event_hub
+    with _event_hub_lock:
+        if _event_hub is None:
+            _event_hub = EventHub()
+        return _event_hub
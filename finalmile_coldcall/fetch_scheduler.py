@@ -0,0 +1,314 @@
+"""Rate-limit-aware request scheduler for the Reddit scrapers.
+
+All listing requests go through one ``FetchScheduler``. It enforces a global
+request budget with a token bucket, honours Reddit's ``X-Ratelimit-Remaining``
+/ ``X-Ratelimit-Reset`` and ``Retry-After`` headers by pausing the bucket, and
+retries 429s, 5xx responses and connection errors with jittered exponential
+backoff instead of giving up on the first failure.
+
+When requests queue up for the budget, the listing with the highest priority
+goes first. A listing's priority is its configured priority plus how "busy"
+it has recently been (the share of each page that was new), so subreddits
+with fresh posts are served before quiet ones.
+"""
+
+import asyncio
+import heapq
+import itertools
+import random
+import threading
+import time
+import weakref
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+import httpx
+import requests
+
+from config import Config
+
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+RETRY_ERRORS = (requests.ConnectionError, requests.Timeout, httpx.TransportError)
+
+# Weight of the latest page when updating a listing's busyness
+_BUSYNESS_SMOOTHING = 0.3
+
+
+class TokenBucket:
+    """Thread-safe token bucket that can be paused until a reset time."""
+
+    def __init__(self, rate: float, capacity: float):
+        """
+        Args:
+            rate: Tokens added per second.
+            capacity: Maximum burst size.
+        """
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float) -> None:
+        if now > self._updated:
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+
+    def delay(self) -> float:
+        """Seconds until a token can be taken (0 if one is available now)."""
+        with self._lock:
+            return self._delay(time.monotonic())
+
+    def _delay(self, now: float) -> float:
+        if now < self._paused_until:
+            return self._paused_until - now
+        self._refill(now)
+        if self._tokens >= 1:
+            return 0.0
+        return (1 - self._tokens) / self.rate
+
+    def try_take(self) -> bool:
+        """Take a token if one is available now."""
+        with self._lock:
+            if self._delay(time.monotonic()) > 0:
+                return False
+            self._tokens -= 1
+            return True
+
+    def pause(self, seconds: float) -> None:
+        """Hand out no tokens for ``seconds``, then refill from empty."""
+        with self._lock:
+            resume = time.monotonic() + seconds
+            if resume > self._paused_until:
+                self._paused_until = resume
+                self._tokens = 0.0
+                self._updated = resume
+
+
+class FetchScheduler:
+    """Budget, prioritise and retry listing requests."""
+
+    def __init__(
+        self,
+        requests_per_minute: float = 30,
+        burst: int = 5,
+        max_retries: int = 4,
+        backoff_base: float = 1.0,
+        backoff_cap: float = 60.0,
+        priorities: Optional[Dict[str, float]] = None,
+    ):
+        """
+        Args:
+            requests_per_minute: Global request budget.
+            burst: Requests that may be sent back to back when idle.
+            max_retries: Retries per request before the error is raised.
+            backoff_base: First backoff ceiling in seconds; doubles per retry.
+            backoff_cap: Upper bound for a single backoff.
+            priorities: Configured priority per listing key (default 0).
+        """
+        self.bucket = TokenBucket(requests_per_minute / 60.0, burst)
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+        self.priorities = dict(priorities or {})
+        self._busyness: Dict[str, float] = {}
+        self._sequence = itertools.count()
+        # Waiter heaps and conditions are bound to the event loop using them
+        self._loops: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Any]" = weakref.WeakKeyDictionary()
+        self._stats_lock = threading.Lock()
+        self._queued = 0
+        self._stats = {
+            'requests': 0,
+            'retries': 0,
+            'throttle_events': 0,
+            'errors': 0,
+            'max_queue_depth': 0,
+            'total_wait_seconds': 0.0,
+            'total_backoff_seconds': 0.0,
+            'requests_by_listing': {},
+        }
+
+    def priority(self, key: str) -> float:
+        """Effective priority of a listing: configured priority plus busyness."""
+        return self.priorities.get(key, 0) + self._busyness.get(key, 0.0)
+
+    def note_page(self, key: str, fresh_ratio: float) -> None:
+        """Record the share of a fetched page that held posts not seen before."""
+        previous = self._busyness.get(key, fresh_ratio)
+        self._busyness[key] = previous + _BUSYNESS_SMOOTHING * (fresh_ratio - previous)
+
+    def run(self, send: Callable[[], Any], key: str) -> Any:
+        """
+        Send a request from blocking code, waiting for budget and retrying.
+
+        Args:
+            send: Performs the request and returns a requests/httpx response.
+            key: Listing the request belongs to, e.g. the subreddit name.
+
+        Returns:
+            The first response that is not a retryable failure.
+        """
+        for attempt in itertools.count():
+            self._enter_queue()
+            started = time.monotonic()
+            try:
+                while not self.bucket.try_take():
+                    time.sleep(self.bucket.delay())
+            finally:
+                self._leave_queue(key, time.monotonic() - started)
+
+            try:
+                response = send()
+            except RETRY_ERRORS:
+                if attempt >= self.max_retries:
+                    self._count('errors')
+                    raise
+                time.sleep(self._backoff(attempt, None))
+                continue
+
+            if response.status_code not in RETRY_STATUSES or attempt >= self.max_retries:
+                self._observe_headers(response)
+                return response
+            time.sleep(self._backoff(attempt, response))
+
+    async def run_async(self, send: Callable[[], Awaitable[Any]], key: str) -> Any:
+        """Asyncio counterpart of ``run``; queued requests are served by priority."""
+        for attempt in itertools.count():
+            await self._acquire_async(key)
+
+            try:
+                response = await send()
+            except RETRY_ERRORS:
+                if attempt >= self.max_retries:
+                    self._count('errors')
+                    raise
+                await asyncio.sleep(self._backoff(attempt, None))
+                continue
+
+            if response.status_code not in RETRY_STATUSES or attempt >= self.max_retries:
+                self._observe_headers(response)
+                return response
+            await asyncio.sleep(self._backoff(attempt, response))
+
+    async def _acquire_async(self, key: str) -> None:
+        """Wait until this request is the highest-priority waiter and a token is free."""
+        loop = asyncio.get_running_loop()
+        state = self._loops.get(loop)
+        if state is None:
+            state = self._loops[loop] = ([], asyncio.Condition())
+        waiting, condition = state
+
+        ticket = (-self.priority(key), next(self._sequence))
+        self._enter_queue()
+        started = time.monotonic()
+        async with condition:
+            heapq.heappush(waiting, ticket)
+            condition.notify_all()
+            try:
+                while True:
+                    if waiting[0] == ticket and self.bucket.try_take():
+                        heapq.heappop(waiting)
+                        condition.notify_all()
+                        return
+                    timeout = self.bucket.delay() if waiting[0] == ticket else None
+                    try:
+                        await asyncio.wait_for(condition.wait(), timeout)
+                    except asyncio.TimeoutError:
+                        pass
+            except BaseException:
+                if ticket in waiting:
+                    waiting.remove(ticket)
+                    heapq.heapify(waiting)
+                    condition.notify_all()
+                raise
+            finally:
+                self._leave_queue(key, time.monotonic() - started)
+
+    def _backoff(self, attempt: int, response: Any) -> float:
+        """Full-jitter exponential backoff, stretched to any server-given reset."""
+        delay = random.uniform(0, min(self.backoff_cap, self.backoff_base * 2 ** attempt))
+        if response is not None and response.status_code == 429:
+            reset = _header_float(response, 'Retry-After') or _header_float(response, 'X-Ratelimit-Reset')
+            if reset:
+                delay = max(delay, min(reset, self.backoff_cap))
+                self.bucket.pause(delay)
+            self._count('throttle_events')
+        self._count('retries')
+        with self._stats_lock:
+            self._stats['total_backoff_seconds'] += delay
+        return delay
+
+    def _observe_headers(self, response: Any) -> None:
+        """Pause the bucket when Reddit reports the budget is used up."""
+        remaining = _header_float(response, 'X-Ratelimit-Remaining')
+        reset = _header_float(response, 'X-Ratelimit-Reset')
+        if remaining is not None and reset is not None and remaining < 1:
+            self.bucket.pause(reset)
+            self._count('throttle_events')
+
+    def _enter_queue(self) -> None:
+        with self._stats_lock:
+            self._queued += 1
+            self._stats['max_queue_depth'] = max(self._stats['max_queue_depth'], self._queued)
+
+    def _leave_queue(self, key: str, waited: float) -> None:
+        with self._stats_lock:
+            self._queued -= 1
+            self._stats['requests'] += 1
+            self._stats['total_wait_seconds'] += waited
+            by_listing = self._stats['requests_by_listing']
+            by_listing[key] = by_listing.get(key, 0) + 1
+
+    def _count(self, name: str) -> None:
+        with self._stats_lock:
+            self._stats[name] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get scheduler counters.
+
+        Returns:
+            Dictionary with queue depth, wait times, retries and throttle events
+        """
+        with self._stats_lock:
+            stats = dict(self._stats)
+            stats['requests_by_listing'] = dict(stats['requests_by_listing'])
+            stats['queue_depth'] = self._queued
+        requests_made = stats['requests']
+        stats['avg_wait_seconds'] = round(stats['total_wait_seconds'] / requests_made, 3) if requests_made else 0
+        stats['total_wait_seconds'] = round(stats['total_wait_seconds'], 3)
+        stats['total_backoff_seconds'] = round(stats['total_backoff_seconds'], 3)
+        stats['requests_per_minute'] = round(self.bucket.rate * 60, 2)
+        stats['priorities'] = {
+            key: round(self.priority(key), 3) for key in set(self.priorities) | set(self._busyness)
+        }
+        return stats
+
+
+def _header_float(response: Any, name: str) -> Optional[float]:
+    """Read a numeric response header, ignoring missing or malformed values."""
+    value = response.headers.get(name)
+    if value is None:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        return None
+
+
+_scheduler: Optional[FetchScheduler] = None
+_scheduler_lock = threading.Lock()
+
+
+def get_scheduler() -> FetchScheduler:
+    """Return the shared scheduler, configured from ``Config`` on first use."""
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is None:
+            _scheduler = FetchScheduler(
+                requests_per_minute=Config.REDDIT_REQUESTS_PER_MINUTE,
+                burst=Config.REDDIT_REQUEST_BURST,
+                max_retries=Config.REDDIT_MAX_RETRIES,
+                priorities=Config.SUBREDDIT_PRIORITIES,
+            )
+        return _scheduler
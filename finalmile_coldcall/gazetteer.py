@@ -0,0 +1,441 @@
+"""Offline US places gazetteer, compiled into a memory-mapped lookup index.
+
+The source is the Census Bureau's national places Gazetteer file
+(``<year>_Gaz_place_national.txt``, or the ``.zip`` it is published in):
+about 30k incorporated places and CDPs with their state. ``build_gazetteer``
+compiles it once into a single read-only file:
+
+* a header (magic, counts, longest name in words, content digest);
+* a minimal perfect hash over the folded names: one 32-bit displacement per
+  bucket, then one 32-bit entry offset per name, so a lookup hashes the key
+  once, reads two integers and compares the key stored at the entry;
+* the entries, sorted by key: the key, then "Display Name|ST,ST" (the
+  states it occurs in), each prefixed with its length. The leading words of multi-word names ("salt lake") are
+  entries without states, so scanning a title stops at the first word no
+  name continues with.
+
+``Gazetteer`` maps that file instead of loading it, so opening it costs one
+``mmap`` call, lookups are O(length of the name) and every worker process
+shares the same page-cache pages. A rebuilt index replaces the file
+atomically; processes that already mapped the old one keep reading it.
+
+``locate`` finds capitalized place names in a title and settles names that
+exist in several states (Springfield, Arlington) with the state names and
+abbreviations the title also contains.
+"""
+
+import csv
+import hashlib
+import io
+import mmap
+import os
+import re
+import struct
+import unicodedata
+import zipfile
+from functools import lru_cache
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Optional, Set, Tuple
+
+from config import Config
+from constants import AIRPORT_MAP, STATE_FULL_MAP, STATE_MAP
+
+MAGIC = b"USPLACE1"
+_HEADER = struct.Struct("<8sIIII20s")  # magic, names, buckets, max words, entries size, digest
+_U32 = struct.Struct("<I")
+_KEYS_PER_BUCKET = 4
+_EMPTY = 0xFFFFFFFF
+
+_STATE_ABBRS = frozenset(STATE_FULL_MAP) | {"DC"}
+_STATE_KEYS = frozenset(name.lower() for name in STATE_MAP) | {"district of columbia"}
+_STATE_NAME_RE = re.compile(
+    r"\b(" + "|".join(sorted(map(re.escape, STATE_MAP), key=len, reverse=True)) + r")\b", re.IGNORECASE
+)
+_STATE_BY_NAME = {name.lower(): abbr for name, abbr in STATE_MAP.items()}
+_ABBR_RE = re.compile(r"\b[A-Z]{2}\b")
+
+_KEY_WORD_RE = re.compile(r"[a-z]+")
+_WORD_RE = re.compile(r"[^\W\d_]+")
+# What may separate the words of one place name: "St. Louis", "Winston-Salem", "Coeur d'Alene"
+_GAP_RE = re.compile(r"[.'’-]? ?|\s")
+
+# Census NAME suffixes (lower case, so "Carson City" keeps its "City")
+_NAME_SUFFIXES = (
+    " city and borough", " consolidated government", " metropolitan government",
+    " metro government", " unified government", " urban county", " municipality",
+    " borough", " village", " town", " city", " CDP",
+)
+# First words written both ways in place names
+_ABBREVIATED_WORDS = {"st": "saint", "ste": "sainte", "ft": "fort", "mt": "mount"}
+_EXPANDED_WORDS = {full: short for short, full in _ABBREVIATED_WORDS.items()}
+
+# Place names that are also everyday words in post titles; they only count
+# when a state in the title confirms them.
+COMMON_WORD_PLACES = frozenset({
+    "home", "hope", "welcome", "success", "victory", "liberty", "freedom", "independence",
+    "paradise", "harmony", "unity", "friendship", "joy", "happy", "nice", "normal",
+    "early", "christmas", "valentine", "deal", "cash", "price", "value", "energy",
+    "commerce", "justice", "story", "ideal", "plain", "why", "boring", "loving", "lucky",
+    "rich", "sale", "buyer", "keys", "oasis", "surprise",
+})
+
+
+class Place(NamedTuple):
+    """A gazetteer name and the states (two-letter, sorted) it occurs in."""
+
+    name: str
+    states: Tuple[str, ...]
+
+
+class Located(NamedTuple):
+    """A place found in a title; ``state`` is '' when it stayed ambiguous."""
+
+    name: str
+    state: str
+    confirmed: bool  # the state was named in the title
+
+    def __str__(self) -> str:
+        return f"{self.name}, {self.state}" if self.state else self.name
+
+
+def place_key(name: str) -> str:
+    """Fold a place name to its lookup key: ASCII letters, lower case, single spaces."""
+    if not name.isascii():
+        name = unicodedata.normalize("NFKD", name).encode("ascii", "ignore").decode("ascii")
+    return " ".join(_KEY_WORD_RE.findall(name.lower()))
+
+
+def _metro_states() -> Dict[str, str]:
+    """Folded city -> state for the metro areas the airport table names."""
+    states: Dict[str, str] = {}
+    for label in AIRPORT_MAP.values():
+        city, _, abbr = label.rpartition(",")
+        states.setdefault(place_key(city), abbr.strip())
+    return states
+
+
+# Used for a name found with no state in the title
+_METRO_STATES = _metro_states()
+
+
+def state_hints(text: str) -> List[str]:
+    """
+    Return the states a title names, in order, as two-letter abbreviations.
+
+    Full state names count in any case. Abbreviations count only in upper
+    case, and not at all in an all-caps title, where "IN" and "OR" are words.
+    """
+    found = [(m.start(), _STATE_BY_NAME[m.group(1).lower()]) for m in _STATE_NAME_RE.finditer(text)]
+    if not text.isupper():
+        found += [(m.start(), m.group()) for m in _ABBR_RE.finditer(text) if m.group() in _STATE_ABBRS]
+    return list(dict.fromkeys(abbr for _, abbr in sorted(found)))
+
+
+def _hash(key: bytes) -> Tuple[int, int, int]:
+    return struct.unpack("<III", hashlib.blake2b(key, digest_size=12).digest())
+
+
+def _census_name_keys(raw_name: str) -> Iterator[Tuple[str, str]]:
+    """(display name, key) pairs for one Census NAME, with its common aliases."""
+    name = raw_name.strip()
+    balance = name.endswith("(balance)")
+    name = re.sub(r"\s*\([^)]*\)", "", name)
+    for suffix in _NAME_SUFFIXES:
+        if name.endswith(suffix):
+            name = name[:-len(suffix)]
+            break
+    names = [name]
+    # Consolidated cities: "Nashville-Davidson", "Louisville/Jefferson County"
+    if balance and re.search(r"[-/]", name):
+        names.append(re.split(r"[-/]", name, 1)[0])
+    for display in names:
+        key = place_key(display)
+        if not key:
+            continue
+        yield display, key
+        first, _, rest = key.partition(" ")
+        alias = _ABBREVIATED_WORDS.get(first) or _EXPANDED_WORDS.get(first)
+        if alias and rest:
+            yield display, f"{alias} {rest}"
+
+
+def read_census_places(path: str) -> Iterator[Tuple[str, str, str]]:
+    """
+    Read a Census places Gazetteer file (tab-separated, or the zip it ships in).
+
+    Args:
+        path: ``*_Gaz_place_national.txt`` or ``.zip``
+
+    Yields:
+        (display name, key, state abbreviation) for places in the 50 states and DC
+    """
+    if path.endswith(".zip"):
+        with zipfile.ZipFile(path) as archive:
+            member = next(name for name in archive.namelist() if name.endswith(".txt"))
+            data = archive.read(member)
+    else:
+        with open(path, "rb") as source:
+            data = source.read()
+    try:
+        content = data.decode("utf-8-sig")
+    except UnicodeDecodeError:
+        content = data.decode("latin-1")
+
+    reader = csv.reader(io.StringIO(content), delimiter="\t", quoting=csv.QUOTE_NONE)
+    header = [column.strip().upper() for column in next(reader)]
+    if "USPS" not in header or "NAME" not in header:
+        raise ValueError(f"{path} is not a Census places Gazetteer file (no USPS/NAME columns)")
+    usps, name = header.index("USPS"), header.index("NAME")
+    for row in reader:
+        if len(row) <= max(usps, name) or row[usps].strip() not in _STATE_ABBRS:
+            continue
+        for display, key in _census_name_keys(row[name]):
+            yield display, key, row[usps].strip()
+
+
+def build_gazetteer(places: Iterable[Tuple[str, str, str]], path: str) -> Dict[str, int]:
+    """
+    Compile places into a gazetteer index file, replacing ``path`` atomically.
+
+    Args:
+        places: (display name, key, state) triples, e.g. from ``read_census_places``;
+            the first display name seen for a key is kept
+        path: Index file to write
+
+    Returns:
+        Dictionary with the number of names, of names in several states, and file bytes
+    """
+    merged: Dict[str, Tuple[str, Set[str]]] = {}
+    for display, key, state in places:
+        if len(key.encode("ascii")) > 255 or len(display.encode("utf-8")) > 200:
+            continue
+        merged.setdefault(key, (display, set()))[1].add(state)
+    names = len(merged)
+    ambiguous = sum(1 for _, states in merged.values() if len(states) > 1)
+    # Every leading run of words of a longer name, as an entry with no
+    # states, so a scan can stop at the first word no name continues with
+    for key in list(merged):
+        words = key.split(" ")
+        for end in range(1, len(words)):
+            merged.setdefault(" ".join(words[:end]), ("", set()))
+
+    keys = sorted(merged)
+    count = len(keys)
+    entries = bytearray()
+    offsets = []
+    for key in keys:
+        display, states = merged[key]
+        encoded = key.encode("ascii")
+        value = f"{display}|{','.join(sorted(states))}".encode("utf-8") if states else b""
+        offsets.append(len(entries))
+        entries += bytes([len(encoded)]) + encoded + bytes([len(value)]) + value
+
+    # Hash and displace: place the fullest buckets first, each with the
+    # first displacement that sends all of its keys to free slots. A bucket
+    # of one key goes straight to a free slot.
+    bucket_count = max(1, count // _KEYS_PER_BUCKET)
+    buckets: List[List[Tuple[int, int, int]]] = [[] for _ in range(bucket_count)]
+    for index, key in enumerate(keys):
+        bucket, f, g = _hash(key.encode("ascii"))
+        buckets[bucket % bucket_count].append((index, f % count, g % count))
+    displacements = [0] * bucket_count
+    slots = [_EMPTY] * count
+    free = None
+    for bucket in sorted(range(bucket_count), key=lambda b: len(buckets[b]), reverse=True):
+        members = buckets[bucket]
+        if not members:
+            break
+        if len(members) == 1:
+            if free is None:
+                free = [slot for slot in range(count) if slots[slot] == _EMPTY]
+            index, f, _ = members[0]
+            slot = free.pop()
+            displacements[bucket] = (slot - f) % count
+            slots[slot] = offsets[index]
+            continue
+        for displacement in range(count * count):
+            high, low = divmod(displacement, count)
+            chosen = []
+            for _, f, g in members:
+                slot = (f + high * g + low) % count
+                if slots[slot] != _EMPTY or slot in chosen:
+                    break
+                chosen.append(slot)
+            else:
+                break
+        displacements[bucket] = displacement
+        for (index, _, _), slot in zip(members, chosen):
+            slots[slot] = offsets[index]
+
+    max_words = max((key.count(" ") + 1 for key in keys), default=0)
+    digest = hashlib.sha1(bytes(entries)).digest()
+    temporary = f"{path}.tmp"
+    with open(temporary, "wb") as output:
+        output.write(_HEADER.pack(MAGIC, count, bucket_count, max_words, len(entries), digest))
+        output.write(struct.pack(f"<{bucket_count}I", *displacements))
+        output.write(struct.pack(f"<{count}I", *slots))
+        output.write(entries)
+    os.replace(temporary, path)
+    return {'names': names, 'ambiguous': ambiguous, 'bytes': os.path.getsize(path)}
+
+
+class Gazetteer:
+    """Read-only view of a compiled gazetteer index."""
+
+    def __init__(self, path: str):
+        """
+        Args:
+            path: Index file written by ``build_gazetteer``
+
+        Raises:
+            ValueError: If the file is not a gazetteer index
+        """
+        self.path = path
+        with open(path, "rb") as source:
+            try:
+                self._map = mmap.mmap(source.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError:
+                raise ValueError(f"{path} is empty, not a gazetteer index")
+        if len(self._map) < _HEADER.size:
+            raise ValueError(f"{path} is not a gazetteer index")
+        magic, self._count, self._buckets, self.max_words, entries_size, digest = _HEADER.unpack_from(self._map)
+        self._slots = _HEADER.size + 4 * self._buckets
+        self._entries = self._slots + 4 * self._count
+        if magic != MAGIC or len(self._map) != self._entries + entries_size:
+            raise ValueError(f"{path} is not a gazetteer index (or was truncated)")
+        self.digest = digest.hex()
+        # Titles repeat the same capitalized words, so recent probes are memoized
+        self._lookup_key = lru_cache(maxsize=4096)(self._lookup_key)
+
+    def close(self) -> None:
+        self._map.close()
+
+    def _lookup_key(self, key: str) -> Optional[Place]:
+        """Return the entry for a folded key; a leading-words entry has no states."""
+        if not self._count:
+            return None
+        encoded = key.encode("ascii", "ignore")
+        bucket, f, g = _hash(encoded)
+        data, count = self._map, self._count
+        high, low = divmod(_U32.unpack_from(data, _HEADER.size + 4 * (bucket % self._buckets))[0], count)
+        offset = _U32.unpack_from(data, self._slots + 4 * ((f % count + high * (g % count) + low) % count))[0]
+
+        position = self._entries + offset
+        length = data[position]
+        if data[position + 1:position + 1 + length] != encoded:
+            return None
+        position += 1 + length
+        name, _, states = data[position + 1:position + 1 + data[position]].decode("utf-8").partition("|")
+        return Place(name, tuple(states.split(",")) if states else ())
+
+    def lookup(self, name: str) -> Optional[Place]:
+        """Return the place a name folds to, or None."""
+        place = self._lookup_key(place_key(name))
+        return place if place and place.states else None
+
+    def trim(self, phrase: str, state: str) -> Optional[str]:
+        """
+        Return the longest place in ``state`` that ``phrase`` ends with.
+
+        Turns the "City" part of a "City, ST" match that swallowed the start
+        of the title ("Got the keys in Springfield") into the place itself.
+        """
+        words = [place_key(word) for word in _WORD_RE.findall(phrase)]
+        for first in range(max(0, len(words) - self.max_words), len(words)):
+            place = self._lookup_key(" ".join(words[first:]))
+            if place and state in place.states:
+                return place.name
+        return None
+
+    def state_for(self, name: str, text: str) -> Optional[str]:
+        """Return the first state named in ``text`` that place ``name`` occurs in."""
+        place = self.lookup(name)
+        if place:
+            for state in state_hints(text):
+                if state in place.states:
+                    return state
+        return None
+
+    def places_in(self, text: str) -> List[Tuple[int, int, Place]]:
+        """
+        Find place names in a title, leftmost-longest, as (start, end, place).
+
+        A name must start and end with a capitalized word; words in between
+        ("Coeur d'Alene", "Lake of the Woods") may be lower case. State names
+        are left out: they are hints, not places.
+        """
+        words = [(m.start(), m.end()) for m in _WORD_RE.finditer(text)]
+
+        def word_key(index):
+            word = text[words[index][0]:words[index][1]]
+            return word.lower() if word.isascii() else place_key(word)
+
+        found = []
+        index = 0
+        while index < len(words):
+            start = words[index][0]
+            longest = None
+            key = word_key(index) if text[start].isupper() else ""
+            if key:
+                # Extend word by word while some name still starts with the key
+                end = index
+                while True:
+                    place = self._lookup_key(key)
+                    if place is None:
+                        break
+                    if (place.states and text[words[end][0]].isupper()
+                            and len(key) >= 3 and key not in _STATE_KEYS):
+                        longest = (end, place)
+                    end += 1
+                    if end == len(words) or not _GAP_RE.fullmatch(text[words[end - 1][1]:words[end][0]]):
+                        break
+                    key = f"{key} {word_key(end)}"
+            if longest:
+                found.append((start, words[longest[0]][1], longest[1]))
+                index = longest[0]
+            index += 1
+        return found
+
+    def locate(self, text: str) -> Optional[Located]:
+        """
+        Find the place a title is about.
+
+        In order of preference: the first place that occurs in a state the
+        title names; the first place that exists in a single state; the
+        first place the airport table pins to one of its states; the first
+        place name, without a state. Names that are also common title words
+        (``COMMON_WORD_PLACES``) count only in the first case.
+        """
+        places = self.places_in(text)
+        if not places:
+            return None
+        hints = state_hints(text)
+        for _, _, place in places:
+            for state in hints:
+                if state in place.states:
+                    return Located(place.name, state, True)
+
+        unconfirmed = [place for _, _, place in places if place_key(place.name) not in COMMON_WORD_PLACES]
+        for place in unconfirmed:
+            if len(place.states) == 1:
+                return Located(place.name, place.states[0], False)
+        for place in unconfirmed:
+            metro = _METRO_STATES.get(place_key(place.name))
+            if metro in place.states:
+                return Located(place.name, metro, False)
+        if unconfirmed:
+            return Located(unconfirmed[0].name, "", False)
+        return None
+
+
+_gazetteer: Optional[Gazetteer] = None
+_gazetteer_loaded = False
+
+
+def get_gazetteer() -> Optional[Gazetteer]:
+    """Return the shared index at ``Config.GAZETTEER_PATH``, or None if it has not been built."""
+    global _gazetteer, _gazetteer_loaded
+    if not _gazetteer_loaded:
+        path = Config.GAZETTEER_PATH
+        _gazetteer = Gazetteer(path) if path and os.path.exists(path) else None
+        _gazetteer_loaded = True
+    return _gazetteer
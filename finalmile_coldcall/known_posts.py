@@ -0,0 +1,201 @@
+"""In-memory filter of the title currently stored for each username.
+
+A refresh mostly sees authors it has stored before. ``outreach_status`` holds
+one row per username, and the upsert only writes an existing row when the
+title differs from the stored one, so a post whose title is the one stored
+for its author is a no-op. The refresh pipeline checks this filter first and
+drops such posts before parsing their location or querying the database.
+
+Each username maps to a fingerprint of its current title, which ``add_many``
+replaces when a write stores a different title. A title seen again after
+the row moved on to another one is therefore not skipped, just as the
+upsert would write it back. Usernames are kept as 64-bit hashes in a sorted
+``array('q')`` with a parallel ``array('I')`` of 32-bit title hashes (Python's
+hash; the filter never leaves the process), 12 bytes per username instead of
+the ~100 a dict of ints takes. New usernames collect in a small dict and are
+merged into the arrays once it reaches 1/64 of them (at least 65,536). At
+``max_entries`` the filter stops taking new usernames, but still tracks
+title changes of the ones it holds; the rest just take the database path.
+At 10M entries:
+
+* the arrays are 120 MB, the pending dict at most ~15 MB;
+* a merge or ``warm`` briefly holds the old and new arrays (+120 MB);
+* a false "already stored" answer needs a known author posting a new title
+  whose 32-bit hash equals the stored one's: about 1 in 4.3 billion per
+  changed title.
+
+Titles are only recorded after their transaction commits, and rows are never
+deleted. The filter only sees this process's writes: if another process
+(e.g. ``flask replay-archive``) changes a title, a refresh here can skip
+the previous title until the author's row is written again from this
+process or the filter is warmed anew.
+"""
+
+import sys
+import threading
+from array import array
+from bisect import bisect_left
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+from config import Config
+
+_MERGE_MIN = 65536
+_TITLE_MASK = 0xFFFFFFFF
+# ``warm`` sorts usernames in 256 buckets by the top byte of their hash, then concatenates them
+_BUCKET_SHIFT = 56
+
+
+class KnownPosts:
+    """Current title of each stored username, as sorted hash arrays."""
+
+    def __init__(self, max_entries: int = 10000000):
+        """
+        Args:
+            max_entries: Most usernames held; 0 disables the filter.
+        """
+        self.max_entries = max_entries
+        self.warmed = False
+        self._users = array('q')
+        self._titles = array('I')
+        self._recent: Dict[int, int] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def fingerprint(username: str, title: str) -> Tuple[int, int]:
+        return hash(username), hash(title) & _TITLE_MASK
+
+    def __len__(self) -> int:
+        return len(self._users) + len(self._recent)
+
+    def _index(self, user: int) -> int:
+        """Position of ``user`` in the sorted array, or -1."""
+        index = bisect_left(self._users, user)
+        return index if index < len(self._users) and self._users[index] == user else -1
+
+    def contains(self, username: str, title: str) -> bool:
+        """Return True if ``title`` is the title stored for ``username``."""
+        user, title_hash = self.fingerprint(username, title)
+        with self._lock:
+            stored = self._recent.get(user)
+            if stored is None:
+                index = self._index(user)
+                stored = self._titles[index] if index >= 0 else None
+            found = stored == title_hash
+            if found:
+                self.hits += 1
+            else:
+                self.misses += 1
+            return found
+
+    def add_many(self, posts: Iterable[Tuple[str, str]]) -> None:
+        """
+        Record the titles now stored for these usernames.
+
+        Args:
+            posts: (username, title) pairs as written, later ones winning;
+                call only after the commit
+        """
+        with self._lock:
+            for username, title in posts:
+                user, title_hash = self.fingerprint(username, title)
+                if user in self._recent:
+                    self._recent[user] = title_hash
+                    continue
+                index = self._index(user)
+                if index >= 0:
+                    self._titles[index] = title_hash
+                elif len(self) < self.max_entries:
+                    self._recent[user] = title_hash
+            if len(self._recent) >= max(_MERGE_MIN, len(self._users) // 64):
+                self._merge()
+
+    def _merge(self) -> None:
+        """Fold the pending dict into the sorted arrays, copying the runs between insertions."""
+        users, titles = array('q'), array('I')
+        start = 0
+        for user in sorted(self._recent):
+            index = bisect_left(self._users, user, start)
+            users.extend(self._users[start:index])
+            titles.extend(self._titles[start:index])
+            users.append(user)
+            titles.append(self._recent[user])
+            start = index
+        users.extend(self._users[start:])
+        titles.extend(self._titles[start:])
+        self._users, self._titles = users, titles
+        self._recent = {}
+
+    def warm(self, posts: Iterable[Tuple[str, str]]) -> int:
+        """
+        Replace the contents with the stored titles, up to ``max_entries``.
+
+        Args:
+            posts: Every stored (username, title), in the order to keep them
+                when there are more than ``max_entries`` (newest first)
+
+        Returns:
+            Number of usernames loaded
+        """
+        buckets = [(array('q'), array('I')) for _ in range(256)]
+        loaded = 0
+        for username, title in posts:
+            if loaded >= self.max_entries:
+                break
+            user, title_hash = self.fingerprint(username, title)
+            bucket_users, bucket_titles = buckets[(user >> _BUCKET_SHIFT) + 128]
+            bucket_users.append(user)
+            bucket_titles.append(title_hash)
+            loaded += 1
+
+        users, titles = array('q'), array('I')
+        for index in range(256):
+            bucket_users, bucket_titles = buckets[index]
+            buckets[index] = None
+            previous = None
+            # Stable, so of two usernames with the same hash the first (newest) is kept
+            for position in sorted(range(len(bucket_users)), key=bucket_users.__getitem__):
+                user = bucket_users[position]
+                if user != previous:
+                    users.append(user)
+                    titles.append(bucket_titles[position])
+                    previous = user
+        with self._lock:
+            self._users, self._titles = users, titles
+            self._recent = {}
+            self.warmed = True
+        return loaded
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get size and hit counters.
+
+        Returns:
+            Entries held, approximate bytes used, capacity and lookup hit rate
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            recent_bytes = sys.getsizeof(self._recent) + 64 * len(self._recent)
+            return {
+                'warmed': self.warmed,
+                'entries': len(self),
+                'max_entries': self.max_entries,
+                'bytes': (self._users.itemsize + self._titles.itemsize) * len(self._users) + recent_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups * 100, 1) if lookups else 0,
+            }
+
+
+_known_posts: Optional[KnownPosts] = None
+_known_posts_lock = threading.Lock()
+
+
+def get_known_posts() -> KnownPosts:
+    """Return the shared filter, sized from ``Config`` on first use."""
+    global _known_posts
+    with _known_posts_lock:
+        if _known_posts is None:
+            _known_posts = KnownPosts(max_entries=Config.KNOWN_POSTS_MAX_ENTRIES)
+        return _known_posts
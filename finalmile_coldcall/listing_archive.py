@@ -0,0 +1,209 @@
+"""Append-only, compressed archive of raw Reddit listing pages.
+
+Every listing page the scrapers fetch is appended, exactly as Reddit sent it,
+to one gzip file per listing, UTC day and writing process::
+
+    <root>/YYYY/MM/DD/<subreddit>.<sort>.<segment>.jsonl.gz
+
+A record is one JSON line ``{"fetched_at", "subreddit", "sort", "after",
+"page"}`` compressed as its own gzip member. Appending a member never rewrites
+earlier data and the file stays readable by any gzip reader. Each process
+writes its own segment (named by start time and pid), so a write torn by a
+crash is always the last thing in its file and only loses that record.
+
+``pages`` reads the archive back in fetch order, merging each day's files,
+for ``OutreachService.replay_archive``, which runs the pages through the same
+matching, location parsing and upsert code as a live refresh (where the
+last title written for a user wins).
+"""
+
+import gzip
+import heapq
+import json
+import os
+import threading
+import time
+import zlib
+from datetime import date, datetime, timezone
+from itertools import groupby
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, NamedTuple, Optional
+
+from config import Config
+from listing_json import loads
+
+
+class ArchivedPage(NamedTuple):
+    """One listing page as it was fetched."""
+
+    fetched_at: float
+    subreddit: str
+    sort: str
+    after: Optional[str]
+    page: Dict[str, Any]
+
+
+class ListingArchive:
+    """Date-partitioned gzip archive of listing pages."""
+
+    def __init__(self, root: str, compresslevel: int = 6):
+        """
+        Args:
+            root: Directory holding the partitions; created on first write.
+            compresslevel: gzip level, 1 (fast) to 9 (small).
+        """
+        self.root = Path(root)
+        self.compresslevel = compresslevel
+        self.segment = f"{int(time.time()):010d}-{os.getpid()}"
+        self._lock = threading.Lock()
+        self.pages_written = 0
+        self.raw_bytes = 0
+        self.compressed_bytes = 0
+
+    def path_for(self, subreddit: str, sort: str, day: date) -> Path:
+        """This process's partition file for a listing on a UTC day."""
+        return self.root / f"{day:%Y}" / f"{day:%m}" / f"{day:%d}" / f"{subreddit}.{sort}.{self.segment}.jsonl.gz"
+
+    def append(
+        self, subreddit: str, sort: str, after: Optional[str], raw: bytes,
+        fetched_at: Optional[float] = None
+    ) -> None:
+        """
+        Append one raw listing page.
+
+        Args:
+            subreddit: Subreddit name
+            sort: Listing sort order
+            after: Pagination token the page was requested with
+            raw: Response body as received
+            fetched_at: Unix time of the fetch; defaults to now
+        """
+        fetched_at = time.time() if fetched_at is None else fetched_at
+        if b"\n" in raw:
+            # Keep one record per line; Reddit's JSON is compact already
+            raw = json.dumps(json.loads(raw), separators=(",", ":")).encode()
+        header = json.dumps({"fetched_at": fetched_at, "subreddit": subreddit, "sort": sort, "after": after})
+        record = header[:-1].encode() + b', "page": ' + raw + b"}\n"
+        member = gzip.compress(record, compresslevel=self.compresslevel, mtime=0)
+        day = datetime.fromtimestamp(fetched_at, timezone.utc).date()
+        path = self.path_for(subreddit, sort, day)
+        with self._lock:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            with open(path, "ab") as archive_file:
+                archive_file.write(member)
+            self.pages_written += 1
+            self.raw_bytes += len(record)
+            self.compressed_bytes += len(member)
+
+    def partitions(self, start: Optional[date] = None, end: Optional[date] = None) -> List[Path]:
+        """
+        List partition files between two UTC days (inclusive), oldest first.
+
+        Within a day, files are ordered by listing and then by segment, which
+        starts with the writer's start time.
+
+        Args:
+            start: First day, or None for the beginning of the archive
+            end: Last day, or None for the end of the archive
+        """
+        if not self.root.is_dir():
+            return []
+        files = []
+        for path in self.root.glob("*/*/*/*.jsonl.gz"):
+            year, month, day = path.parent.relative_to(self.root).parts
+            try:
+                partition_day = date(int(year), int(month), int(day))
+            except ValueError:
+                continue
+            if (start and partition_day < start) or (end and partition_day > end):
+                continue
+            files.append((partition_day, path.name, path))
+        return [path for _, _, path in sorted(files)]
+
+    def pages(
+        self, start: Optional[date] = None, end: Optional[date] = None,
+        subreddits: Optional[Iterable[str]] = None
+    ) -> Iterator[ArchivedPage]:
+        """
+        Read archived pages back in fetch order.
+
+        Each day's files (one per listing and writing process) are opened
+        together and merged by ``fetched_at``, so a user seen in several
+        listings, or by several processes, comes back newest last.
+
+        Args:
+            start: First UTC day to read
+            end: Last UTC day to read
+            subreddits: Only read these subreddits (case-insensitive)
+
+        Yields:
+            ArchivedPage for every complete record
+        """
+        wanted = {name.lower() for name in subreddits} if subreddits else None
+        paths = [
+            path for path in self.partitions(start, end)
+            if not wanted or path.name.split(".", 1)[0].lower() in wanted
+        ]
+        # Partition files hold the pages fetched on their day, so merging day
+        # by day keeps only that day's files open
+        for _, day_paths in groupby(paths, key=lambda path: path.parent):
+            yield from heapq.merge(
+                *(self._read(path) for path in day_paths), key=lambda page: page.fetched_at
+            )
+
+    @staticmethod
+    def _read(path: Path) -> Iterator[ArchivedPage]:
+        """Records of one partition file, in the order they were appended."""
+        try:
+            with gzip.open(path, "rb") as archive_file:
+                for line in archive_file:
+                    record = loads(line)
+                    yield ArchivedPage(
+                        record["fetched_at"], record["subreddit"], record["sort"],
+                        record.get("after"), record["page"]
+                    )
+        except (EOFError, zlib.error, gzip.BadGzipFile, json.JSONDecodeError) as e:
+            # A torn final record; everything before it was yielded
+            print(f"Skipping damaged tail of {path}: {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get write counters for this process.
+
+        Returns:
+            Dictionary with pages written and raw/compressed byte counts
+        """
+        with self._lock:
+            return {
+                "root": str(self.root),
+                "pages_written": self.pages_written,
+                "raw_bytes": self.raw_bytes,
+                "compressed_bytes": self.compressed_bytes,
+                "compression_ratio": round(self.raw_bytes / self.compressed_bytes, 2) if self.compressed_bytes else 0.0,
+            }
+
+
+_archive: Optional[ListingArchive] = None
+_archive_lock = threading.Lock()
+
+
+def get_listing_archive() -> Optional[ListingArchive]:
+    """Return the shared archive, or None if ``Config.LISTING_ARCHIVE_PATH`` is empty."""
+    global _archive
+    if not Config.LISTING_ARCHIVE_PATH:
+        return None
+    with _archive_lock:
+        if _archive is None:
+            _archive = ListingArchive(os.path.expanduser(Config.LISTING_ARCHIVE_PATH))
+        return _archive
+
+
+def archive_page(subreddit: str, sort: str, after: Optional[str], raw: bytes) -> None:
+    """Append a fetched page to the shared archive; never fails the fetch."""
+    archive = get_listing_archive()
+    if archive is None:
+        return
+    try:
+        archive.append(subreddit, sort, after, raw)
+    except Exception as e:
+        print(f"Error archiving r/{subreddit} page: {e}")
@@ -0,0 +1,209 @@
+"""Two-tier memoization cache for parsed post locations.
+
+Locations are kept in an in-process LRU and persisted to a small SQLite table
+so they survive restarts. Entries are keyed by a hash of the normalized title
+and tagged with the parser fingerprint; rows written by any other parser
+version are ignored and purged when the cache is opened.
+
+New entries are written to SQLite in batches: once ``write_batch`` are
+waiting, or on the first miss ``write_interval`` seconds after the oldest
+of them, with one ``executemany`` and one commit. A cold refresh therefore
+syncs the file once per batch rather than once per title. Unwritten entries
+are still served from memory; at most one batch is lost if the process dies,
+and it is simply parsed again.
+"""
+
+import atexit
+import hashlib
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+from config import Config
+from location_parser import LocationParser, get_parser, normalize_title
+
+
+class LocationCache:
+    """Memoize ``LocationParser.parse`` in memory and, optionally, on disk."""
+
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        max_entries: int = 10000,
+        parser: Optional[LocationParser] = None,
+        write_batch: int = 256,
+        write_interval: float = 1.0,
+    ):
+        """
+        Args:
+            path: SQLite file for the persistent tier, or None for memory only.
+            max_entries: Maximum number of entries kept in the in-process LRU.
+            parser: Parser to memoize; defaults to the shared parser.
+            write_batch: New entries written to disk together.
+            write_interval: Longest a new entry waits to be written, checked on
+                the next miss.
+        """
+        self.parser = parser or get_parser()
+        self.parser_version = self.parser.fingerprint
+        self.max_entries = max_entries
+        self.write_batch = write_batch
+        self.write_interval = write_interval
+        self._memory: "OrderedDict[str, str]" = OrderedDict()
+        self._unsaved: Dict[str, str] = {}
+        self._unsaved_since = 0.0
+        self._lock = threading.Lock()
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.disk_writes = 0
+
+        self._db: Optional[sqlite3.Connection] = None
+        if path:
+            self._db = sqlite3.connect(path, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("PRAGMA synchronous=NORMAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS location_cache ("
+                " title_hash TEXT PRIMARY KEY,"
+                " parser_version TEXT NOT NULL,"
+                " location TEXT NOT NULL)"
+            )
+            self._db.execute(
+                "DELETE FROM location_cache WHERE parser_version != ?",
+                (self.parser_version,),
+            )
+            self._db.commit()
+
+    @staticmethod
+    def title_key(title: str) -> str:
+        """Hash the normalized form of a title."""
+        normalized = normalize_title(title)
+        return hashlib.sha1(normalized.encode("utf-8", "surrogatepass")).hexdigest()
+
+    def get(self, title: str) -> str:
+        """
+        Return the location for a title, parsing it only on a cache miss.
+
+        Args:
+            title: Post title.
+
+        Returns:
+            Parsed location string.
+        """
+        key = self.title_key(title)
+        with self._lock:
+            location = self._memory.get(key)
+            if location is not None:
+                self._memory.move_to_end(key)
+                self.memory_hits += 1
+                return location
+
+            location = self._unsaved.get(key)
+            if location is not None:
+                self.memory_hits += 1
+                self._remember(key, location)
+                return location
+
+            if self._db is not None:
+                row = self._db.execute(
+                    "SELECT location FROM location_cache WHERE title_hash = ? AND parser_version = ?",
+                    (key, self.parser_version),
+                ).fetchone()
+                if row:
+                    self.disk_hits += 1
+                    self._remember(key, row[0])
+                    return row[0]
+
+            self.misses += 1
+
+        location = self.parser.parse(title)
+
+        with self._lock:
+            self._remember(key, location)
+            if self._db is not None:
+                if not self._unsaved:
+                    self._unsaved_since = time.monotonic()
+                self._unsaved[key] = location
+                if (len(self._unsaved) >= self.write_batch
+                        or time.monotonic() - self._unsaved_since >= self.write_interval):
+                    self._write_unsaved()
+        return location
+
+    def flush(self) -> None:
+        """Write every new entry still waiting to the persistent tier."""
+        with self._lock:
+            self._write_unsaved()
+
+    def _write_unsaved(self) -> None:
+        """Write the waiting entries in one transaction; the caller holds the lock."""
+        if self._db is None or not self._unsaved:
+            return
+        self._db.executemany(
+            "INSERT OR REPLACE INTO location_cache (title_hash, parser_version, location) "
+            "VALUES (?, ?, ?)",
+            [(key, self.parser_version, location) for key, location in self._unsaved.items()],
+        )
+        self._db.commit()
+        self.disk_writes += 1
+        self._unsaved.clear()
+
+    def _remember(self, key: str, location: str) -> None:
+        """Insert into the LRU, evicting the least recently used entry if full."""
+        self._memory[key] = location
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def clear(self) -> None:
+        """Drop every cached entry from both tiers and reset the counters."""
+        with self._lock:
+            self._memory.clear()
+            self._unsaved.clear()
+            if self._db is not None:
+                self._db.execute("DELETE FROM location_cache")
+                self._db.commit()
+            self.memory_hits = self.disk_hits = self.misses = 0
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get cache effectiveness counters.
+
+        Returns:
+            Dictionary with hit/miss counts, hit rate and tier sizes
+        """
+        with self._lock:
+            lookups = self.memory_hits + self.disk_hits + self.misses
+            disk_entries = None
+            if self._db is not None:
+                disk_entries = self._db.execute("SELECT COUNT(*) FROM location_cache").fetchone()[0]
+            return {
+                'parser_version': self.parser_version,
+                'memory_hits': self.memory_hits,
+                'disk_hits': self.disk_hits,
+                'misses': self.misses,
+                'hit_rate': round((lookups - self.misses) / lookups * 100, 1) if lookups else 0,
+                'memory_entries': len(self._memory),
+                'disk_entries': disk_entries,
+                'unsaved_entries': len(self._unsaved),
+                'disk_writes': self.disk_writes,
+            }
+
+
+_location_cache: Optional[LocationCache] = None
+_location_cache_lock = threading.Lock()
+
+
+def get_location_cache() -> LocationCache:
+    """Return the shared cache, configured from ``Config`` on first use."""
+    global _location_cache
+    with _location_cache_lock:
+        if _location_cache is None:
+            _location_cache = LocationCache(
+                path=Config.LOCATION_CACHE_PATH,
+                max_entries=Config.LOCATION_CACHE_SIZE,
+            )
+            # Write out the last batch of new entries before the interpreter exits
+            atexit.register(_location_cache.flush)
+        return _location_cache
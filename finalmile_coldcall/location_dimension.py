@@ -0,0 +1,123 @@
+"""Normalize free-form post locations into ``(city, state_abbr)`` pairs.
+
+``OutreachStatus.location`` holds whatever the parser extracted: "Reno, NV",
+"Colorado", "Dallas-Fort Worth, TX", "Austin", "Unknown". Each post also
+points at a ``Location`` row keyed by the normalized pair, so filtering by
+state or city is an index seek on integers instead of string parsing.
+
+Normalization uses what ``constants`` already knows: ``STATE_MAP`` for state
+names, ``STATE_FULL_MAP`` for abbreviations, and the cities in
+``AIRPORT_MAP`` (then the gazetteer, when one has been built) for the state
+of a bare city name. Parts that cannot be resolved are ``''`` (as in
+``post_counters``), so ``('', '')`` is the single row every unresolved
+location shares.
+"""
+
+import re
+from functools import lru_cache
+from typing import Dict, NamedTuple, Optional
+
+from constants import AIRPORT_MAP, KNOWN_CITIES, STATE_FULL_MAP, STATE_MAP
+from gazetteer import get_gazetteer
+
+# Abbreviation -> state name, including DC, which ``us.states.STATES`` leaves out
+STATE_NAMES: Dict[str, str] = {**STATE_FULL_MAP, "DC": "District of Columbia"}
+
+_STATE_BY_NAME = {name.lower(): abbr for name, abbr in STATE_MAP.items()}
+_STATE_BY_NAME["district of columbia"] = "DC"
+_STATE_BY_NAME["washington dc"] = "DC"
+
+_SPACES_RE = re.compile(r"\s+")
+
+
+class NormalizedLocation(NamedTuple):
+    """A location reduced to its city and two-letter state ('' if unknown)."""
+
+    city: str
+    state_abbr: str
+
+
+UNRESOLVED = NormalizedLocation("", "")
+
+
+def _city_states() -> Dict[str, NormalizedLocation]:
+    """Bare city name -> (city, state) for the cities ``AIRPORT_MAP`` places in one state."""
+    found: Dict[str, set] = {}
+    spelling: Dict[str, str] = {}
+    for label in AIRPORT_MAP.values():
+        city, _, abbr = label.rpartition(",")
+        key = city.strip().lower()
+        found.setdefault(key, set()).add(abbr.strip())
+        spelling[key] = city.strip()
+    return {
+        key: NormalizedLocation(spelling[key], next(iter(states)))
+        for key, states in found.items() if len(states) == 1
+    }
+
+
+_CITY_STATES = _city_states()
+_KNOWN_CITIES = {city.lower(): city for city in KNOWN_CITIES}
+
+
+def _clean_city(city: str) -> str:
+    """Collapse whitespace and fix the case of all-lower or all-upper names."""
+    city = _SPACES_RE.sub(" ", city).strip(" -")
+    if city.islower() or city.isupper():
+        city = city.title()
+    return city
+
+
+def _state_abbr(state: str) -> Optional[str]:
+    state = state.strip().rstrip(".")
+    if len(state) == 2 and state.upper() in STATE_NAMES:
+        return state.upper()
+    return _STATE_BY_NAME.get(_SPACES_RE.sub(" ", state).lower())
+
+
+@lru_cache(maxsize=65536)
+def normalize_location(location: Optional[str]) -> NormalizedLocation:
+    """
+    Reduce a stored location string to ``(city, state_abbr)``.
+
+    Args:
+        location: ``OutreachStatus.location`` as the parser produced it
+
+    Returns:
+        NormalizedLocation; either part is '' when it cannot be resolved,
+        and ``UNRESOLVED`` when neither can (including "Unknown")
+    """
+    if not location:
+        return UNRESOLVED
+    location = _SPACES_RE.sub(" ", location).strip()
+
+    # "City, ST" / "City, State"
+    city, comma, state = location.rpartition(",")
+    if comma:
+        abbr = _state_abbr(state)
+        if abbr is None:
+            return UNRESOLVED
+        city = _clean_city(city)
+        known = _CITY_STATES.get(city.lower())
+        if known and known.state_abbr == abbr:
+            city = known.city
+        return NormalizedLocation(city, abbr)
+
+    # A state on its own: "Colorado", "CO"
+    abbr = _state_abbr(location)
+    if abbr is not None:
+        return NormalizedLocation("", abbr)
+
+    # A bare city: its state if the airport table or the gazetteer places it
+    # in one state, else city only
+    key = location.lower()
+    if key in _CITY_STATES:
+        return _CITY_STATES[key]
+    gazetteer = get_gazetteer()
+    place = gazetteer.lookup(location) if gazetteer is not None else None
+    if place and len(place.states) == 1:
+        return NormalizedLocation(place.name, place.states[0])
+    if key in _KNOWN_CITIES:
+        return NormalizedLocation(_KNOWN_CITIES[key], "")
+    if place:
+        return NormalizedLocation(place.name, "")
+    return UNRESOLVED
@@ -0,0 +1,615 @@
+"""Single-pass location parser for Reddit post titles.
+
+The title is tokenized once into letter words, whitespace blocks and single
+"other" characters. Every extraction rule then works on that token list, and
+dictionary lookups (airport codes, known cities, generic phrases) go through
+precompiled, deduplicated structures instead of ad-hoc regexes. Each rule is
+linear in the title length, so worst-case time per title is bounded.
+
+The rules and their precedence mirror the original regex cascade exactly,
+including its quirks (e.g. ``"St. Louis"`` matching any character in place of
+the dot, and any two letters counting as a state under ``re.IGNORECASE``).
+
+When a compiled gazetteer is available (see ``gazetteer``), it refines those
+rules: a "City, ST" match is trimmed to the place name it ends with, a state
+on its own or a known city is qualified with a place or state the title also
+names, and a place found anywhere in the title is preferred to the
+phrase-before-price guess and to "Unknown".
+"""
+
+import hashlib
+import inspect
+import re
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from constants import AIRPORT_MAP, KNOWN_CITIES, STATE_FULL_MAP, STATE_MAP
+from gazetteer import Gazetteer, get_gazetteer
+
+# Digest of the parsing code: this module and the gazetteer lookups it calls.
+# Together with the dictionaries and gazetteer passed to LocationParser it
+# makes up the parser fingerprint, so any code change invalidates cached parses.
+CODE_DIGEST = hashlib.sha1(b"".join(
+    Path(path).read_bytes() for path in (__file__, inspect.getsourcefile(Gazetteer))
+)).hexdigest()
+
+# Characters that case-insensitive ``[A-Za-z]`` also matches in Unicode mode.
+_SPECIAL_LETTERS = {"İ": "i", "ı": "i", "ſ": "s", "K": "k"}
+
+_SEPARATOR_TABLE = str.maketrans({"|": " ", "/": " "})
+_FOLD_TABLE = str.maketrans(
+    {**{chr(c): chr(c + 32) for c in range(ord("A"), ord("Z") + 1)}, **_SPECIAL_LETTERS}
+)
+
+_TOKEN_RE = re.compile(r"([A-Za-z]+)|(\s+)|(.)", re.DOTALL)
+_AREA_WORDS_RE = re.compile(r"\b(Area|County|Metro)\b", re.IGNORECASE)
+
+_WORD, _SPACE, _OTHER = 1, 2, 3
+
+# Airport-code rule: ``[A-Za-z\s]{3,15}`` before the code.
+_AIRPORT_PREFIX_MIN = 3
+_AIRPORT_PREFIX_MAX = 15
+
+GENERIC_PREFIXES = (
+    "i did it",
+    "i did, it",
+    "we did it",
+    "we did, it",
+    "finally did it",
+    "finally did, it",
+    "finally did",
+    "got the keys",
+    "got keys",
+    "got the",
+    "we got the",
+    "we finally",
+    "i opted",
+    "first home",
+    "dream come",
+    "saving paid",
+    "first month",
+    "we did",
+    "i did",
+)
+
+Token = Tuple[int, int, int]  # (kind, start, end)
+
+
+def _is_word_char(char: str) -> bool:
+    """Return True if ``char`` matches the regex ``\\w`` class."""
+    return char.isalnum() or char == "_"
+
+
+def _tokenize(text: str) -> List[Token]:
+    """Split text into letter words, whitespace blocks and single other chars."""
+    return [(m.lastindex, m.start(), m.end()) for m in _TOKEN_RE.finditer(text)]
+
+
+def _runs(tokens: List[Token]) -> List[Tuple[int, int]]:
+    """Group consecutive word/whitespace tokens into ``[first, last)`` index ranges."""
+    runs = []
+    first = None
+    for index, (kind, _, _) in enumerate(tokens):
+        if kind == _OTHER:
+            if first is not None:
+                runs.append((first, index))
+                first = None
+        elif first is None:
+            first = index
+    if first is not None:
+        runs.append((first, len(tokens)))
+    return runs
+
+
+def normalize_title(title: str) -> str:
+    """
+    Apply the separator and parenthetical clean-up every rule runs on.
+
+    Titles with the same normalized form always parse to the same location.
+    """
+    return _remove_parentheticals(title.translate(_SEPARATOR_TABLE))
+
+
+def _remove_parentheticals(text: str) -> str:
+    """Drop every ``(...)`` group, matching the non-nested ``\\([^)]*\\)`` rule."""
+    start = text.find("(")
+    if start < 0:
+        return text
+    parts = []
+    pos = 0
+    while start >= 0:
+        end = text.find(")", start + 1)
+        if end < 0:
+            break
+        parts.append(text[pos:start])
+        pos = end + 1
+        start = text.find("(", pos)
+    parts.append(text[pos:])
+    return "".join(parts)
+
+
+class _CityTrie:
+    """Character trie over known city names, honouring ``.`` as a wildcard."""
+
+    def __init__(self, names: Iterable[str]):
+        self.root: Dict = {}
+        for index, name in enumerate(names):
+            node = self.root
+            for char in name.lower():
+                node = node.setdefault(char, {})
+            node.setdefault(None, index)
+
+    def best_match(self, text: str, start: int) -> Optional[Tuple[int, int]]:
+        """
+        Find the lowest-index name matching at ``start`` and ending on a word boundary.
+
+        Returns:
+            ``(index, end)`` of the winning name, or None.
+        """
+        best = None
+        length = len(text)
+        stack = [(self.root, start)]
+        while stack:
+            node, pos = stack.pop()
+            index = node.get(None)
+            if index is not None and (best is None or index < best[0]):
+                if pos == length or not _is_word_char(text[pos]):
+                    best = (index, pos)
+            if pos == length:
+                continue
+            char = text[pos]
+            child = node.get(char)
+            if child is not None:
+                stack.append((child, pos + 1))
+            wildcard = node.get(".")
+            if wildcard is not None and char != "\n" and char != ".":
+                stack.append((wildcard, pos + 1))
+        return best
+
+
+class _SubstringAutomaton:
+    """Aho-Corasick automaton returning the lowest-index name found anywhere in a text."""
+
+    def __init__(self, names: Iterable[str]):
+        self.goto: List[Dict[str, int]] = [{}]
+        self.best: List[Optional[int]] = [None]
+        for index, name in enumerate(names):
+            state = 0
+            for char in name:
+                nxt = self.goto[state].get(char)
+                if nxt is None:
+                    nxt = len(self.goto)
+                    self.goto[state][char] = nxt
+                    self.goto.append({})
+                    self.best.append(None)
+                state = nxt
+            if self.best[state] is None:
+                self.best[state] = index
+
+        self.fail = [0] * len(self.goto)
+        queue = list(self.goto[0].values())
+        for state in queue:
+            for char, nxt in self.goto[state].items():
+                queue.append(nxt)
+                fallback = self.fail[state]
+                while fallback and char not in self.goto[fallback]:
+                    fallback = self.fail[fallback]
+                self.fail[nxt] = self.goto[fallback].get(char, 0)
+                inherited = self.best[self.fail[nxt]]
+                if inherited is not None and (self.best[nxt] is None or inherited < self.best[nxt]):
+                    self.best[nxt] = inherited
+
+    def lowest_index_in(self, text: str) -> Optional[int]:
+        """Return the lowest index of any name occurring in ``text``."""
+        goto, fail, best = self.goto, self.fail, self.best
+        found = None
+        state = 0
+        for char in text:
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            index = best[state]
+            if index is not None and (found is None or index < found):
+                found = index
+                if found == 0:
+                    break
+        return found
+
+
+class LocationParser:
+    """Compiled location parser; build once and reuse for every title."""
+
+    def __init__(
+        self,
+        known_cities: Iterable[str] = KNOWN_CITIES,
+        airport_map: Dict[str, str] = AIRPORT_MAP,
+        state_map: Dict[str, str] = STATE_MAP,
+        state_full_map: Dict[str, str] = STATE_FULL_MAP,
+        generic_prefixes: Iterable[str] = GENERIC_PREFIXES,
+        gazetteer: Optional[Gazetteer] = None,
+    ):
+        # Duplicates never change a result because the first occurrence always wins.
+        self.cities: Tuple[str, ...] = tuple(dict.fromkeys(known_cities))
+        self.airport_map = dict(airport_map)
+        self.state_map = dict(state_map)
+        self.state_full_map = dict(state_full_map)
+        # Longest first, so "we did it" is preferred over "we did".
+        self.generic_prefixes = tuple(
+            sorted(dict.fromkeys(generic_prefixes), key=len, reverse=True)
+        )
+
+        digest = hashlib.sha1(repr((
+            self.cities,
+            sorted(self.airport_map.items()),
+            sorted(self.state_map.items()),
+            sorted(self.state_full_map.items()),
+            self.generic_prefixes,
+        )).encode("utf-8")).hexdigest()
+        self.fingerprint = f"{CODE_DIGEST[:12]}-{digest[:12]}"
+        self.gazetteer = gazetteer
+        if gazetteer is not None:
+            self.fingerprint += f"-{gazetteer.digest[:12]}"
+
+        self._city_trie = _CityTrie(self.cities)
+        lowered = [city.lower() for city in self.cities]
+        self._city_set = frozenset(lowered)
+        self._city_automaton = _SubstringAutomaton(lowered)
+
+    def parse(self, title: str) -> str:
+        """
+        Extract city and state from a Reddit title.
+
+        Args:
+            title: Post title.
+
+        Returns:
+            Location string in the form 'City, State' or best-effort extraction.
+        """
+        text = normalize_title(title)
+        folded = text.translate(_FOLD_TABLE)
+        folded_tokens = _tokenize(folded)
+        folded_runs = _runs(folded_tokens)
+
+        # 1) City/state patterns (case-insensitive, so they run on the folded text)
+        match = self._match_city_state(text, folded_tokens, folded_runs)
+        if match:
+            city, state = match
+            if self.gazetteer is not None:
+                located = self._refine_city_state(text, city, state.strip())
+                if located:
+                    return located
+            city = _AREA_WORDS_RE.sub("", city.strip()).strip()
+            state = state.strip()
+            if len(state) != 2:
+                state = self.state_map.get(state, state)
+            return f"{city}, {state}"
+
+        # The remaining rules are case-sensitive; the folded tokens only differ
+        # from the original ones when the title contains a special letter.
+        if text.isascii() or not any(char in text for char in _SPECIAL_LETTERS):
+            tokens, runs = folded_tokens, folded_runs
+        else:
+            tokens = _tokenize(text)
+            runs = _runs(tokens)
+
+        # 2) Airport codes like RNO, DFW preceded by text
+        airport = self._match_airport_after_text(text, tokens, runs)
+        if airport:
+            prefix, code = airport
+            if code in self.airport_map:
+                return self.airport_map[code]
+            return f"{prefix.strip()} {code}"
+
+        # 2b) Airport code alone before price/number (e.g., "RNO 564k")
+        code = self._match_airport_before_number(text, tokens)
+        if code:
+            return self.airport_map[code]
+
+        # 3) Standalone state abbreviations (e.g., "CO $560k")
+        state = self._match_state_abbreviation(text, tokens)
+        if state:
+            if self.gazetteer is not None:
+                located = self.gazetteer.locate(text)
+                if located and located.confirmed and located.state == state:
+                    return str(located)
+            return self.state_full_map.get(state, state)
+
+        # 4) Known city names anywhere, as whole words
+        for kind, start, _ in folded_tokens:
+            if kind == _WORD and (start == 0 or not _is_word_char(folded[start - 1])):
+                found = self._city_trie.best_match(folded, start)
+                if found:
+                    city = text[start:found[1]]
+                    if self.gazetteer is not None:
+                        state = self.gazetteer.state_for(city, text)
+                        if state:
+                            return f"{city}, {state}"
+                    return city
+
+        # 4b) Any gazetteer place, settled by the states the title names
+        if self.gazetteer is not None:
+            located = self.gazetteer.locate(text)
+            if located:
+                return str(located)
+
+        # 5) Phrase before a price, skipping generic phrases
+        phrase = self._match_phrase_before_price(text, folded_tokens)
+        if phrase is not None:
+            return self._resolve_phrase(phrase)
+
+        # 6) Known cities as plain substrings
+        index = self._city_automaton.lowest_index_in(text.lower())
+        if index is not None:
+            return self.cities[index]
+
+        return "Unknown"
+
+    def _refine_city_state(self, text: str, city: str, state: str) -> Optional[str]:
+        """
+        Use the gazetteer on a city/state match; None keeps the match as it is.
+
+        A real state (an upper-case abbreviation outside an all-caps title,
+        or a state name) keeps the match, with the city trimmed to the place
+        in that state it ends with, or replaced by one the title names
+        elsewhere. Any other two letters ("in", "we") made the match by
+        accident, so the place the title names, if any, is used instead.
+        """
+        if len(state) == 2:
+            real = state.isupper() and not text.isupper() and state in self.state_full_map
+            abbr = state if real else None
+        else:
+            abbr = self.state_map.get(state)
+        if abbr:
+            place = self.gazetteer.trim(city, abbr)
+            if place:
+                return f"{place}, {abbr}"
+        located = self.gazetteer.locate(text)
+        if located and (not abbr or (located.confirmed and located.state == abbr)):
+            return str(located)
+        return None
+
+    def _match_city_state(self, text, tokens, runs) -> Optional[Tuple[str, str]]:
+        """Apply the five city/state shapes in priority order."""
+        for shape in (
+            self._city_comma_abbr,
+            self._city_space_abbr,
+            self._city_comma_state_before_price,
+            self._city_state_name_before_price,
+            self._city_abbr_before_number,
+        ):
+            match = shape(text, tokens, runs)
+            if match:
+                return match
+        return None
+
+    @staticmethod
+    def _city_comma_abbr(text, tokens, runs):
+        """``City, ST`` where ST is any two letters."""
+        length = len(text)
+        for index, (first, last) in enumerate(runs[:-1]):
+            start, end = tokens[first][1], tokens[last - 1][2]
+            next_first, next_last = runs[index + 1]
+            if text[end] != "," or tokens[next_first][1] != end + 1:
+                continue
+            word = next_first + 1 if tokens[next_first][0] == _SPACE else next_first
+            if word >= next_last:
+                continue
+            _, word_start, word_end = tokens[word]
+            if word_end - word_start != 2:
+                continue
+            if word + 1 < next_last or word_end == length or not _is_word_char(text[word_end]):
+                return text[start:end], text[word_start:word_end]
+        return None
+
+    @staticmethod
+    def _city_space_abbr(text, tokens, runs):
+        """``City ST`` where ST is any two-letter word."""
+        length = len(text)
+        for first, last in runs:
+            start = tokens[first][1]
+            for index in range(first + 1, last):
+                kind, word_start, word_end = tokens[index]
+                if kind != _WORD or word_end - word_start != 2:
+                    continue
+                if max(tokens[index - 1][1], start + 1) > word_start - 1:
+                    continue
+                if index + 1 < last or word_end == length or not _is_word_char(text[word_end]):
+                    return text[start:word_start], text[word_start:word_end]
+        return None
+
+    @staticmethod
+    def _city_comma_state_before_price(text, tokens, runs):
+        """``City, State $``."""
+        length = len(text)
+        for index, (first, last) in enumerate(runs[:-1]):
+            start, end = tokens[first][1], tokens[last - 1][2]
+            next_first, next_last = runs[index + 1]
+            if text[end] != "," or tokens[next_first][1] != end + 1:
+                continue
+            state_end = tokens[next_last - 1][2]
+            if state_end < length and text[state_end] == "$":
+                return text[start:end], text[end + 1:state_end]
+        return None
+
+    @staticmethod
+    def _city_state_name_before_price(text, tokens, runs):
+        """``City State $`` where State is one word, or two separated by one space."""
+        length = len(text)
+        for first, last in runs:
+            start, end = tokens[first][1], tokens[last - 1][2]
+            if end >= length or text[end] != "$":
+                continue
+            words = [i for i in range(first, last) if tokens[i][0] == _WORD]
+            if not words:
+                continue
+            candidates = []
+            if len(words) >= 2:
+                previous = words[-2]
+                gap = tokens[previous + 1]
+                if tokens[previous][2] - tokens[previous][1] >= 2 and gap[2] - gap[1] == 1:
+                    candidates.append(previous)
+            if tokens[words[-1]][2] - tokens[words[-1]][1] >= 2:
+                candidates.append(words[-1])
+            for word in candidates:
+                if word == first:
+                    continue
+                word_start = tokens[word][1]
+                if max(tokens[word - 1][1], start + 1) <= word_start - 1:
+                    return text[start:word_start], text[word_start:end]
+        return None
+
+    @staticmethod
+    def _city_abbr_before_number(text, tokens, runs):
+        """``City ST`` immediately followed by a digit."""
+        length = len(text)
+        for first, last in runs:
+            start, end = tokens[first][1], tokens[last - 1][2]
+            if end >= length or not "0" <= text[end] <= "9":
+                continue
+            word = last - 1
+            if tokens[word][0] == _SPACE:
+                word -= 1
+            if word <= first:
+                continue
+            _, word_start, word_end = tokens[word]
+            if word_end - word_start != 2:
+                continue
+            if max(tokens[word - 1][1], start + 1) <= word_start - 1:
+                return text[start:word_start], text[word_start:word_end]
+        return None
+
+    @staticmethod
+    def _match_airport_after_text(text, tokens, runs):
+        """3-15 letters/spaces, whitespace, then a three-capital code."""
+        length = len(text)
+        for first, last in runs:
+            run_start = tokens[first][1]
+            # Each entry is (lowest prefix end, highest prefix end, code start)
+            spans = []
+            for index in range(first + 1, last):
+                kind, code_start, code_end = tokens[index]
+                if kind != _WORD or code_end - code_start != 3:
+                    continue
+                if not text[code_start:code_end].isupper():
+                    continue
+                if index + 1 < last or code_end == length or not _is_word_char(text[code_end]):
+                    spans.append((tokens[index - 1][1], code_start - 1, code_start))
+            if not spans:
+                continue
+
+            first_end = None
+            for low, high, _ in spans:
+                low = max(low, run_start + _AIRPORT_PREFIX_MIN)
+                if low <= high:
+                    first_end = low
+                    break
+            if first_end is None:
+                continue
+
+            # Leftmost start, then the longest prefix the regex would greedily take
+            prefix_start = max(run_start, first_end - _AIRPORT_PREFIX_MAX)
+            limit = prefix_start + _AIRPORT_PREFIX_MAX
+            best = None
+            for low, high, code_start in spans:
+                if low > limit:
+                    break
+                prefix_end = min(high, limit)
+                if prefix_end >= first_end:
+                    best = (prefix_end, code_start)
+            prefix_end, code_start = best
+            return text[prefix_start:prefix_end], text[code_start:code_start + 3]
+        return None
+
+    def _match_airport_before_number(self, text, tokens):
+        """Known airport code as a whole word, whitespace, optional ``$``, digit."""
+        length = len(text)
+        for index in range(len(tokens) - 1):
+            kind, start, end = tokens[index]
+            if kind != _WORD or end - start != 3 or text[start:end] not in self.airport_map:
+                continue
+            if start and _is_word_char(text[start - 1]):
+                continue
+            if tokens[index + 1][0] != _SPACE:
+                continue
+            pos = tokens[index + 1][2]
+            if pos < length and text[pos] == "$":
+                pos += 1
+            if pos < length and text[pos].isdecimal():
+                return text[start:end]
+        return None
+
+    @staticmethod
+    def _match_state_abbreviation(text, tokens):
+        """First standalone two-capital word."""
+        length = len(text)
+        for kind, start, end in tokens:
+            if kind != _WORD or end - start != 2 or not text[start:end].isupper():
+                continue
+            if start and _is_word_char(text[start - 1]):
+                continue
+            if end == length or not _is_word_char(text[end]):
+                return text[start:end]
+        return None
+
+    @staticmethod
+    def _match_phrase_before_price(text, tokens):
+        """Text from the start of a line up to whitespace followed by ``$`` and a digit."""
+        length = len(text)
+        for index in range(1, len(tokens)):
+            kind, price_start, _ = tokens[index]
+            if kind != _OTHER or text[price_start] != "$" or tokens[index - 1][0] != _SPACE:
+                continue
+            if price_start + 1 >= length or not text[price_start + 1].isdecimal():
+                continue
+            # The phrase may not span a newline, but the whitespace before "$" may.
+            gap_start = tokens[index - 1][1]
+            line_start = text.rfind("\n", 0, gap_start) + 1
+            pos = gap_start
+            while True:
+                line_end = text.find("\n", line_start)
+                if line_end < 0:
+                    line_end = length
+                phrase_end = max(pos, line_start + 1)
+                if phrase_end <= min(price_start - 1, line_end):
+                    return text[line_start:phrase_end]
+                if line_end >= price_start - 1:
+                    break
+                line_start = pos = line_end + 1
+        return None
+
+    def _resolve_phrase(self, phrase: str) -> str:
+        """Clean a pre-price phrase, looking past generic openers for a known city."""
+        loc_clean = _AREA_WORDS_RE.sub("", phrase.strip()).strip()
+        lowered = loc_clean.lower()
+        for word in self.generic_prefixes:
+            if lowered.startswith(word):
+                remaining = loc_clean[len(word):].strip(", ").strip()
+                if remaining.lower() in self._city_set:
+                    return remaining
+                index = self._city_automaton.lowest_index_in(remaining.lower())
+                if index is not None:
+                    return self.cities[index]
+                return "Unknown"
+        return loc_clean
+
+
+_default_parser: Optional[LocationParser] = None
+
+
+def get_parser() -> LocationParser:
+    """Return the shared parser, compiling it on first use."""
+    global _default_parser
+    if _default_parser is None:
+        _default_parser = LocationParser(gazetteer=get_gazetteer())
+    return _default_parser
+
+
+def parse_location(title: str) -> str:
+    """Parse a title with the shared parser."""
+    return get_parser().parse(title)
+
+
+def parse_locations(titles: List[str]) -> List[str]:
+    """Parse a batch of titles with the shared parser (a process-pool task)."""
+    parser = get_parser()
+    return [parser.parse(title) for title in titles]
@@ -2,18 +2,27 @@
 
 from flask_sqlalchemy import SQLAlchemy
 from datetime import datetime
+from sqlalchemy import inspect, text
 
 db = SQLAlchemy()
 
 class OutreachStatus(db.Model):
     """Track outreach status for each Reddit user."""
     __tablename__ = 'outreach_status'
+    __table_args__ = (
+        # Keyset pagination: newest first, optionally within one status tab
+        db.Index('ix_outreach_status_status_created_id', 'status', 'created_at', 'id'),
+        db.Index('ix_outreach_status_created_id', 'created_at', 'id'),
+        # State/city facets: newest first within each normalized location
+        db.Index('ix_outreach_status_location_created_id', 'location_id', 'created_at', 'id'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     username = db.Column(db.String(100), unique=True, nullable=False, index=True)
     post_title = db.Column(db.Text, nullable=False)
     post_url = db.Column(db.String(500), nullable=False)
     location = db.Column(db.String(200))
+    location_id = db.Column(db.Integer, db.ForeignKey('locations.id'))  # normalized ``location``
     status = db.Column(db.String(20), default='Not Sent')  # Not Sent, Sent
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     sent_at = db.Column(db.DateTime)
@@ -27,6 +36,89 @@ class OutreachStatus(db.Model):
         self.sent_at = datetime.utcnow()
         db.session.commit()
 
+class Location(db.Model):
+    """Normalized (city, state) a post's free-form location resolves to."""
+    __tablename__ = 'locations'
+    __table_args__ = (
+        # Doubles as the state facet index: WHERE state_abbr = ? is a seek
+        db.UniqueConstraint('state_abbr', 'city', name='uq_locations_state_city'),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True)
+    state_abbr = db.Column(db.String(2), nullable=False, default='')  # '' if unresolved
+    city = db.Column(db.String(100), nullable=False, default='')  # '' for a state on its own
+    
+    def __repr__(self):
+        return f'<Location {self.city}, {self.state_abbr}>'
+
+class PostCounter(db.Model):
+    """Post count per (status, location), kept in step with OutreachStatus."""
+    __tablename__ = 'post_counters'
+    
+    status = db.Column(db.String(20), primary_key=True)
+    location = db.Column(db.String(200), primary_key=True)  # '' for posts without a location
+    posts = db.Column(db.Integer, nullable=False, default=0)
+    
+    def __repr__(self):
+        return f'<PostCounter {self.status}/{self.location}: {self.posts}>'
+
+class ScrapeCheckpoint(db.Model):
+    """High-water mark of the newest post processed per subreddit listing."""
+    __tablename__ = 'scrape_checkpoints'
+    __table_args__ = (db.UniqueConstraint('subreddit', 'sort'),)
+    
+    id = db.Column(db.Integer, primary_key=True)
+    subreddit = db.Column(db.String(100), nullable=False)
+    sort = db.Column(db.String(20), nullable=False)
+    newest_fullname = db.Column(db.String(20), nullable=False)
+    newest_created_utc = db.Column(db.Float, nullable=False)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    def __repr__(self):
+        return f'<ScrapeCheckpoint r/{self.subreddit}/{self.sort}: {self.newest_fullname}>'
+
+class RefreshJob(db.Model):
+    """A Reddit refresh run by the background worker or the CLI."""
+    __tablename__ = 'refresh_jobs'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    status = db.Column(db.String(20), default='queued', nullable=False, index=True)  # queued, running, succeeded, failed
+    backfill = db.Column(db.Boolean, default=False, nullable=False)
+    progress = db.Column(db.String(100))
+    result = db.Column(db.JSON)
+    error = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    started_at = db.Column(db.DateTime)
+    finished_at = db.Column(db.DateTime)
+    
+    def __repr__(self):
+        return f'<RefreshJob {self.id}: {self.status}>'
+    
+    def to_dict(self):
+        """Serialize the job for the status endpoint."""
+        return {
+            'id': self.id,
+            'status': self.status,
+            'backfill': self.backfill,
+            'progress': self.progress,
+            'result': self.result,
+            'error': self.error,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'started_at': self.started_at.isoformat() if self.started_at else None,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None,
+        }
+
+class AppLock(db.Model):
+    """Named lock shared by every process using the database."""
+    __tablename__ = 'app_locks'
+    
+    name = db.Column(db.String(100), primary_key=True)
+    owner = db.Column(db.String(200), nullable=False)
+    expires_at = db.Column(db.DateTime, nullable=False)
+    
+    def __repr__(self):
+        return f'<AppLock {self.name}: {self.owner}>'
+
 class MessageTemplate(db.Model):
     """Store message templates for outreach."""
     __tablename__ = 'message_templates'
@@ -39,3 +131,92 @@ class MessageTemplate(db.Model):
     
     def __repr__(self):
         return f'<MessageTemplate {self.name}>'
+
+
+def create_missing_columns() -> None:
+    """
+    Add nullable columns added to models after their tables already existed.
+    
+    ``db.create_all()`` never alters existing tables; columns added since are
+    nullable, so a plain ADD COLUMN is enough. Run it before
+    ``create_missing_indexes``, whose indexes may cover the new columns.
+    """
+    inspector = inspect(db.engine)
+    existing_tables = set(inspector.get_table_names())
+    with db.engine.begin() as connection:
+        for table in db.metadata.sorted_tables:
+            if table.name not in existing_tables:
+                continue
+            present = {column['name'] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in present or not column.nullable:
+                    continue
+                column_type = column.type.compile(dialect=db.engine.dialect)
+                connection.execute(text(f'ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}'))
+
+
+def create_missing_indexes() -> None:
+    """
+    Create indexes added to models after their tables already existed.
+    
+    ``db.create_all()`` skips tables that exist, so databases created before
+    an index was declared would otherwise never get it.
+    """
+    for table in db.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(db.engine, checkfirst=True)
+
+
+# Full-text index over post titles and locations. It is an external-content
+# FTS5 table (it stores only the index, reading rows from outreach_status),
+# kept in step by triggers so every write path updates it; status changes
+# don't touch indexed columns and skip it.
+SEARCH_INDEX_DDL = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS outreach_status_fts USING fts5("
+    " post_title, location,"
+    " content='outreach_status', content_rowid='id',"
+    " tokenize='unicode61 remove_diacritics 2', prefix='2 3')",
+    "CREATE TRIGGER IF NOT EXISTS outreach_status_fts_insert AFTER INSERT ON outreach_status BEGIN"
+    " INSERT INTO outreach_status_fts (rowid, post_title, location)"
+    " VALUES (new.id, new.post_title, new.location);"
+    " END",
+    "CREATE TRIGGER IF NOT EXISTS outreach_status_fts_delete AFTER DELETE ON outreach_status BEGIN"
+    " INSERT INTO outreach_status_fts (outreach_status_fts, rowid, post_title, location)"
+    " VALUES ('delete', old.id, old.post_title, old.location);"
+    " END",
+    "CREATE TRIGGER IF NOT EXISTS outreach_status_fts_update AFTER UPDATE OF post_title, location"
+    " ON outreach_status BEGIN"
+    " INSERT INTO outreach_status_fts (outreach_status_fts, rowid, post_title, location)"
+    " VALUES ('delete', old.id, old.post_title, old.location);"
+    " INSERT INTO outreach_status_fts (rowid, post_title, location)"
+    " VALUES (new.id, new.post_title, new.location);"
+    " END",
+]
+
+
+def search_index_supported() -> bool:
+    """True if the database can hold the FTS5 search index (SQLite only)."""
+    return db.engine.dialect.name == 'sqlite'
+
+
+def create_search_index() -> None:
+    """
+    Create the title search index and its triggers if they are missing.
+    
+    A newly created index is filled from the existing posts, and its ranking
+    is set to BM25 with title matches weighted twice as much as location
+    matches. Other databases are left alone; search falls back to LIKE there.
+    """
+    if not search_index_supported():
+        return
+    with db.engine.begin() as connection:
+        exists = connection.execute(text(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'outreach_status_fts'"
+        )).first()
+        for statement in SEARCH_INDEX_DDL:
+            connection.execute(text(statement))
+        if not exists:
+            connection.execute(text("INSERT INTO outreach_status_fts (outreach_status_fts) VALUES ('rebuild')"))
+            connection.execute(text(
+                "INSERT INTO outreach_status_fts (outreach_status_fts, rank) VALUES ('rank', 'bm25(2.0, 1.0)')"
+            ))
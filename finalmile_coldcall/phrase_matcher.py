@@ -0,0 +1,140 @@
+"""Compiled, weighted multi-phrase matcher for post flair, title and body.
+
+A post's flair, title and body are joined with a separator no phrase can
+contain, lowercased once and searched for every configured phrase
+(case-insensitive substring match, as before).
+
+Testing every phrase with ``in`` costs one pass over the text per phrase. For
+lists longer than ``DIRECT_SCAN_LIMIT`` the matcher instead compiles an index
+keyed by each phrase's *anchor*: its longest word with a delimiter
+(whitespace or punctuation) on both sides inside the phrase. Wherever the
+phrase occurs, its anchor is a whole word of the text, so a scan splits the
+text into words once, intersects them with the anchor set (in C) and only
+verifies the phrases whose anchor is present. Phrases too short to have an
+anchor (one or two words) are always verified. Past the limit, scan time
+depends on the text length rather than the number of phrases.
+
+Regex alternations and a pure-Python Aho-Corasick automaton were measured
+first; both were slower than the per-phrase ``in`` tests at every list size,
+because CPython's ``str`` search runs in C and an automaton stepping through
+every character does not.
+"""
+
+import string
+from functools import lru_cache
+from typing import Dict, Iterable, List, Mapping, NamedTuple, Optional, Tuple, Union
+
+# Phrases as configured: a phrase -> weight mapping, or phrases and/or
+# (phrase, weight) pairs; bare phrases weigh 1.0
+Phrases = Union[Mapping[str, float], Iterable[Union[str, Tuple[str, float]]]]
+WeightedPhrases = Tuple[Tuple[str, float], ...]
+
+# Joins the scanned fields so that no phrase can match across two of them
+_FIELD_SEPARATOR = "\x00"
+# Characters that separate words (besides whitespace); ASCII punctuation
+# covers what Reddit titles and bodies use between words
+_DELIMITERS = str.maketrans({char: " " for char in string.punctuation + _FIELD_SEPARATOR})
+
+# Up to this many phrases, testing each one directly beats splitting the
+# text into words (see benchmarks/bench_phrase_matcher.py)
+DIRECT_SCAN_LIMIT = 32
+
+
+class PhraseHits(NamedTuple):
+    """Phrases found in one post, in configuration order, and their total weight."""
+
+    phrases: Tuple[str, ...]
+    score: float
+
+
+NO_HITS = PhraseHits((), 0.0)
+
+
+def weighted_phrases(phrases: Phrases) -> WeightedPhrases:
+    """
+    Normalize configured phrases to a hashable tuple of (phrase, weight) pairs.
+
+    Empty phrases are dropped; for a phrase listed twice (ignoring case) the
+    first entry wins.
+    """
+    items = phrases.items() if isinstance(phrases, Mapping) else phrases
+    seen = set()
+    result = []
+    for item in items:
+        phrase, weight = (item, 1.0) if isinstance(item, str) else item
+        key = phrase.lower()
+        if key and key not in seen:
+            seen.add(key)
+            result.append((phrase, float(weight)))
+    return tuple(result)
+
+
+def _words(text: str) -> List[str]:
+    return text.translate(_DELIMITERS).split()
+
+
+def _anchor(phrase: str) -> Optional[str]:
+    """Return the longest word of ``phrase`` that has a delimiter on both sides within it."""
+    interior = _words(phrase)[1:-1]
+    return max(interior, key=len) if interior else None
+
+
+class PhraseMatcher:
+    """Weighted phrase set compiled once and reused for every post."""
+
+    def __init__(self, phrases: Phrases):
+        """
+        Args:
+            phrases: Phrases to look for (case-insensitive) and their weights.
+        """
+        self.phrases = weighted_phrases(phrases)
+        self._keys = [phrase.lower() for phrase, _ in self.phrases]
+        self._indexed = len(self._keys) > DIRECT_SCAN_LIMIT
+        self._unanchored: List[int] = []
+        self._by_anchor: Dict[str, List[int]] = {}
+        for index, key in enumerate(self._keys):
+            anchor = _anchor(key) if self._indexed else None
+            if anchor is None:
+                self._unanchored.append(index)
+            else:
+                self._by_anchor.setdefault(anchor, []).append(index)
+        self._anchors = frozenset(self._by_anchor)
+
+    def __len__(self) -> int:
+        return len(self.phrases)
+
+    def scan(self, *fields: Optional[str]) -> PhraseHits:
+        """
+        Find every phrase occurring in any of ``fields``.
+
+        Args:
+            fields: Texts to search, e.g. flair, title and body; None and
+                empty fields are skipped.
+
+        Returns:
+            PhraseHits with the phrases found, in configuration order, and
+            the sum of their weights
+        """
+        text = _FIELD_SEPARATOR.join(field for field in fields if field).lower()
+        candidates = self._unanchored
+        if self._anchors:
+            present = self._anchors.intersection(_words(text))
+            if present:
+                by_anchor = self._by_anchor
+                candidates = sorted(candidates + [index for anchor in present for index in by_anchor[anchor]])
+        keys = self._keys
+        found = [index for index in candidates if keys[index] in text]
+        if not found:
+            return NO_HITS
+        hits = [self.phrases[index] for index in found]
+        return PhraseHits(tuple(phrase for phrase, _ in hits), sum(weight for _, weight in hits))
+
+
+@lru_cache(maxsize=64)
+def _compiled(phrases: WeightedPhrases) -> PhraseMatcher:
+    return PhraseMatcher(phrases)
+
+
+def compile_phrases(phrases: Phrases) -> PhraseMatcher:
+    """Return a shared matcher for ``phrases``, compiling it on first use."""
+    return _compiled(weighted_phrases(phrases))
@@ -0,0 +1,263 @@
+"""Disk-backed cache of Reddit listing responses.
+
+Listing bodies are stored in a small SQLite file keyed by request URL,
+together with the time they expire and any ``ETag`` / ``Last-Modified``
+validators the server sent. The scrapers consult it before every request:
+
+* a fresh entry (younger than its subreddit's TTL) is served locally and no
+  request is made;
+* a stale entry with validators turns the request into a conditional one
+  (``If-None-Match`` / ``If-Modified-Since``); a ``304 Not Modified`` reuses
+  the stored body and renews its TTL;
+* anything else is fetched normally and stored.
+
+The file is bounded by ``max_bytes`` of stored bodies; least recently used
+entries are evicted first.
+"""
+
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Mapping, NamedTuple, Optional
+from urllib.parse import urlencode
+
+from config import Config
+
+
+class CachedResponse(NamedTuple):
+    """A stored listing body and what is needed to revalidate it."""
+
+    key: str
+    body: bytes
+    etag: Optional[str]
+    last_modified: Optional[str]
+    fresh: bool
+
+    def validators(self) -> Dict[str, str]:
+        """Request headers that make a fetch conditional on this entry."""
+        headers = {}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+
+def cache_key(url: str, params: Mapping[str, str]) -> str:
+    """Key a request by URL and sorted query parameters."""
+    return f"{url}?{urlencode(sorted(params.items()))}" if params else url
+
+
+class ResponseCache:
+    """TTL cache of listing bodies with conditional revalidation and LRU eviction."""
+
+    def __init__(
+        self,
+        path: str,
+        max_bytes: int = 64 * 2 ** 20,
+        default_ttl: float = 60.0,
+        ttls: Optional[Dict[str, float]] = None,
+    ):
+        """
+        Args:
+            path: SQLite file holding the cache.
+            max_bytes: Most body bytes kept before old entries are evicted.
+            default_ttl: Seconds a stored body is served without asking Reddit.
+            ttls: TTL per subreddit (case-insensitive), overriding the default.
+        """
+        self.max_bytes = max_bytes
+        self.default_ttl = default_ttl
+        self.ttls = {subreddit.lower(): ttl for subreddit, ttl in (ttls or {}).items()}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.revalidated = 0
+        self.misses = 0
+        self.stores = 0
+        self.evictions = 0
+
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS http_cache ("
+            " key TEXT PRIMARY KEY,"
+            " subreddit TEXT NOT NULL,"
+            " body BLOB NOT NULL,"
+            " size INTEGER NOT NULL,"
+            " etag TEXT,"
+            " last_modified TEXT,"
+            " expires_at REAL NOT NULL,"
+            " last_used REAL NOT NULL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS ix_http_cache_last_used ON http_cache (last_used)")
+        self._db.commit()
+        self._bytes = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM http_cache").fetchone()[0]
+
+    def ttl(self, subreddit: str) -> float:
+        """Seconds a body from ``subreddit`` stays fresh."""
+        return self.ttls.get(subreddit.lower(), self.default_ttl)
+
+    def lookup(self, key: str) -> Optional[CachedResponse]:
+        """
+        Find the entry for a request.
+
+        Returns:
+            The entry, fresh or stale, or None if there is nothing to reuse
+            (never stored, or stale without validators). A fresh entry counts
+            as a hit; anything else counts once the request settles.
+        """
+        now = time.time()
+        with self._lock:
+            row = self._db.execute(
+                "SELECT body, etag, last_modified, expires_at FROM http_cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            body, etag, last_modified, expires_at = row
+            fresh = expires_at > now
+            if not fresh and not etag and not last_modified:
+                self.misses += 1
+                return None
+            if fresh:
+                self.hits += 1
+                self._db.execute("UPDATE http_cache SET last_used = ? WHERE key = ?", (now, key))
+                self._db.commit()
+            return CachedResponse(key, body, etag, last_modified, fresh)
+
+    def store(self, key: str, subreddit: str, body: bytes, headers: Mapping[str, str]) -> None:
+        """Store a fetched body with the response's validators, evicting if over budget."""
+        now = time.time()
+        with self._lock:
+            previous = self._db.execute("SELECT size FROM http_cache WHERE key = ?", (key,)).fetchone()
+            self._db.execute(
+                "INSERT OR REPLACE INTO http_cache "
+                "(key, subreddit, body, size, etag, last_modified, expires_at, last_used) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (key, subreddit, body, len(body), headers.get("ETag"), headers.get("Last-Modified"),
+                 now + self.ttl(subreddit), now),
+            )
+            self._bytes += len(body) - (previous[0] if previous else 0)
+            self.stores += 1
+            self._evict()
+            self._db.commit()
+
+    def renew(self, entry: CachedResponse, subreddit: str) -> None:
+        """Mark a stale entry fresh again after a ``304 Not Modified``."""
+        now = time.time()
+        with self._lock:
+            self.revalidated += 1
+            self._db.execute(
+                "UPDATE http_cache SET expires_at = ?, last_used = ? WHERE key = ?",
+                (now + self.ttl(subreddit), now, entry.key),
+            )
+            self._db.commit()
+
+    def note_refetch(self) -> None:
+        """Count a stale entry whose revalidation returned a new body."""
+        with self._lock:
+            self.misses += 1
+
+    def _evict(self) -> None:
+        """Drop least recently used entries until the stored bodies fit ``max_bytes``."""
+        while self._bytes > self.max_bytes:
+            rows = self._db.execute(
+                "SELECT key, size FROM http_cache ORDER BY last_used LIMIT 32"
+            ).fetchall()
+            if not rows:
+                break
+            for key, size in rows:
+                if self._bytes <= self.max_bytes:
+                    break
+                self._db.execute("DELETE FROM http_cache WHERE key = ?", (key,))
+                self._bytes -= size
+                self.evictions += 1
+
+    def clear(self) -> None:
+        """Drop every entry and reset the counters."""
+        with self._lock:
+            self._db.execute("DELETE FROM http_cache")
+            self._db.commit()
+            self._bytes = 0
+            self.hits = self.revalidated = self.misses = self.stores = self.evictions = 0
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get cache effectiveness counters.
+
+        Returns:
+            Dictionary with hit/revalidation/miss counts, hit rate and size
+        """
+        with self._lock:
+            lookups = self.hits + self.revalidated + self.misses
+            entries = self._db.execute("SELECT COUNT(*) FROM http_cache").fetchone()[0]
+            return {
+                'hits': self.hits,
+                'revalidated': self.revalidated,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups * 100, 1) if lookups else 0,
+                'hit_rate_with_revalidation': round((self.hits + self.revalidated) / lookups * 100, 1) if lookups else 0,
+                'stores': self.stores,
+                'evictions': self.evictions,
+                'entries': entries,
+                'bytes': self._bytes,
+                'max_bytes': self.max_bytes,
+                'default_ttl_seconds': self.default_ttl,
+                'ttls': dict(self.ttls),
+            }
+
+
+_response_cache: Optional[ResponseCache] = None
+_response_cache_lock = threading.Lock()
+
+
+def get_response_cache() -> Optional[ResponseCache]:
+    """Return the shared cache, or None if ``Config.HTTP_CACHE_PATH`` is empty."""
+    global _response_cache
+    if not Config.HTTP_CACHE_PATH:
+        return None
+    with _response_cache_lock:
+        if _response_cache is None:
+            _response_cache = ResponseCache(
+                Config.HTTP_CACHE_PATH,
+                max_bytes=Config.HTTP_CACHE_MAX_BYTES,
+                default_ttl=Config.HTTP_CACHE_TTL_SECONDS,
+                ttls=Config.HTTP_CACHE_TTLS,
+            )
+        return _response_cache
+
+
+def lookup(url: str, params: Mapping[str, str]) -> Optional[CachedResponse]:
+    """Look a request up in the shared cache; None if disabled or nothing to reuse."""
+    cache = get_response_cache()
+    return cache.lookup(cache_key(url, params)) if cache is not None else None
+
+
+def settle(subreddit: str, url: str, params: Mapping[str, str], response: Any,
+           entry: Optional[CachedResponse]) -> bytes:
+    """
+    Turn a (possibly conditional) response into the listing body, updating the cache.
+
+    Args:
+        subreddit: Listing the request belongs to
+        url: Request URL without parameters
+        params: Request query parameters
+        response: requests or httpx response
+        entry: Stale entry the request was made conditional on, if any
+
+    Returns:
+        The stored body for a 304, otherwise the response body
+
+    Raises:
+        The response's HTTP error for any other non-2xx status
+    """
+    cache = get_response_cache()
+    if entry is not None and response.status_code == 304:
+        cache.renew(entry, subreddit)
+        return entry.body
+    response.raise_for_status()
+    if cache is not None:
+        if entry is not None:
+            cache.note_refetch()
+        cache.store(cache_key(url, params), subreddit, response.content, response.headers)
+    return response.content
@@ -2,8 +2,11 @@
 """Clean runner script for the Reddit outreach dashboard."""
 
 import os
+import signal
+import sys
 from app import create_app
-from models import db
+from models import db, create_missing_columns, create_missing_indexes, create_search_index
+from services.outreach_service import OutreachService
 
 
 def main():
@@ -17,6 +20,16 @@ def main():
     # Initialize database
     with app.app_context():
         db.create_all()
+        create_missing_columns()
+        create_missing_indexes()
+        create_search_index()
+        outreach_service = OutreachService()
+        outreach_service.link_locations()
+        outreach_service.reconcile_counters()
+        outreach_service.warm_known_posts()
+        # Jobs left running by a process that was killed would otherwise be
+        # shared with new refresh requests until the worker next polls
+        app.extensions['refresh_worker'].job_service.fail_stale_jobs()
         print('Database initialized!')
     
     # Print startup info
@@ -24,6 +37,9 @@ def main():
     print(f'Starting Reddit Outreach Dashboard in {env} mode...')
     print(f'Open http://localhost:{port} in your browser')
     
+    # Turn SIGTERM into a normal exit so buffered writes are drained
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    
     # Run application
     app.run(
         debug=(env == 'development'),
@@ -1,12 +1,13 @@
 #!/usr/bin/env python3
 """Runner script for the Reddit outreach dashboard."""
 
-from dashboard import app, db
+from dashboard import app, db, outreach_service
 
 if __name__ == '__main__':
     with app.app_context():
         # Create tables if they don't exist
         db.create_all()
+        outreach_service.reconcile_counters()
         
         # Create default message template if it doesn't exist
         from models import MessageTemplate
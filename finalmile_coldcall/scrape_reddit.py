@@ -1,16 +1,14 @@
-import re
-from typing import List, Tuple
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
 
 import requests
 
-from constants import (
-    AIRPORT_MAP,
-    KNOWN_CITIES,
-    LOCATION_PATTERNS,
-    REQUEST_HEADERS,
-    STATE_FULL_MAP,
-    STATE_MAP,
-)
+from constants import REDDIT_BASE_URL, REQUEST_HEADERS
+from fetch_scheduler import get_scheduler
+from listing_archive import archive_page
+from listing_json import parse_listing
+from location_cache import get_location_cache
+from phrase_matcher import Phrases, compile_phrases
+from response_cache import lookup, settle
 
 
 def parse_location_from_title(title: str) -> str:
@@ -23,101 +21,7 @@ def parse_location_from_title(title: str) -> str:
     Returns:
         Location string in the form 'City, State' or best-effort extraction.
     """
-    # Normalize separators to a common form for easier parsing
-    normalized = re.sub(r"[|/]", " ", title)
-    # Remove content inside parentheses for initial parsing
-    stripped = re.sub(r"\([^)]*\)", "", normalized)
-
-    # 1) Try explicit patterns with state abbreviations
-    for pat in LOCATION_PATTERNS:
-        match = re.search(pat, stripped, re.IGNORECASE)
-        if match:
-            city = match.group(1).strip()
-            state = match.group(2).strip()
-            city = re.sub(r"\b(Area|County|Metro)\b", "", city, flags=re.IGNORECASE).strip()
-            # Ensure state is 2-letter abbreviation; if not, try to abbreviate
-            if len(state) != 2:
-                state = STATE_MAP.get(state, state)
-            return f"{city}, {state}"
-
-    # 2) Special case: airport codes like RNO, DFW preceded/followed by text
-    airport_match = re.search(r"([A-Za-z\s]{3,15})\s+([A-Z]{3})\b", stripped)
-    if airport_match:
-        city_part = airport_match.group(1).strip()
-        code = airport_match.group(2)
-        if code in AIRPORT_MAP:
-            return AIRPORT_MAP[code]
-        return f"{city_part} {code}"
-
-    # 2b) Airport code alone before price/number (e.g., "RNO 564k")
-    airport_alone = re.search(r"\b(" + "|".join(AIRPORT_MAP.keys()) + r")\b\s+[$]?\d", stripped)
-    if airport_alone:
-        code = airport_alone.group(1)
-        return AIRPORT_MAP.get(code, code)
-
-    # 3) Standalone state abbreviations (e.g., "CO $560k")
-    state_only = re.search(r"\b([A-Z]{2})\b", stripped)
-    if state_only:
-        state = state_only.group(1)
-        return STATE_FULL_MAP.get(state, state)
-
-    # 4) Known city names before price or number (fallback)
-    city_before_price = re.search(r"\b(" + "|".join(KNOWN_CITIES) + r")\b", stripped, re.IGNORECASE)
-    if city_before_price:
-        return city_before_price.group(0)
-
-    # 5) Fallback: any phrase before a price, but exclude generic phrases
-    fallback = re.search(r"(.+?)\s+[$]\d", stripped)
-    if fallback:
-        loc = fallback.group(1).strip()
-        loc_clean = re.sub(r"\b(Metro|Area|County)\b", "", loc, flags=re.IGNORECASE).strip()
-        # Exclude generic phrases that commonly appear before prices
-        generic_prefixes = {
-            "i did it",
-            "i did, it",
-            "we did it",
-            "we did, it",
-            "finally did it",
-            "finally did, it",
-            "finally did",
-            "got the keys",
-            "got keys",
-            "got the",
-            "we got the",
-            "we finally",
-            "i opted",
-            "first home",
-            "dream come",
-            "saving paid",
-            "first month",
-            "we did",
-            "i did",
-        }
-        # If the cleaned location starts with a generic phrase, try to extract a known city after it
-        matched_generic = None
-        for word in generic_prefixes:
-            if loc_clean.lower().startswith(word):
-                matched_generic = word
-                remaining = loc_clean[len(word):].strip(", ").strip()
-                # Check if the remaining text is a known city
-                if remaining.lower() in (c.lower() for c in KNOWN_CITIES):
-                    return remaining
-                # Also check if the remaining text contains a known city (e.g., extra words)
-                for city in KNOWN_CITIES:
-                    if city.lower() in remaining.lower():
-                        return city
-                break
-        # If no generic prefix matched, return the cleaned location
-        if not matched_generic:
-            return loc_clean
-        return "Unknown"
-
-    # 6) Special case: check for known cities anywhere in the title
-    for city in KNOWN_CITIES:
-        if city.lower() in stripped.lower():
-            return city
-
-    return "Unknown"
+    return get_location_cache().get(title)
 
 
 def get_recent_posts_with_user(
@@ -140,6 +44,7 @@ def get_recent_posts_with_user(
         List of (title, username) tuples matching the criteria.
     """
     base_url = f"https://www.reddit.com/r/{subreddit_name}/{sort}.json"
+    matcher = compile_phrases((target_flair,))
     matching_results: List[Tuple[str, str]] = []
     after = None
 
@@ -150,9 +55,13 @@ def get_recent_posts_with_user(
             params["after"] = after
 
         try:
-            response = requests.get(url, headers=REQUEST_HEADERS, params=params, timeout=10)
+            response = get_scheduler().run(
+                lambda: requests.get(url, headers=REQUEST_HEADERS, params=params, timeout=10),
+                subreddit_name,
+            )
             response.raise_for_status()
-            data = response.json()
+            archive_page(subreddit_name, sort, after, response.content)
+            data = parse_listing(response.content)
             posts = data["data"]["children"]
             if not posts:
                 break  # No more posts
@@ -165,9 +74,7 @@ def get_recent_posts_with_user(
                 author = post_data.get("author", "[deleted]")
 
                 # Check flair or title/body contains target text (case-insensitive)
-                if flair and target_flair.lower() in flair.lower():
-                    matching_results.append((title, author))
-                elif target_flair.lower() in title.lower() or target_flair.lower() in selftext.lower():
+                if matcher.scan(flair, title, selftext).phrases:
                     matching_results.append((title, author))
 
                 if len(matching_results) >= max_posts:
@@ -185,71 +92,228 @@ def get_recent_posts_with_user(
     return matching_results[:max_posts]
 
 
-def get_recent_posts_with_user_and_location(
+class HighWaterMark(NamedTuple):
+    """Newest post already processed for a subreddit listing."""
+
+    fullname: str
+    created_utc: float
+
+
+class ListingScan(NamedTuple):
+    """Result of walking a subreddit listing."""
+
+    posts: List[Tuple[str, str, str]]
+    next_mark: Optional[HighWaterMark]
+    pages: int
+
+
+class ListingWalk:
+    """
+    Pagination state for one walk over a subreddit listing.
+
+    The walk does not do any I/O itself: callers fetch ``url`` with
+    ``next_params()`` and feed each decoded page to ``consume()`` until
+    ``done``. This lets the blocking and asyncio fetchers share one
+    implementation of matching, location parsing and high-water-mark logic.
+
+    A post matches when the weights of the target phrases found in its
+    flair, title and body add up to ``min_score``; plain phrases weigh 1.0.
+
+    With ``defer_locations`` matches are recorded with a None location, so a
+    later pipeline stage can parse them; streaming callers hand matches off
+    page by page with ``take_matches()`` instead of letting them accumulate.
+    """
+
+    def __init__(
+        self,
+        subreddit_name: str,
+        target_phrases: Phrases = ("GOT THE KEY",),
+        max_posts: int = 50,
+        sort: str = "new",
+        high_water_mark: Optional[HighWaterMark] = None,
+        backfill: bool = False,
+        base_url: str = REDDIT_BASE_URL,
+        defer_locations: bool = False,
+        min_score: float = 1.0,
+    ):
+        self.subreddit_name = subreddit_name
+        self.url = f"{base_url}/r/{subreddit_name}/{sort}.json"
+        self.sort = sort
+        self.matcher = compile_phrases(target_phrases)
+        self.min_score = min_score
+        self.max_posts = max_posts
+        # Only chronological listings can be cut off at the mark
+        self.high_water_mark = high_water_mark if sort == "new" else None
+        self.backfill = backfill
+        self.defer_locations = defer_locations
+        self.matches: List[Tuple[str, Optional[str], str]] = []
+        self.matched = 0
+        self.newest: Optional[HighWaterMark] = None
+        self.after: Optional[str] = None
+        self.caught_up = False
+        self.failed = False
+        self.pages = 0
+        # Share of the last page that was above the high-water mark
+        self.fresh_ratio = 0.0
+        self.done = max_posts <= 0
+
+    def next_params(self) -> Dict[str, str]:
+        """Return query parameters for the next page and count the request."""
+        self.pages += 1
+        return {"after": self.after} if self.after else {}
+
+    def consume(self, data: Dict[str, Any]) -> None:
+        """Process one decoded listing page."""
+        posts = data["data"]["children"]
+        self.fresh_ratio = 0.0
+        if not posts:
+            self.caught_up = True
+            self.done = True  # No more posts
+            return
+
+        mark = self.high_water_mark
+        fresh = 0
+        for post in posts:
+            post_data = post["data"]
+            title = post_data.get("title", "")
+            selftext = post_data.get("selftext", "")
+            flair = post_data.get("link_flair_text", "")
+            author = post_data.get("author", "[deleted]")
+            fullname = post_data.get("name")
+            created_utc = post_data.get("created_utc")
+
+            if mark and (
+                fullname == mark.fullname
+                or (created_utc is not None and created_utc < mark.created_utc)
+            ):
+                self.caught_up = True
+                if not self.backfill:
+                    break
+            if not self.caught_up:
+                fresh += 1
+            if self.newest is None and fullname and created_utc is not None:
+                self.newest = HighWaterMark(fullname, float(created_utc))
+
+            # Check flair, title and body for target phrases (case-insensitive)
+            hits = self.matcher.scan(flair, title, selftext)
+            if hits.phrases and hits.score >= self.min_score:
+                location = None if self.defer_locations else parse_location_from_title(title)
+                self.matches.append((title, location, author))
+                self.matched += 1
+
+            if self.matched >= self.max_posts:
+                break
+        self.fresh_ratio = fresh / len(posts)
+
+        if self.caught_up and not self.backfill:
+            self.done = True
+            return
+
+        # Pagination token for next page
+        self.after = data["data"].get("after")
+        if not self.after:
+            self.caught_up = True
+            self.done = True
+        if self.matched >= self.max_posts:
+            self.done = True
+
+    def take_matches(self) -> List[Tuple[str, Optional[str], str]]:
+        """Return the matches collected since the last call and forget them."""
+        matches, self.matches = self.matches, []
+        return matches
+
+    def fail(self, error: Exception) -> None:
+        """Stop the walk after a failed request."""
+        print(f"Error fetching posts for r/{self.subreddit_name}: {error}")
+        self.failed = True
+        self.done = True
+
+    def result(self) -> ListingScan:
+        """
+        Summarize the walk.
+
+        Advancing past posts that were never examined would skip them for
+        good, so the mark only moves once the walk has met the previous one.
+        """
+        next_mark = None
+        if not self.failed and (self.caught_up or self.high_water_mark is None):
+            next_mark = self.newest
+        return ListingScan(self.matches[:self.max_posts], next_mark, self.pages)
+
+
+def scan_listing(
     subreddit_name: str,
     target_flair: str = "GOT THE KEY",
     max_posts: int = 50,
     sort: str = "new",
-) -> List[Tuple[str, str, str]]:
+    high_water_mark: Optional[HighWaterMark] = None,
+    backfill: bool = False,
+) -> ListingScan:
     """
-    Fetch recent posts from a subreddit and return (title, location, username) for posts that have the target flair
-    or contain the target text in the title or body.
+    Walk a subreddit listing newest-first, stopping at already-processed posts.
+
+    Pagination stops at the first post at or below ``high_water_mark`` unless
+    ``backfill`` is set, in which case the walk continues until ``max_posts``
+    matches or the end of the listing. Only chronological listings ('new')
+    can be cut off this way, so the mark is ignored for other sorts.
 
     Args:
         subreddit_name: Name of the subreddit (without 'r/').
         target_flair: Exact flair text to match (case-insensitive).
         max_posts: Maximum number of matching posts to return.
         sort: Sorting order ('new', 'hot', 'top', etc.).
+        high_water_mark: Newest post processed by the previous run, if any.
+        backfill: Keep walking past the high-water mark.
 
     Returns:
-        List of (title, location, username) tuples matching the criteria.
+        ListingScan with the (title, location, username) matches, the mark to
+        persist for the next run (None if it must not advance) and the number
+        of pages requested.
     """
-    base_url = f"https://www.reddit.com/r/{subreddit_name}/{sort}.json"
-    matching_results: List[Tuple[str, str, str]] = []
-    after = None
-
-    while len(matching_results) < max_posts:
-        url = base_url
-        params = {}
-        if after:
-            params["after"] = after
-
+    walk = ListingWalk(subreddit_name, (target_flair,), max_posts, sort, high_water_mark, backfill)
+    scheduler = get_scheduler()
+    while not walk.done:
         try:
-            response = requests.get(url, headers=REQUEST_HEADERS, params=params, timeout=10)
-            response.raise_for_status()
-            data = response.json()
-            posts = data["data"]["children"]
-            if not posts:
-                break  # No more posts
-
-            for post in posts:
-                post_data = post["data"]
-                title = post_data.get("title", "")
-                selftext = post_data.get("selftext", "")
-                flair = post_data.get("link_flair_text", "")
-                author = post_data.get("author", "[deleted]")
+            params = walk.next_params()
+            cached = lookup(walk.url, params)
+            if cached is not None and cached.fresh:
+                body = cached.body
+            else:
+                headers = {**REQUEST_HEADERS, **(cached.validators() if cached is not None else {})}
+                response = scheduler.run(
+                    lambda: requests.get(walk.url, headers=headers, params=params, timeout=10),
+                    subreddit_name,
+                )
+                body = settle(subreddit_name, walk.url, params, response, cached)
+                if response.status_code != 304:
+                    archive_page(subreddit_name, sort, params.get("after"), body)
+            walk.consume(parse_listing(body))
+            scheduler.note_page(subreddit_name, walk.fresh_ratio)
+        except Exception as e:
+            walk.fail(e)
+    return walk.result()
 
-                # Check flair or title/body contains target text (case-insensitive)
-                if flair and target_flair.lower() in flair.lower():
-                    location = parse_location_from_title(title)
-                    matching_results.append((title, location, author))
-                elif target_flair.lower() in title.lower() or target_flair.lower() in selftext.lower():
-                    location = parse_location_from_title(title)
-                    matching_results.append((title, location, author))
 
-                if len(matching_results) >= max_posts:
-                    break
-
-            # Pagination token for next page
-            after = data["data"].get("after")
-            if not after:
-                break
+def get_recent_posts_with_user_and_location(
+    subreddit_name: str,
+    target_flair: str = "GOT THE KEY",
+    max_posts: int = 50,
+    sort: str = "new",
+) -> List[Tuple[str, str, str]]:
+    """
+    Fetch recent posts from a subreddit and return (title, location, username) for posts that have the target flair
+    or contain the target text in the title or body.
 
-        except Exception as e:
-            print(f"Error fetching posts for r/{subreddit_name}: {e}")
-            break
+    Args:
+        subreddit_name: Name of the subreddit (without 'r/').
+        target_flair: Exact flair text to match (case-insensitive).
+        max_posts: Maximum number of matching posts to return.
+        sort: Sorting order ('new', 'hot', 'top', etc.).
 
-    return matching_results[:max_posts]
+    Returns:
+        List of (title, location, username) tuples matching the criteria.
+    """
+    return scan_listing(subreddit_name, target_flair, max_posts, sort).posts
 
 
 if __name__ == "__main__":
@@ -0,0 +1,372 @@
+"""Background refresh jobs: persistent queue and worker thread."""
+
+import os
+import socket
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from typing import Iterator, Optional, Tuple
+from flask import Flask
+from sqlalchemy import delete, insert, select, update
+from sqlalchemy.exc import IntegrityError
+from models import db, AppLock, RefreshJob
+from services.outreach_service import OutreachService
+from config import Config
+
+ACTIVE_STATUSES = ('queued', 'running')
+
+
+class DatabaseLock:
+    """
+    Lease-based lock stored in the ``app_locks`` table.
+    
+    Every acquisition has its own owner token and runs on its own connection,
+    so the lock excludes other threads and processes without touching the
+    caller's session. A lease that outlives ``ttl`` (a crashed holder) can be
+    taken over; ``hold`` can keep renewing it, so a short ``ttl`` still covers
+    long work while a dead holder is noticed quickly.
+    """
+    
+    def __init__(self, name: str, ttl: float = 30.0):
+        self.name = name
+        self.ttl = ttl
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex}"
+    
+    def try_acquire(self) -> bool:
+        """Take the lock if it is free or its lease expired."""
+        now = datetime.utcnow()
+        expires_at = now + timedelta(seconds=self.ttl)
+        with db.engine.begin() as connection:
+            taken_over = connection.execute(
+                update(AppLock)
+                .where(AppLock.name == self.name, AppLock.expires_at < now)
+                .values(owner=self.owner, expires_at=expires_at)
+            ).rowcount
+        if taken_over:
+            return True
+        try:
+            with db.engine.begin() as connection:
+                connection.execute(
+                    insert(AppLock).values(name=self.name, owner=self.owner, expires_at=expires_at)
+                )
+            return True
+        except IntegrityError:
+            return False
+    
+    def is_held(self) -> bool:
+        """True if anyone holds an unexpired lease on this lock."""
+        with db.engine.connect() as connection:
+            return connection.execute(
+                select(AppLock.name).where(AppLock.name == self.name, AppLock.expires_at >= datetime.utcnow())
+            ).first() is not None
+    
+    def release(self) -> None:
+        """Release the lock if this instance still holds it."""
+        with db.engine.begin() as connection:
+            connection.execute(
+                delete(AppLock).where(AppLock.name == self.name, AppLock.owner == self.owner)
+            )
+    
+    @contextmanager
+    def hold(
+        self, timeout: float = 10.0, poll_interval: float = 0.05, keep_alive: Optional[float] = None
+    ) -> Iterator[None]:
+        """
+        Block until the lock is acquired, then release it on exit.
+        
+        Args:
+            timeout: Longest to wait for the lock
+            poll_interval: Seconds between attempts
+            keep_alive: Renew the lease every third of ``ttl`` for up to this
+                many seconds; None leaves it to expire after ``ttl``
+        """
+        deadline = time.monotonic() + timeout
+        while not self.try_acquire():
+            if time.monotonic() >= deadline:
+                raise TimeoutError(f"Timed out waiting for lock '{self.name}'")
+            time.sleep(poll_interval)
+        stop = threading.Event()
+        renewer = None
+        if keep_alive:
+            renewer = threading.Thread(
+                target=self._renew, args=(db.engine, stop, time.monotonic() + keep_alive),
+                name=f'lease-{self.name}', daemon=True
+            )
+            renewer.start()
+        try:
+            yield
+        finally:
+            stop.set()
+            if renewer is not None:
+                renewer.join()
+            self.release()
+    
+    def _renew(self, engine, stop: threading.Event, until: float) -> None:
+        """Extend the lease until ``stop`` is set or ``until`` (monotonic) passes."""
+        while not stop.wait(self.ttl / 3) and time.monotonic() < until:
+            try:
+                with engine.begin() as connection:
+                    connection.execute(
+                        update(AppLock)
+                        .where(AppLock.name == self.name, AppLock.owner == self.owner)
+                        .values(expires_at=datetime.utcnow() + timedelta(seconds=self.ttl))
+                    )
+            except Exception as e:
+                # The next attempt comes well before the lease runs out
+                print(f"Error renewing lock '{self.name}': {e}")
+
+
+class JobService:
+    """Service class for queueing and running refresh jobs."""
+    
+    def __init__(self, outreach_service: OutreachService):
+        self.outreach_service = outreach_service
+        self.config = Config()
+        self._enqueue_lock = threading.Lock()
+    
+    def enqueue_refresh(self, backfill: bool = False) -> Tuple[RefreshJob, bool]:
+        """
+        Queue a Reddit refresh for the background worker, coalescing duplicates.
+        
+        While a refresh is queued or running, callers share it instead of
+        starting another scrape. A refresh that succeeded less than
+        REFRESH_MIN_INTERVAL_SECONDS ago is shared the same way. A backfill
+        only shares another backfill, since an ordinary refresh stops at the
+        high-water marks.
+        
+        Args:
+            backfill: Walk past the high-water marks to pick up older posts
+        
+        Returns:
+            Tuple of the job to follow and whether it was newly queued
+        """
+        return self._join_or_create(backfill, status='queued')
+    
+    def _join_or_create(self, backfill: bool, status: str) -> Tuple[RefreshJob, bool]:
+        """Return a job the caller can share, or create one with ``status``."""
+        try:
+            # The thread lock saves same-process callers from polling the lock table
+            with self._enqueue_lock, DatabaseLock('refresh-enqueue').hold():
+                job = self._find_shareable_job(backfill)
+                if job:
+                    return job, False
+                job = RefreshJob(status=status, backfill=backfill, progress='queued')
+                if status == 'running':
+                    job.progress = 'starting'
+                    job.started_at = datetime.utcnow()
+                db.session.add(job)
+                db.session.commit()
+                return job, True
+        
+        except Exception as e:
+            db.session.rollback()
+            raise Exception(f"Failed to queue refresh: {str(e)}")
+    
+    def _find_shareable_job(self, backfill: bool) -> Optional[RefreshJob]:
+        """
+        Find an active job, or a recent success, that covers this request.
+        
+        A running job whose process died is marked failed instead of shared,
+        so the caller queues a new one.
+        """
+        query = RefreshJob.query
+        if backfill:
+            query = query.filter_by(backfill=True)
+        for active in query.filter(RefreshJob.status.in_(ACTIVE_STATUSES)).order_by(RefreshJob.id).all():
+            if active.status == 'queued' or self._is_alive(active):
+                return active
+            self._fail_job(active.id, 'The refresh stopped without finishing')
+            db.session.commit()
+        cutoff = datetime.utcnow() - timedelta(seconds=self.config.REFRESH_MIN_INTERVAL_SECONDS)
+        return (
+            query.filter(RefreshJob.status == 'succeeded', RefreshJob.finished_at >= cutoff)
+            .order_by(RefreshJob.finished_at.desc())
+            .first()
+        )
+    
+    def get_job(self, job_id: int) -> Optional[RefreshJob]:
+        """
+        Get a refresh job by id.
+        
+        Args:
+            job_id: Job id
+        
+        Returns:
+            RefreshJob, or None if it does not exist
+        """
+        return db.session.get(RefreshJob, job_id)
+    
+    def claim_next_job(self) -> Optional[RefreshJob]:
+        """
+        Mark the oldest queued job as running and return it.
+        
+        The claim is a conditional UPDATE, so workers in several processes
+        never pick up the same job.
+        
+        Returns:
+            The claimed job, or None if the queue is empty
+        """
+        while True:
+            job = RefreshJob.query.filter_by(status='queued').order_by(RefreshJob.id).first()
+            if not job:
+                return None
+            claimed = db.session.execute(
+                update(RefreshJob)
+                .where(RefreshJob.id == job.id, RefreshJob.status == 'queued')
+                .values(status='running', started_at=datetime.utcnow(), progress='starting')
+            ).rowcount
+            db.session.commit()
+            if claimed:
+                return job
+    
+    def run_job(self, job: RefreshJob) -> RefreshJob:
+        """
+        Run a claimed refresh job and record its result.
+        
+        Args:
+            job: Job in the 'running' state
+        
+        Returns:
+            The finished job
+        """
+        job_id = job.id
+        timeout = self.config.REFRESH_JOB_TIMEOUT_SECONDS
+        try:
+            lease = self.config.REFRESH_JOB_LEASE_SECONDS
+            # The job's lease, renewed while it waits and runs, shows it is alive
+            with self._job_lease(job_id).hold(keep_alive=timeout):
+                # A backfill may be queued next to an ordinary refresh; never run two at once.
+                # Renewed too, so a dead holder blocks the next job for one lease at most
+                self._set_progress(job_id, 'waiting for another refresh')
+                with DatabaseLock('refresh-run', ttl=lease).hold(
+                    timeout=timeout, poll_interval=1.0, keep_alive=timeout
+                ):
+                    result = self.outreach_service.refresh_posts(
+                        backfill=job.backfill,
+                        progress=lambda stage: self._set_progress(job_id, stage)
+                    )
+            job.status = 'succeeded'
+            job.progress = 'done'
+            job.result = result
+        except Exception as e:
+            job.status = 'failed'
+            job.progress = 'failed'
+            job.error = str(e)
+        job.finished_at = datetime.utcnow()
+        db.session.commit()
+        return job
+    
+    def run_refresh_inline(self, backfill: bool = False, poll_interval: float = 1.0) -> RefreshJob:
+        """
+        Run a refresh job in the calling thread (used by the CLI).
+        
+        If another refresh is already queued or running, wait for it and
+        return its result instead of scraping again.
+        
+        Args:
+            backfill: Walk past the high-water marks to pick up older posts
+            poll_interval: Seconds between checks while waiting for a shared job
+        
+        Returns:
+            The finished job
+        """
+        job, created = self._join_or_create(backfill, status='running')
+        if created:
+            return self.run_job(job)
+        while job.status in ACTIVE_STATUSES:
+            time.sleep(poll_interval)
+            db.session.refresh(job)
+        return job
+    
+    def fail_stale_jobs(self) -> int:
+        """
+        Mark running jobs that timed out, or whose process died, as failed.
+        
+        Returns:
+            Number of jobs marked failed
+        """
+        cutoff = datetime.utcnow() - timedelta(seconds=self.config.REFRESH_JOB_TIMEOUT_SECONDS)
+        count = 0
+        for job in RefreshJob.query.filter_by(status='running').all():
+            if job.started_at is not None and job.started_at < cutoff:
+                count += self._fail_job(job.id, 'Timed out')
+            elif not self._is_alive(job):
+                count += self._fail_job(job.id, 'The refresh stopped without finishing')
+        db.session.commit()
+        return count
+    
+    def _job_lease(self, job_id: int) -> DatabaseLock:
+        """Lease a running job holds for as long as its process works on it."""
+        return DatabaseLock(f'refresh-job-{job_id}', ttl=self.config.REFRESH_JOB_LEASE_SECONDS)
+    
+    def _is_alive(self, job: RefreshJob) -> bool:
+        """
+        True unless a running job's lease lapsed.
+        
+        A job claimed within the last lease period may not have taken its
+        lease yet, so it counts as alive.
+        """
+        grace = datetime.utcnow() - timedelta(seconds=self.config.REFRESH_JOB_LEASE_SECONDS)
+        return job.started_at is None or job.started_at >= grace or self._job_lease(job.id).is_held()
+    
+    def _fail_job(self, job_id: int, error: str) -> int:
+        """Mark a job failed if it is still running, without committing."""
+        return db.session.execute(
+            update(RefreshJob)
+            .where(RefreshJob.id == job_id, RefreshJob.status == 'running')
+            .values(status='failed', progress='failed', error=error, finished_at=datetime.utcnow())
+            .execution_options(synchronize_session='fetch')
+        ).rowcount
+    
+    def _set_progress(self, job_id: int, stage: str) -> None:
+        """Record progress on its own connection so the refresh transaction stays open."""
+        with db.engine.begin() as connection:
+            connection.execute(update(RefreshJob).where(RefreshJob.id == job_id).values(progress=stage))
+
+
+class RefreshWorker:
+    """Daemon thread that runs queued refresh jobs."""
+    
+    def __init__(self, app: Flask, job_service: JobService, poll_interval: float = 5.0):
+        self.app = app
+        self.job_service = job_service
+        self.poll_interval = poll_interval
+        self._wake = threading.Event()
+        self._stopping = threading.Event()
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+    
+    def wake(self) -> None:
+        """Start the worker if needed and have it check the queue now."""
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._stopping.clear()
+                self._thread = threading.Thread(target=self._run, name='refresh-worker', daemon=True)
+                self._thread.start()
+        self._wake.set()
+    
+    def stop(self, timeout: Optional[float] = None) -> None:
+        """Stop the worker after the job it is running, if any."""
+        self._stopping.set()
+        self._wake.set()
+        with self._lock:
+            thread = self._thread
+        if thread is not None:
+            thread.join(timeout)
+    
+    def _run(self) -> None:
+        while not self._stopping.is_set():
+            self._wake.clear()
+            try:
+                with self.app.app_context():
+                    self.job_service.fail_stale_jobs()
+                    while not self._stopping.is_set():
+                        job = self.job_service.claim_next_job()
+                        if not job:
+                            break
+                        self.job_service.run_job(job)
+            except Exception as e:
+                print(f"Refresh worker error: {e}")
+            self._wake.wait(self.poll_interval)
@@ -1,11 +1,141 @@
 """Outreach service for managing user outreach data."""
 
-from typing import List, Optional, Dict, Any
-from datetime import datetime
-from models import db, OutreachStatus, MessageTemplate
+import base64
+import json
+import multiprocessing
+import os
+import re
+from collections import Counter, deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterable, List, NamedTuple, Optional, Dict, Any, Callable, Tuple
+from datetime import date, datetime
+from sqlalchemy import and_, case, delete, distinct, func, insert, or_, select, text, update
+from sqlalchemy.dialects import postgresql, sqlite
+from models import (
+    db, Location, OutreachStatus, MessageTemplate, PostCounter, ScrapeCheckpoint, search_index_supported
+)
+from listing_archive import ListingArchive, get_listing_archive
+from location_dimension import STATE_NAMES, normalize_location
+from location_parser import parse_locations
+from scrape_reddit import HighWaterMark, ListingWalk
 from services.reddit_service import RedditService
+from services.refresh_pipeline import RefreshPipeline
+from event_hub import get_event_hub
+from known_posts import get_known_posts
 from config import Config
 
+# Dialects with INSERT ... ON CONFLICT DO UPDATE
+UPSERT_DIALECTS = {
+    'sqlite': sqlite.insert,
+    'postgresql': postgresql.insert,
+}
+
+# Keeps IN (...) lists under SQLite's bound-parameter limit
+IN_CLAUSE_CHUNK_SIZE = 500
+
+# Outreach statuses a post can be set to
+POST_STATUSES = ('Not Sent', 'Sent')
+
+# Search box input: "quoted phrases" or bare words, split into index tokens
+_SEARCH_TERM_RE = re.compile(r'"([^"]*)"|(\S+)')
+_SEARCH_TOKEN_RE = re.compile(r'\w+')
+
+
+class PostPage(NamedTuple):
+    """One keyset-paginated page of posts, newest first."""
+    
+    items: List[OutreachStatus]
+    total: int
+    start: int  # 1-based position of the first item
+    per_page: int
+    next_cursor: Optional[str]
+    prev_cursor: Optional[str]
+    
+    @property
+    def end(self) -> int:
+        return self.start + len(self.items) - 1
+    
+    @property
+    def has_next(self) -> bool:
+        return self.next_cursor is not None
+    
+    @property
+    def has_prev(self) -> bool:
+        return self.prev_cursor is not None
+
+
+def counter_key(status: Optional[str], location: Optional[str]) -> Tuple[str, str]:
+    """Key of the post_counters row a post is counted in."""
+    return status or '', location or ''
+
+
+def serialize_post(post: Any) -> Dict[str, Any]:
+    """JSON-friendly view of an OutreachStatus row (or a row dict) for live updates."""
+    get = post.get if isinstance(post, dict) else lambda name: getattr(post, name)
+    created_at = get('created_at')
+    sent_at = get('sent_at')
+    return {
+        'username': get('username'),
+        'post_title': get('post_title'),
+        'post_url': get('post_url'),
+        'location': get('location'),
+        'status': get('status'),
+        'created_at': created_at.isoformat() if created_at else None,
+        'sent_at': sent_at.isoformat() if sent_at else None,
+    }
+
+
+def encode_cursor(post: OutreachStatus, start: int) -> str:
+    """Encode a post's (created_at, id) sort key and a page position as a URL-safe token."""
+    raw = json.dumps([post.created_at.isoformat(), post.id, start])
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int, int]:
+    """
+    Decode a token produced by ``encode_cursor``.
+    
+    Raises:
+        ValueError: If the token is malformed
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        created_at, post_id, start = json.loads(raw)
+        return datetime.fromisoformat(created_at), int(post_id), max(int(start), 1)
+    except Exception as e:
+        raise ValueError(f"Invalid page cursor: {cursor}") from e
+
+
+def build_search_query(text_query: str) -> str:
+    """
+    Turn search box input into a safe FTS5 MATCH expression.
+    
+    Every term must match (AND). Quoted text is matched as a phrase, and the
+    last bare word as a prefix, so "VA loan" finds "VA loans" and "cond"
+    finds "condo". Punctuation is dropped and FTS5 operators (OR, NEAR, ...)
+    are searched as plain words.
+    
+    Args:
+        text_query: What the operator typed
+        
+    Returns:
+        MATCH expression, or '' if the input has no searchable words
+    """
+    parts = []
+    last_word = None
+    for phrase, word in _SEARCH_TERM_RE.findall(text_query):
+        tokens = _SEARCH_TOKEN_RE.findall((phrase or word).lower())
+        if not tokens:
+            continue
+        if phrase:
+            parts.append('"' + ' '.join(tokens) + '"')
+        else:
+            parts.extend(f'"{token}"' for token in tokens)
+            last_word = len(parts) - 1
+    if last_word is not None:
+        parts[last_word] += '*'
+    return ' '.join(parts)
+
 
 class OutreachService:
     """Service class for outreach operations."""
@@ -15,56 +145,567 @@ class OutreachService:
         self.config = Config()
         self.reddit_service = RedditService()
     
-    def refresh_posts(self) -> Dict[str, int]:
+    def refresh_posts(
+        self, backfill: bool = False, progress: Optional[Callable[[str], None]] = None
+    ) -> Dict[str, int]:
         """
         Refresh posts from Reddit and update database.
         
+        Runs as a streaming pipeline (see ``RefreshPipeline``): each page's
+        matches are filtered, parsed and upserted in committed chunks while
+        later pages are still being fetched, and live dashboards receive each
+        chunk as it lands. Only posts newer than each listing's high-water
+        mark are fetched; the marks advance once every post is committed, so
+        a failed refresh is simply fetched again. Posts whose username and
+        title are already stored are dropped before parsing, against the
+        in-memory ``KnownPosts`` filter (loaded on the first refresh).
+        
+        Args:
+            backfill: Walk past the high-water mark to pick up older posts
+            progress: Called with a short description of each stage
+        
+        Returns:
+            Dictionary with counts of new and updated posts, pages fetched and
+            per-stage pipeline timings
+        """
+        progress = progress or (lambda stage: None)
+        result = {'new_posts': 0, 'updated_posts': 0}
+        known_posts = get_known_posts()
+        
+        def write(posts: List[Tuple[str, str, str]]) -> None:
+            counts, new_rows = self._upsert_posts(posts)
+            db.session.commit()
+            known_posts.add_many((username, title) for title, _, username in posts)
+            result['new_posts'] += counts['new_posts']
+            result['updated_posts'] += counts['updated_posts']
+            if new_rows or counts['updated_posts']:
+                self._publish(('posts', {'posts': [serialize_post(row) for row in new_rows]}))
+            progress(f"fetching posts from Reddit ({result['new_posts']} new so far)")
+        
+        try:
+            if not known_posts.warmed:
+                progress('loading known posts')
+                self.warm_known_posts()
+            progress('fetching posts from Reddit')
+            pipeline = RefreshPipeline(
+                self.reddit_service, write,
+                queue_size=self.config.REFRESH_QUEUE_SIZE,
+                chunk_size=self.config.REFRESH_WRITE_CHUNK_SIZE,
+                write_interval=self.config.REFRESH_WRITE_INTERVAL_SECONDS,
+                known_posts=known_posts
+            )
+            scans = pipeline.run(high_water_marks=self.get_high_water_marks(), backfill=backfill)
+            
+            progress('saving high-water marks')
+            for target, scan in scans.items():
+                if scan.next_mark:
+                    self._save_high_water_mark(target.subreddit, target.sort, scan.next_mark)
+            db.session.commit()
+            result['pages_fetched'] = sum(scan.pages for scan in scans.values())
+            result['timings'] = pipeline.stats()
+            return result
+            
+        except Exception as e:
+            db.session.rollback()
+            raise Exception(f"Failed to refresh posts: {str(e)}")
+    
+    def upsert_posts(self, posts: List[Tuple[str, str, str]]) -> Dict[str, int]:
+        """
+        Insert new users and update changed titles in bulk, without committing.
+        
+        Existing rows for the whole batch are loaded with one IN query, then
+        the batch is written with a single statement. Counts match applying
+        the posts one at a time: a username repeated in the batch counts as
+        new once and as updated for every later title change. The statistics
+        counters are adjusted in the same transaction.
+        
+        Args:
+            posts: List of (title, location, username) tuples
+            
         Returns:
             Dictionary with counts of new and updated posts
         """
+        return self._upsert_posts(posts)[0]
+    
+    def _upsert_posts(
+        self, posts: List[Tuple[str, str, str]], refresh_locations: bool = False
+    ) -> Tuple[Dict[str, int], List[Dict[str, Any]]]:
+        """
+        Do the work of ``upsert_posts`` and also return the inserted rows.
+        
+        With ``refresh_locations`` a row whose title is unchanged is still
+        updated when the given location differs from the stored one.
+        """
+        now = datetime.utcnow()
+        usernames = list(dict.fromkeys(username for _, _, username in posts))
+        existing = {}
+        for offset in range(0, len(usernames), IN_CLAUSE_CHUNK_SIZE):
+            chunk = usernames[offset:offset + IN_CLAUSE_CHUNK_SIZE]
+            rows = db.session.query(
+                OutreachStatus.id, OutreachStatus.username, OutreachStatus.post_title,
+                OutreachStatus.location, OutreachStatus.status
+            ).filter(OutreachStatus.username.in_(chunk))
+            for row_id, username, title, location, status in rows:
+                existing[username] = {
+                    'id': row_id, 'username': username, 'post_title': title, 'location': location,
+                    'status': status, 'original_location': location
+                }
+        
+        new_rows = {}
+        changed_rows = {}
+        new_posts_count = 0
+        updated_posts_count = 0
+        
+        for title, location, username in posts:
+            current = new_rows.get(username) or existing.get(username)
+            if current:
+                # Update existing record if post title (or a re-derived location) changed
+                if current['post_title'] != title or (refresh_locations and current['location'] != location):
+                    current['post_title'] = title
+                    current['location'] = location
+                    if username not in new_rows:
+                        changed_rows[username] = current
+                    updated_posts_count += 1
+            else:
+                new_rows[username] = {
+                    'username': username,
+                    'post_title': title,
+                    'post_url': self.reddit_service.create_post_url(username),
+                    'location': location,
+                    'status': 'Not Sent',
+                    'created_at': now,
+                }
+                new_posts_count += 1
+        
+        location_ids = self._location_ids(
+            [row['location'] for row in new_rows.values()] + [row['location'] for row in changed_rows.values()]
+        )
+        for row in new_rows.values():
+            row['location_id'] = location_ids[row['location']]
+        for row in changed_rows.values():
+            row['location_id'] = location_ids[row['location']]
+        self._write_posts(list(new_rows.values()), list(changed_rows.values()))
+        
+        deltas = Counter()
+        for row in new_rows.values():
+            deltas[counter_key('Not Sent', row['location'])] += 1
+        for row in changed_rows.values():
+            if row['location'] != row['original_location']:
+                deltas[counter_key(row['status'], row['original_location'])] -= 1
+                deltas[counter_key(row['status'], row['location'])] += 1
+        self._apply_counter_deltas(deltas)
+        
+        return {
+            'new_posts': new_posts_count,
+            'updated_posts': updated_posts_count
+        }, list(new_rows.values())
+    
+    def replay_archive(
+        self,
+        start: Optional[date] = None,
+        end: Optional[date] = None,
+        subreddits: Optional[List[str]] = None,
+        archive: Optional[ListingArchive] = None,
+        batch_size: int = 5000,
+        progress: Optional[Callable[[str], None]] = None
+    ) -> Dict[str, int]:
+        """
+        Feed archived listing pages back through matching, parsing and the upsert.
+        
+        Nothing is fetched. Pages are matched against the subreddit's current
+        SUBREDDIT_TARGETS phrases (TARGET_PHRASES for subreddits no longer
+        configured) and parsed with the current location parser, so leads
+        missed by older rules are added and re-derived locations replace the
+        stored ones. Statuses and high-water marks are left alone. Pages come
+        back in fetch order across listings, so a user's newest title is the
+        one left stored. Posts are written and committed in batches of
+        ``batch_size``.
+        
+        Args:
+            start: First UTC day to replay, or None for the oldest
+            end: Last UTC day to replay, or None for the newest
+            subreddits: Only replay these subreddits
+            archive: Archive to read; defaults to the configured one
+            batch_size: Matched posts per transaction
+            progress: Called with a short description after each batch
+        
+        Returns:
+            Dictionary with pages replayed, posts matched and new/updated counts
+        """
+        archive = archive or get_listing_archive()
+        if archive is None:
+            raise ValueError("The listing archive is disabled (LISTING_ARCHIVE_PATH is empty)")
+        progress = progress or (lambda stage: None)
+        totals = {'pages': 0, 'matched_posts': 0, 'new_posts': 0, 'updated_posts': 0}
+        batch = []
         try:
-            reddit_posts = self.reddit_service.fetch_recent_posts()
-            
-            new_posts_count = 0
-            updated_posts_count = 0
-            
-            for title, location, username in reddit_posts:
-                if not self.reddit_service.is_valid_username(username):
-                    continue
-                
-                existing = OutreachStatus.query.filter_by(username=username).first()
-                post_url = self.reddit_service.create_post_url(username)
-                
-                if existing:
-                    # Update existing record if post title changed
-                    if existing.post_title != title:
-                        existing.post_title = title
-                        existing.location = location
-                        updated_posts_count += 1
-                else:
-                    # Create new record
-                    new_post = OutreachStatus(
-                        username=username,
-                        post_title=title,
-                        post_url=post_url,
-                        location=location,
-                        status='Not Sent'
-                    )
-                    db.session.add(new_post)
-                    new_posts_count += 1
+            for page in archive.pages(start, end, subreddits):
+                phrases = self.config.SUBREDDIT_TARGETS.get(page.subreddit, self.config.TARGET_PHRASES)
+                children = page.page['data']['children']
+                walk = ListingWalk(
+                    page.subreddit, phrases, len(children), page.sort, backfill=True,
+                    min_score=self.config.MATCH_MIN_SCORE
+                )
+                walk.consume(page.page)
+                batch.extend(post for post in walk.matches if self.reddit_service.is_valid_username(post[2]))
+                totals['pages'] += 1
+                if len(batch) >= batch_size:
+                    self._replay_batch(batch, totals)
+                    batch = []
+                    progress(f"replayed {totals['pages']} pages, {totals['matched_posts']} posts")
+            if batch:
+                self._replay_batch(batch, totals)
+            self._publish()
+            return totals
             
+        except Exception as e:
+            db.session.rollback()
+            raise Exception(f"Failed to replay archive: {str(e)}")
+    
+    def _replay_batch(self, posts: List[Tuple[str, str, str]], totals: Dict[str, int]) -> None:
+        """Upsert and commit one batch of replayed posts, adding to ``totals``."""
+        counts, _ = self._upsert_posts(posts, refresh_locations=True)
+        db.session.commit()
+        get_known_posts().add_many((username, title) for title, _, username in posts)
+        totals['matched_posts'] += len(posts)
+        totals['new_posts'] += counts['new_posts']
+        totals['updated_posts'] += counts['updated_posts']
+    
+    def reparse_locations(
+        self,
+        workers: Optional[int] = None,
+        chunk_size: int = 2000,
+        dry_run: bool = False,
+        on_change: Optional[Callable[[str, str, Optional[str], str], None]] = None,
+        progress: Optional[Callable[[str], None]] = None
+    ) -> Dict[str, int]:
+        """
+        Re-derive every post's location from its title with the current parser.
+        
+        Rows are read in id order one keyset chunk at a time, so memory stays
+        flat and no read transaction is held while chunks are written. Titles
+        are parsed on a pool of ``workers`` processes (inline for one), with
+        up to two chunks per worker in flight. Only rows whose location
+        changed are written back, with one batched UPDATE and the matching
+        counter moves per chunk, each chunk committed on its own.
+        
+        Args:
+            workers: Parser processes; defaults to the CPU count
+            chunk_size: Rows per chunk and per parse task
+            dry_run: Report changes without writing them
+            on_change: Called with (username, title, old, new) for every changed row
+            progress: Called with a short description after each chunk
+        
+        Returns:
+            Dictionary with rows scanned and changed, and rows updated (0 on a dry run)
+        """
+        workers = workers or os.cpu_count() or 1
+        progress = progress or (lambda stage: None)
+        total = db.session.query(func.count(OutreachStatus.id)).scalar()
+        totals = {'scanned': 0, 'changed': 0, 'updated': 0}
+        
+        def chunks():
+            last_id = 0
+            while True:
+                rows = db.session.query(
+                    OutreachStatus.id, OutreachStatus.username, OutreachStatus.post_title,
+                    OutreachStatus.location, OutreachStatus.status
+                ).filter(OutreachStatus.id > last_id).order_by(OutreachStatus.id).limit(chunk_size).all()
+                # End the read transaction so writers are not held up between chunks
+                db.session.rollback()
+                if not rows:
+                    return
+                last_id = rows[-1].id
+                yield rows
+        
+        def apply(rows, locations):
+            self._apply_reparsed_locations(rows, locations, dry_run, on_change, totals)
+            progress(f"{totals['scanned']}/{total} rows scanned, {totals['changed']} changed")
+        
+        try:
+            if workers == 1:
+                for rows in chunks():
+                    apply(rows, parse_locations([row.post_title for row in rows]))
+            else:
+                # Spawned workers import only the parser, not the app and its threads
+                with ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context('spawn')) as pool:
+                    in_flight = deque()
+                    for rows in chunks():
+                        in_flight.append((rows, pool.submit(parse_locations, [row.post_title for row in rows])))
+                        if len(in_flight) >= workers * 2:
+                            done_rows, future = in_flight.popleft()
+                            apply(done_rows, future.result())
+                    while in_flight:
+                        done_rows, future = in_flight.popleft()
+                        apply(done_rows, future.result())
+            if totals['updated']:
+                self._publish()
+            return totals
+            
+        except Exception as e:
+            db.session.rollback()
+            raise Exception(f"Failed to re-parse locations: {str(e)}")
+    
+    def _apply_reparsed_locations(
+        self, rows: List[Any], locations: List[str], dry_run: bool,
+        on_change: Optional[Callable[[str, str, Optional[str], str], None]], totals: Dict[str, int]
+    ) -> None:
+        """Write back (and report) the rows of one chunk whose location changed."""
+        changed = []
+        deltas = Counter()
+        for row, location in zip(rows, locations):
+            if location == row.location:
+                continue
+            changed.append({'id': row.id, 'location': location})
+            deltas[counter_key(row.status, row.location)] -= 1
+            deltas[counter_key(row.status, location)] += 1
+            if on_change:
+                on_change(row.username, row.post_title, row.location, location)
+        totals['scanned'] += len(rows)
+        totals['changed'] += len(changed)
+        if changed and not dry_run:
+            location_ids = self._location_ids(row['location'] for row in changed)
+            for row in changed:
+                row['location_id'] = location_ids[row['location']]
+            db.session.execute(update(OutreachStatus), changed)
+            self._apply_counter_deltas(deltas)
             db.session.commit()
+            totals['updated'] += len(changed)
+    
+    def _write_posts(self, new_rows: List[Dict[str, Any]], changed_rows: List[Dict[str, Any]]) -> None:
+        """Write new and changed rows, using native upsert where the dialect has it."""
+        dialect = db.session.get_bind().dialect.name
+        if dialect in UPSERT_DIALECTS:
+            rows = new_rows + [
+                {
+                    'username': row['username'],
+                    'post_title': row['post_title'],
+                    'post_url': self.reddit_service.create_post_url(row['username']),
+                    'location': row['location'],
+                    'location_id': row['location_id'],
+                    'status': 'Not Sent',
+                    'created_at': datetime.utcnow(),
+                }
+                for row in changed_rows
+            ]
+            if not rows:
+                return
+            stmt = UPSERT_DIALECTS[dialect](OutreachStatus.__table__)
+            stmt = stmt.on_conflict_do_update(
+                index_elements=['username'],
+                set_={
+                    'post_title': stmt.excluded.post_title,
+                    'location': stmt.excluded.location,
+                    'location_id': stmt.excluded.location_id,
+                }
+            )
+            # RETURNING lets SQLAlchemy batch the rows into multi-row statements
+            # ("insertmanyvalues"); the search index triggers flush their
+            # pending writes once per statement, so one row each is slow
+            db.session.execute(stmt.returning(OutreachStatus.__table__.c.id), rows)
+            return
+        
+        if new_rows:
+            db.session.execute(insert(OutreachStatus), new_rows)
+        if changed_rows:
+            db.session.execute(update(OutreachStatus), [
+                {
+                    'id': row['id'], 'post_title': row['post_title'],
+                    'location': row['location'], 'location_id': row['location_id']
+                }
+                for row in changed_rows
+            ])
+    
+    def _location_ids(self, locations: Iterable[Optional[str]]) -> Dict[Optional[str], int]:
+        """
+        Map location strings to ``Location`` ids, adding missing rows, without committing.
+        
+        Args:
+            locations: ``OutreachStatus.location`` values (duplicates and None allowed)
             
-            return {
-                'new_posts': new_posts_count,
-                'updated_posts': updated_posts_count
-            }
+        Returns:
+            Location id for every distinct input value
+        """
+        pairs = {location: normalize_location(location) for location in set(locations)}
+        if not pairs:
+            return {}
+        wanted = set(pairs.values())
+        states = {pair.state_abbr for pair in wanted}
+        known = {
+            (row.city, row.state_abbr): row.id
+            for row in db.session.query(Location.id, Location.city, Location.state_abbr)
+            .filter(Location.state_abbr.in_(states))
+        }
+        missing = [
+            {'city': pair.city, 'state_abbr': pair.state_abbr}
+            for pair in wanted if (pair.city, pair.state_abbr) not in known
+        ]
+        if missing:
+            dialect = db.session.get_bind().dialect.name
+            if dialect in UPSERT_DIALECTS:
+                # Another writer may have added the same pair meanwhile
+                stmt = UPSERT_DIALECTS[dialect](Location.__table__).on_conflict_do_nothing(
+                    index_elements=['state_abbr', 'city']
+                )
+                db.session.execute(stmt, missing)
+            else:
+                db.session.execute(insert(Location), missing)
+            known.update({
+                (row.city, row.state_abbr): row.id
+                for row in db.session.query(Location.id, Location.city, Location.state_abbr)
+                .filter(Location.state_abbr.in_({row['state_abbr'] for row in missing}))
+            })
+        return {location: known[pair] for location, pair in pairs.items()}
+    
+    def link_locations(
+        self,
+        relink: bool = False,
+        chunk_size: int = 2000,
+        progress: Optional[Callable[[str], None]] = None
+    ) -> Dict[str, int]:
+        """
+        Point posts at their normalized ``Location`` row.
+        
+        Posts written by the upsert and by ``reparse_locations`` are linked as
+        they are written; this fills in rows stored before the ``locations``
+        table existed (location_id IS NULL, an index seek) or, with
+        ``relink``, re-normalizes every row after the normalization rules
+        change. Rows are read in id order one keyset chunk at a time and each
+        chunk is committed on its own.
+        
+        Args:
+            relink: Re-check every post, not only unlinked ones
+            chunk_size: Rows per chunk
+            progress: Called with a short description after each chunk
+            
+        Returns:
+            Dictionary with rows scanned and rows whose link changed
+        """
+        progress = progress or (lambda stage: None)
+        totals = {'scanned': 0, 'linked': 0}
+        last_id = 0
+        try:
+            while True:
+                query = db.session.query(
+                    OutreachStatus.id, OutreachStatus.location, OutreachStatus.location_id
+                ).filter(OutreachStatus.id > last_id)
+                if not relink:
+                    query = query.filter(OutreachStatus.location_id.is_(None))
+                rows = query.order_by(OutreachStatus.id).limit(chunk_size).all()
+                if not rows:
+                    db.session.rollback()
+                    return totals
+                last_id = rows[-1].id
+                location_ids = self._location_ids(row.location for row in rows)
+                changed = [
+                    {'id': row.id, 'location_id': location_ids[row.location]}
+                    for row in rows if row.location_id != location_ids[row.location]
+                ]
+                if changed:
+                    db.session.execute(update(OutreachStatus), changed)
+                db.session.commit()
+                totals['scanned'] += len(rows)
+                totals['linked'] += len(changed)
+                progress(f"{totals['scanned']} rows scanned, {totals['linked']} linked")
             
         except Exception as e:
             db.session.rollback()
-            raise Exception(f"Failed to refresh posts: {str(e)}")
+            raise Exception(f"Failed to link locations: {str(e)}")
+    
+    def warm_known_posts(self, chunk_size: int = 50000) -> int:
+        """
+        Load every stored (username, title) into the ``KnownPosts`` filter.
+        
+        Rows are read newest first, one keyset chunk at a time, and loading
+        stops at the filter's ``max_entries``, so the posts left out of a
+        full filter are the oldest ones.
+        
+        Args:
+            chunk_size: Rows per chunk
+            
+        Returns:
+            Number of posts loaded
+        """
+        known_posts = get_known_posts()
+        
+        def pairs():
+            last_id = None
+            while known_posts.max_entries:
+                query = db.session.query(OutreachStatus.id, OutreachStatus.username, OutreachStatus.post_title)
+                if last_id is not None:
+                    query = query.filter(OutreachStatus.id < last_id)
+                rows = query.order_by(OutreachStatus.id.desc()).limit(chunk_size).all()
+                # End the read transaction so writers are not held up between chunks
+                db.session.rollback()
+                if not rows:
+                    return
+                last_id = rows[-1].id
+                for row in rows:
+                    yield row.username, row.post_title
+        
+        try:
+            return known_posts.warm(pairs())
+        except Exception as e:
+            db.session.rollback()
+            raise Exception(f"Failed to load known posts: {str(e)}")
     
-    def get_posts(self, page: int = 1, status_filter: str = 'all', per_page: int = 20) -> List[OutreachStatus]:
+    def get_known_posts_stats(self) -> Dict[str, Any]:
+        """
+        Get size and hit counters of the ``KnownPosts`` filter.
+        
+        Returns:
+            Dictionary of filter statistics
+        """
+        return get_known_posts().stats()
+    
+    def get_high_water_mark(self, subreddit: str, sort: str) -> Optional[HighWaterMark]:
+        """
+        Get the newest post processed for a subreddit listing.
+        
+        Args:
+            subreddit: Subreddit name
+            sort: Listing sort order
+            
+        Returns:
+            HighWaterMark, or None if the listing was never scraped
+        """
+        checkpoint = ScrapeCheckpoint.query.filter_by(subreddit=subreddit, sort=sort).first()
+        if not checkpoint:
+            return None
+        return HighWaterMark(checkpoint.newest_fullname, checkpoint.newest_created_utc)
+    
+    def get_high_water_marks(self) -> Dict[Tuple[str, str], HighWaterMark]:
+        """
+        Get the newest post processed for every scraped listing.
+        
+        Returns:
+            Dictionary of HighWaterMark keyed by (subreddit, sort)
+        """
+        return {
+            (checkpoint.subreddit, checkpoint.sort):
+                HighWaterMark(checkpoint.newest_fullname, checkpoint.newest_created_utc)
+            for checkpoint in ScrapeCheckpoint.query.all()
+        }
+    
+    def _save_high_water_mark(self, subreddit: str, sort: str, mark: HighWaterMark) -> None:
+        """Store a new high-water mark without committing."""
+        checkpoint = ScrapeCheckpoint.query.filter_by(subreddit=subreddit, sort=sort).first()
+        if not checkpoint:
+            checkpoint = ScrapeCheckpoint(subreddit=subreddit, sort=sort)
+            db.session.add(checkpoint)
+        # A backfill or a reordered listing must never move the mark backwards
+        if checkpoint.newest_created_utc is None or mark.created_utc >= checkpoint.newest_created_utc:
+            checkpoint.newest_fullname = mark.fullname
+            checkpoint.newest_created_utc = mark.created_utc
+    
+    def get_posts(
+        self,
+        page: int = 1,
+        status_filter: str = 'all',
+        per_page: int = 20,
+        state: Optional[str] = None,
+        city: Optional[str] = None
+    ) -> List[OutreachStatus]:
         """
         Get posts with pagination and filtering.
         
@@ -72,6 +713,8 @@ class OutreachService:
             page: Page number
             status_filter: Filter by status ('all', 'Sent', 'Not Sent')
             per_page: Posts per page
+            state: Only posts in this state (two-letter abbreviation)
+            city: Only posts in this city (as listed by ``get_location_facets``)
             
         Returns:
             Paginated list of posts
@@ -80,6 +723,7 @@ class OutreachService:
         
         if status_filter != 'all':
             query = query.filter_by(status=status_filter)
+        query = self._filter_location(query, state, city)
         
         return query.paginate(
             page=page, 
@@ -87,6 +731,273 @@ class OutreachService:
             error_out=False
         )
     
+    def get_posts_page(
+        self,
+        status_filter: str = 'all',
+        per_page: int = 20,
+        after: Optional[str] = None,
+        before: Optional[str] = None,
+        state: Optional[str] = None,
+        city: Optional[str] = None
+    ) -> PostPage:
+        """
+        Get a page of posts with keyset pagination on (created_at, id).
+        
+        Unlike ``get_posts`` there is no OFFSET scan and no COUNT per page:
+        each page is one range read on the (status, created_at, id) index,
+        so deep pages cost the same as the first one. A state or city facet
+        reads the (location_id, created_at, id) index instead, one range per
+        matching location.
+        
+        Args:
+            status_filter: Filter by status ('all', 'Sent', 'Not Sent')
+            per_page: Posts per page
+            after: Cursor of the page to continue after (next page)
+            before: Cursor of the page to go back from (previous page)
+            state: Only posts in this state (two-letter abbreviation)
+            city: Only posts in this city (as listed by ``get_location_facets``)
+            
+        Returns:
+            PostPage with the posts, total and neighbouring cursors
+        """
+        query = OutreachStatus.query
+        if status_filter != 'all':
+            query = query.filter_by(status=status_filter)
+        query = self._filter_location(query, state, city)
+        
+        cursor = after or before
+        if cursor:
+            created_at, post_id, start = decode_cursor(cursor)
+        else:
+            start = 1
+        
+        if before:
+            # Walk backwards from the first post of the current page
+            rows = query.filter(
+                OutreachStatus.created_at >= created_at,
+                or_(OutreachStatus.created_at > created_at, OutreachStatus.id > post_id)
+            ).order_by(
+                OutreachStatus.created_at.asc(), OutreachStatus.id.asc()
+            ).limit(per_page + 1).all()
+            has_prev = len(rows) > per_page
+            items = list(reversed(rows[:per_page]))
+            has_next = True
+            if not has_prev:
+                start = 1
+        else:
+            if after:
+                query = query.filter(
+                    OutreachStatus.created_at <= created_at,
+                    or_(OutreachStatus.created_at < created_at, OutreachStatus.id < post_id)
+                )
+            rows = query.order_by(
+                OutreachStatus.created_at.desc(), OutreachStatus.id.desc()
+            ).limit(per_page + 1).all()
+            has_next = len(rows) > per_page
+            items = rows[:per_page]
+            has_prev = after is not None
+        
+        total = self.count_posts(status_filter, state, city)
+        if not items:
+            return PostPage([], total, start, per_page, None, None)
+        return PostPage(
+            items=items,
+            total=total,
+            start=start,
+            per_page=per_page,
+            next_cursor=encode_cursor(items[-1], start + len(items)) if has_next else None,
+            prev_cursor=encode_cursor(items[0], max(start - per_page, 1)) if has_prev else None,
+        )
+    
+    def count_posts(
+        self, status_filter: str = 'all', state: Optional[str] = None, city: Optional[str] = None
+    ) -> int:
+        """
+        Count posts for the pagination footer from the maintained counters.
+        
+        Args:
+            status_filter: Filter by status ('all', 'Sent', 'Not Sent')
+            state: Only posts in this state
+            city: Only posts in this city
+            
+        Returns:
+            Number of matching posts
+        """
+        if state or city:
+            state = state.upper() if state else None
+            return sum(
+                posts for location, posts in self._location_counts(status_filter)
+                if (not state or normalize_location(location).state_abbr == state)
+                and (not city or normalize_location(location).city == city)
+            )
+        query = db.session.query(func.coalesce(func.sum(PostCounter.posts), 0))
+        if status_filter != 'all':
+            query = query.filter(PostCounter.status == status_filter)
+        return query.scalar()
+    
+    def get_location_facets(self, status_filter: str = 'all', state: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Get post counts per state and per city for the facet filters.
+        
+        Counts come from the maintained post_counters (one row per distinct
+        status and location string), each string normalized once per process,
+        so the cost depends on the number of distinct locations, not posts.
+        
+        Args:
+            status_filter: Count only posts with this status ('all', 'Sent', 'Not Sent')
+            state: Only list the cities of this state
+            
+        Returns:
+            Dictionary with 'states' (state, name, posts) and 'cities' (city,
+            state, posts), largest first; at most FACET_CITY_LIMIT cities
+        """
+        state = state.upper() if state else None
+        states = Counter()
+        cities = Counter()
+        for location, posts in self._location_counts(status_filter):
+            pair = normalize_location(location)
+            if pair.state_abbr:
+                states[pair.state_abbr] += posts
+            if pair.city and (not state or pair.state_abbr == state):
+                cities[pair] += posts
+        return {
+            'states': [
+                {'state': abbr, 'name': STATE_NAMES[abbr], 'posts': posts}
+                for abbr, posts in states.most_common()
+            ],
+            'cities': [
+                {'city': pair.city, 'state': pair.state_abbr, 'posts': posts}
+                for pair, posts in cities.most_common(self.config.FACET_CITY_LIMIT)
+            ],
+        }
+    
+    def _location_counts(self, status_filter: str) -> List[Tuple[str, int]]:
+        """Posts per location string from the counters ('' for posts without one)."""
+        query = db.session.query(PostCounter.location, func.sum(PostCounter.posts))
+        if status_filter != 'all':
+            query = query.filter(PostCounter.status == status_filter)
+        return [
+            (location, posts)
+            for location, posts in query.group_by(PostCounter.location).having(func.sum(PostCounter.posts) > 0)
+        ]
+    
+    def _location_filter_ids(self, state: Optional[str], city: Optional[str]) -> Optional[List[int]]:
+        """Ids of the locations a state/city facet selects, or None without a facet."""
+        if not state and not city:
+            return None
+        query = db.session.query(Location.id)
+        if state:
+            query = query.filter(Location.state_abbr == state.upper())
+        if city:
+            query = query.filter(Location.city == city)
+        return [location_id for location_id, in query]
+    
+    def _filter_location(self, query: Any, state: Optional[str], city: Optional[str]) -> Any:
+        """Restrict a post query to a state/city facet through the location index."""
+        location_ids = self._location_filter_ids(state, city)
+        if location_ids is None:
+            return query
+        return query.filter(OutreachStatus.location_id.in_(location_ids))
+    
+    def search_posts(
+        self,
+        text_query: str,
+        status_filter: str = 'all',
+        per_page: int = 20,
+        offset: int = 0,
+        state: Optional[str] = None,
+        city: Optional[str] = None
+    ) -> PostPage:
+        """
+        Search post titles and locations, best matches first.
+        
+        Uses the FTS5 index (ranked by BM25, titles weighted over locations)
+        joined back to outreach_status, so the status filter is applied in
+        the same query. Databases without the index fall back to a LIKE scan
+        ordered by recency. Ranking is limited to the newest
+        SEARCH_RANK_WINDOW matches, which are all that can be paged through,
+        and ``total`` stops at SEARCH_COUNT_LIMIT. Cursors are result offsets.
+        
+        Args:
+            text_query: Search box input (see ``build_search_query``)
+            status_filter: Filter by status ('all', 'Sent', 'Not Sent')
+            per_page: Posts per page
+            offset: Results to skip
+            state: Only posts in this state
+            city: Only posts in this city
+            
+        Returns:
+            PostPage with the matching posts and the total number of matches
+        """
+        offset = max(offset, 0)
+        match = build_search_query(text_query)
+        location_ids = self._location_filter_ids(state, city)
+        if not match or location_ids == []:
+            return PostPage([], 0, 1, per_page, None, None)
+        
+        if search_index_supported():
+            # CROSS JOIN keeps the index as the outer loop; otherwise SQLite may
+            # walk the status index and evaluate MATCH once per row
+            source = (
+                "FROM outreach_status_fts f CROSS JOIN outreach_status o ON o.id = f.rowid "
+                "WHERE outreach_status_fts MATCH :match"
+            )
+            if status_filter != 'all':
+                source += " AND o.status = :status"
+            if location_ids is not None:
+                # Ids come from the locations table, never from the request
+                source += f" AND o.location_id IN ({', '.join(map(str, location_ids))})"
+            if status_filter != 'all' or location_ids is not None:
+                counted = f"SELECT 1 {source}"
+            else:
+                counted = "SELECT 1 FROM outreach_status_fts WHERE outreach_status_fts MATCH :match"
+            params = {
+                'match': match,
+                'status': status_filter,
+                'window': self.config.SEARCH_RANK_WINDOW,
+                'count_limit': self.config.SEARCH_COUNT_LIMIT,
+            }
+            # Common words match a large share of the table; stop counting early
+            total = db.session.execute(
+                text(f"SELECT COUNT(*) FROM ({counted} LIMIT :count_limit)"), params
+            ).scalar()
+            
+            # BM25 has to score every candidate before it can sort, so only the
+            # newest SEARCH_RANK_WINDOW matches are ranked: bound the scan by
+            # the id of the oldest of them
+            floor = db.session.execute(text(
+                f"SELECT f.rowid {source} ORDER BY f.rowid DESC LIMIT 1 OFFSET :window - 1"
+            ), params).scalar() or 0
+            ids = db.session.execute(text(
+                f"SELECT o.id {source} AND f.rowid >= :floor ORDER BY f.rank LIMIT :limit OFFSET :offset"
+            ), {**params, 'floor': floor, 'limit': per_page, 'offset': offset}).scalars().all()
+            by_id = {post.id: post for post in OutreachStatus.query.filter(OutreachStatus.id.in_(ids))}
+            items = [by_id[post_id] for post_id in ids if post_id in by_id]
+            pageable = min(total, self.config.SEARCH_RANK_WINDOW)
+        else:
+            query = OutreachStatus.query
+            if status_filter != 'all':
+                query = query.filter_by(status=status_filter)
+            if location_ids is not None:
+                query = query.filter(OutreachStatus.location_id.in_(location_ids))
+            for token in _SEARCH_TOKEN_RE.findall(text_query):
+                # Tokens are matched literally; '_' (a word character) is not a wildcard
+                pattern = token.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+                query = query.filter(OutreachStatus.post_title.ilike(f'%{pattern}%', escape='\\'))
+            total = pageable = query.count()
+            items = query.order_by(
+                OutreachStatus.created_at.desc(), OutreachStatus.id.desc()
+            ).offset(offset).limit(per_page).all()
+        
+        return PostPage(
+            items=items,
+            total=total,
+            start=offset + 1,
+            per_page=per_page,
+            next_cursor=str(offset + per_page) if offset + per_page < pageable else None,
+            prev_cursor=str(max(offset - per_page, 0)) if offset else None,
+        )
+    
     def mark_as_sent(self, username: str) -> bool:
         """
         Mark a user as having been contacted.
@@ -98,13 +1009,13 @@ class OutreachService:
             True if successful, False otherwise
         """
         try:
-            user_status = OutreachStatus.query.filter_by(username=username).first()
-            if not user_status:
+            changed = self._change_statuses([username], 'Sent', datetime.utcnow())
+            if not changed and not self._existing_usernames([username]):
+                db.session.rollback()
                 return False
-            
-            user_status.status = 'Sent'
-            user_status.sent_at = datetime.utcnow()
             db.session.commit()
+            if changed:
+                self._publish(('status', serialize_post(changed[0])))
             return True
             
         except Exception as e:
@@ -122,36 +1033,81 @@ class OutreachService:
             True if successful, False otherwise
         """
         try:
-            user_status = OutreachStatus.query.filter_by(username=username).first()
-            if not user_status:
+            changed = self._change_statuses([username], 'Not Sent', None)
+            if not changed and not self._existing_usernames([username]):
+                db.session.rollback()
                 return False
-            
-            user_status.status = 'Not Sent'
-            user_status.sent_at = None
             db.session.commit()
+            if changed:
+                self._publish(('status', serialize_post(changed[0])))
             return True
             
         except Exception as e:
             db.session.rollback()
             raise Exception(f"Failed to mark as not sent: {str(e)}")
     
+    def set_status_many(self, usernames: List[str], status: str) -> Dict[str, List[str]]:
+        """
+        Set the outreach status of many users in one transaction.
+        
+        Rows are changed by ``_change_statuses`` (a conditional UPDATE per
+        IN_CLAUSE_CHUNK_SIZE usernames and old status), so the counters move
+        only for rows this call changed, however requests overlap. Everything
+        is committed once.
+        
+        Args:
+            usernames: Reddit usernames; duplicates are ignored
+            status: 'Sent' or 'Not Sent'
+            
+        Returns:
+            Dictionary with the 'updated' (found, whether or not they were
+            already in ``status``) and 'not_found' usernames
+        """
+        if status not in POST_STATUSES:
+            raise ValueError(f"Unknown status: {status}")
+        usernames = list(dict.fromkeys(usernames))
+        sent_at = datetime.utcnow() if status == 'Sent' else None
+        try:
+            changed = []
+            for offset in range(0, len(usernames), IN_CLAUSE_CHUNK_SIZE):
+                changed += self._change_statuses(usernames[offset:offset + IN_CLAUSE_CHUNK_SIZE], status, sent_at)
+            found = {row['username'] for row in changed}
+            unchanged = [username for username in usernames if username not in found]
+            for offset in range(0, len(unchanged), IN_CLAUSE_CHUNK_SIZE):
+                found |= self._existing_usernames(unchanged[offset:offset + IN_CLAUSE_CHUNK_SIZE])
+            db.session.commit()
+            
+            posts = [serialize_post(row) for row in changed]
+            if posts:
+                self._publish(('statuses', {'posts': posts}))
+            return {
+                'updated': [username for username in usernames if username in found],
+                'not_found': [username for username in usernames if username not in found],
+            }
+            
+        except Exception as e:
+            db.session.rollback()
+            raise Exception(f"Failed to update statuses: {str(e)}")
+    
     def get_statistics(self) -> Dict[str, Any]:
         """
         Get outreach statistics.
         
+        Reads the maintained post_counters table with a single aggregate, so
+        the cost depends on the number of distinct locations, not posts.
+        
         Returns:
             Dictionary with statistics
         """
-        total_posts = OutreachStatus.query.count()
-        sent_posts = OutreachStatus.query.filter_by(status='Sent').count()
-        not_sent_posts = OutreachStatus.query.filter_by(status='Not Sent').count()
-        
-        # Get unique locations (excluding Unknown)
-        locations = db.session.query(OutreachStatus.location).filter(
-            OutreachStatus.location != 'Unknown',
-            OutreachStatus.location.isnot(None)
-        ).distinct().all()
-        location_count = len(locations)
+        total_posts, sent_posts, not_sent_posts, location_count = db.session.query(
+            func.coalesce(func.sum(PostCounter.posts), 0),
+            func.coalesce(func.sum(case((PostCounter.status == 'Sent', PostCounter.posts), else_=0)), 0),
+            func.coalesce(func.sum(case((PostCounter.status == 'Not Sent', PostCounter.posts), else_=0)), 0),
+            # Unique locations (excluding Unknown)
+            func.count(distinct(case(
+                (and_(PostCounter.posts > 0, PostCounter.location.notin_(['Unknown', ''])), PostCounter.location)
+            )))
+        ).one()
         
         return {
             'total_posts': total_posts,
@@ -161,6 +1117,129 @@ class OutreachService:
             'sent_percentage': round((sent_posts / total_posts * 100) if total_posts > 0 else 0, 1)
         }
     
+    def reconcile_counters(self) -> Dict[str, Any]:
+        """
+        Rebuild post_counters from outreach_status with one grouped aggregate.
+        
+        Returns:
+            Statistics computed from the rebuilt counters
+        """
+        try:
+            # Clearing first takes the write lock before the table is read
+            db.session.execute(delete(PostCounter))
+            groups = db.session.query(
+                OutreachStatus.status, OutreachStatus.location, func.count(OutreachStatus.id)
+            ).group_by(OutreachStatus.status, OutreachStatus.location)
+            counts = Counter()
+            for status, location, posts in groups:
+                counts[counter_key(status, location)] += posts
+            if counts:
+                db.session.execute(insert(PostCounter), [
+                    {'status': status, 'location': location, 'posts': posts}
+                    for (status, location), posts in counts.items()
+                ])
+            db.session.commit()
+            self._publish()
+            return self.get_statistics()
+            
+        except Exception as e:
+            db.session.rollback()
+            raise Exception(f"Failed to reconcile counters: {str(e)}")
+    
+    def _publish(self, *events: Tuple[str, Any]) -> None:
+        """Broadcast committed changes and the resulting statistics to live dashboards."""
+        try:
+            hub = get_event_hub()
+            for name, data in events:
+                hub.publish(name, data)
+            hub.publish('stats', self.get_statistics())
+        except Exception as e:
+            print(f"Error publishing dashboard events: {e}")
+    
+    def _change_statuses(
+        self, usernames: List[str], status: str, sent_at: Optional[datetime]
+    ) -> List[Dict[str, Any]]:
+        """
+        Set the status of those users not already in it, without committing.
+        
+        The change is a conditional ``UPDATE ... WHERE status = <old>`` per
+        old status, with ``RETURNING``, and the counters move only for the
+        rows it returns. Two requests racing on one user cannot both see the
+        old status: the second UPDATE waits for the first's row (or database)
+        lock and then matches nothing. This must be the transaction's first
+        statement, as on SQLite an earlier read pins a snapshot the write
+        cannot upgrade from. Dialects without UPDATE ... RETURNING read the
+        rows with ``FOR UPDATE`` first.
+        
+        Args:
+            usernames: Reddit usernames, at most IN_CLAUSE_CHUNK_SIZE
+            status: 'Sent' or 'Not Sent'
+            sent_at: New sent_at of the changed rows
+            
+        Returns:
+            Changed rows as dictionaries, with their new status
+        """
+        table = OutreachStatus.__table__
+        returning = db.session.get_bind().dialect.update_returning
+        changed = []
+        deltas = Counter()
+        for old in [other for other in POST_STATUSES if other != status] + [None]:
+            where = and_(
+                table.c.username.in_(usernames),
+                table.c.status.is_(None) if old is None else table.c.status == old
+            )
+            if returning:
+                rows = db.session.execute(
+                    update(table).where(where).values(status=status, sent_at=sent_at).returning(*table.c)
+                ).mappings().all()
+            else:
+                rows = db.session.execute(select(*table.c).where(where).with_for_update()).mappings().all()
+                if rows:
+                    db.session.execute(
+                        update(table).where(table.c.id.in_([row['id'] for row in rows]))
+                        .values(status=status, sent_at=sent_at)
+                    )
+            for row in rows:
+                deltas[counter_key(old, row['location'])] -= 1
+                deltas[counter_key(status, row['location'])] += 1
+                changed.append({**row, 'status': status, 'sent_at': sent_at})
+        self._apply_counter_deltas(deltas)
+        return changed
+    
+    def _existing_usernames(self, usernames: List[str]) -> set:
+        """Those of at most IN_CLAUSE_CHUNK_SIZE usernames that have a row."""
+        return {
+            username for username, in
+            db.session.query(OutreachStatus.username).filter(OutreachStatus.username.in_(usernames))
+        }
+    
+    def _apply_counter_deltas(self, deltas: Dict[Tuple[str, str], int]) -> None:
+        """Add per-(status, location) deltas to post_counters without committing."""
+        rows = [
+            {'status': status, 'location': location, 'posts': delta}
+            for (status, location), delta in deltas.items() if delta
+        ]
+        if not rows:
+            return
+        dialect = db.session.get_bind().dialect.name
+        if dialect in UPSERT_DIALECTS:
+            stmt = UPSERT_DIALECTS[dialect](PostCounter.__table__)
+            stmt = stmt.on_conflict_do_update(
+                index_elements=['status', 'location'],
+                set_={'posts': PostCounter.__table__.c.posts + stmt.excluded.posts}
+            )
+            db.session.execute(stmt, rows)
+            return
+        
+        for row in rows:
+            updated = db.session.execute(
+                update(PostCounter)
+                .where(PostCounter.status == row['status'], PostCounter.location == row['location'])
+                .values(posts=PostCounter.posts + row['posts'])
+            ).rowcount
+            if not updated:
+                db.session.execute(insert(PostCounter), [row])
+    
     def get_active_message_template(self) -> Optional[str]:
         """
         Get the active message template.
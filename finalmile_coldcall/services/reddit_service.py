@@ -1,7 +1,12 @@
 """Reddit service for fetching and managing posts."""
 
-from typing import List, Tuple
-from scrape_reddit import get_recent_posts_with_user_and_location
+from typing import Any, Dict, List, Optional, Tuple
+from async_scraper import ListingTarget, PageCallback, merge_posts, scan_listings
+from fetch_scheduler import get_scheduler
+from location_cache import get_location_cache
+from phrase_matcher import weighted_phrases
+from response_cache import get_response_cache
+from scrape_reddit import HighWaterMark, ListingScan
 from config import Config
 
 
@@ -18,15 +23,86 @@ class RedditService:
         Returns:
             List of tuples: (title, location, username)
         """
+        return merge_posts(self.scan_recent_posts().values())
+    
+    def listing_targets(self) -> List[ListingTarget]:
+        """
+        Get the subreddit listings to scrape.
+        
+        Returns:
+            One ListingTarget per configured subreddit
+        """
+        return [
+            ListingTarget(
+                subreddit, weighted_phrases(phrases), self.config.SUBREDDIT_SORT, self.config.MATCH_MIN_SCORE
+            )
+            for subreddit, phrases in self.config.SUBREDDIT_TARGETS.items()
+        ]
+    
+    def scan_recent_posts(
+        self,
+        high_water_marks: Optional[Dict[Tuple[str, str], HighWaterMark]] = None,
+        backfill: bool = False,
+        on_page: Optional[PageCallback] = None,
+        defer_locations: bool = False
+    ) -> Dict[ListingTarget, ListingScan]:
+        """
+        Fetch posts newer than each listing's high-water mark, concurrently.
+        
+        Args:
+            high_water_marks: Newest post processed per (subreddit, sort)
+            backfill: Walk past the marks, up to BACKFILL_MAX_POSTS matches each
+            on_page: Awaited with each listing walk after every page, to stream matches
+            defer_locations: Leave locations unparsed (None) for the caller
+            
+        Returns:
+            ListingScan per listing with matching posts and the mark for the next run
+        """
         try:
-            return get_recent_posts_with_user_and_location(
-                subreddit_name=self.config.SUBREDDIT_NAME,
-                target_flair=self.config.TARGET_FLAIR,
-                max_posts=self.config.MAX_POSTS_TO_FETCH
+            return scan_listings(
+                self.listing_targets(),
+                max_posts=self.config.BACKFILL_MAX_POSTS if backfill else self.config.MAX_POSTS_TO_FETCH,
+                high_water_marks=high_water_marks,
+                backfill=backfill,
+                max_connections=self.config.HTTP_MAX_CONNECTIONS,
+                per_host_limit=self.config.HTTP_PER_HOST_LIMIT,
+                base_url=self.config.REDDIT_BASE_URL,
+                on_page=on_page,
+                defer_locations=defer_locations
             )
         except Exception as e:
             raise Exception(f"Failed to fetch posts from Reddit: {str(e)}")
     
+    def get_location_cache_stats(self) -> Dict[str, Any]:
+        """
+        Get hit/miss counters for the location parse cache.
+        
+        Returns:
+            Dictionary with cache statistics
+        """
+        return get_location_cache().stats()
+    
+    def get_fetch_scheduler_stats(self) -> Dict[str, Any]:
+        """
+        Get queue, wait-time and throttling counters for Reddit requests.
+        
+        Returns:
+            Dictionary with scheduler statistics
+        """
+        return get_scheduler().stats()
+    
+    def get_http_cache_stats(self) -> Dict[str, Any]:
+        """
+        Get hit/revalidation counters for the listing response cache.
+        
+        Returns:
+            Dictionary with cache statistics, or {'enabled': False}
+        """
+        cache = get_response_cache()
+        if cache is None:
+            return {'enabled': False}
+        return {'enabled': True, **cache.stats()}
+    
     def create_post_url(self, username: str) -> str:
         """
         Create Reddit user profile URL.
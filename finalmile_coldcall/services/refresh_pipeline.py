@@ -0,0 +1,265 @@
+"""Streaming refresh: fetch, filter, parse and write stages joined by bounded queues."""
+
+import asyncio
+import queue
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from async_scraper import ListingTarget
+from known_posts import KnownPosts
+from scrape_reddit import HighWaterMark, ListingScan, ListingWalk, parse_location_from_title
+from services.reddit_service import RedditService
+
+Post = Tuple[str, Optional[str], str]
+
+# Marks the end of a stage's output
+_DONE = object()
+
+
+class PipelineAborted(Exception):
+    """Raised inside a stage when another stage has failed."""
+
+
+class StageTimer:
+    """Where one stage spent its time."""
+    
+    def __init__(self):
+        self.items = 0
+        self.busy = 0.0
+        self.input_wait = 0.0
+        self.output_wait = 0.0
+    
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'items': self.items,
+            'busy_seconds': round(self.busy, 4),
+            'input_wait_seconds': round(self.input_wait, 4),
+            'output_wait_seconds': round(self.output_wait, 4),
+        }
+
+
+class RefreshPipeline:
+    """
+    Run one refresh as a stream instead of fetch-everything-then-write.
+    
+    * fetch: the async scraper walks every listing and hands each page's
+      matching posts (already filtered by phrase) to the next stage;
+    * parse: drops invalid usernames and posts whose title ``known_posts``
+      says is the one stored for their author, and parses locations;
+    * write: the calling thread, which owns the database session, upserts
+      posts in chunks of up to ``chunk_size``, waiting at most
+      ``write_interval`` seconds after the first post of a chunk for more
+      to arrive, so commits stay few without holding posts back for long.
+    
+    Stages are joined by queues of ``queue_size`` items. A full queue blocks
+    the stage feeding it, so a slow database holds back fetching instead of
+    letting results pile up: memory stays flat however large ``max_posts``
+    is, and writes for early pages overlap with fetching later ones.
+    """
+    
+    def __init__(
+        self,
+        reddit_service: RedditService,
+        write: Callable[[List[Post]], None],
+        queue_size: int = 8,
+        chunk_size: int = 500,
+        write_interval: float = 0.5,
+        known_posts: Optional[KnownPosts] = None
+    ):
+        """
+        Args:
+            reddit_service: Fetches the listings
+            write: Upserts and commits one chunk of (title, location, username)
+            queue_size: Items buffered between stages
+            chunk_size: Most posts handed to one ``write`` call
+            write_interval: Longest a post waits for its chunk to fill
+            known_posts: Title stored for each username; matching posts are skipped
+        """
+        self.reddit_service = reddit_service
+        self.write = write
+        self.queue_size = queue_size
+        self.chunk_size = chunk_size
+        self.write_interval = write_interval
+        self.known_posts = known_posts
+        self.skipped_known = 0
+        # Authors with a post on its way to the database this run; their titles
+        # in the filter may be about to change, so none of their posts is skipped
+        self._passed_users = set()
+        self.timers = {'fetch': StageTimer(), 'parse': StageTimer(), 'write': StageTimer()}
+        self.elapsed = 0.0
+        self._abort = threading.Event()
+        self._errors: List[BaseException] = []
+    
+    def run(
+        self,
+        high_water_marks: Optional[Dict[Tuple[str, str], HighWaterMark]] = None,
+        backfill: bool = False
+    ) -> Dict[ListingTarget, ListingScan]:
+        """
+        Fetch and write one refresh.
+        
+        Args:
+            high_water_marks: Newest post processed per (subreddit, sort)
+            backfill: Walk past the marks
+        
+        Returns:
+            ListingScan per listing (with empty ``posts``; they were streamed)
+        """
+        started = time.perf_counter()
+        pages: "queue.Queue" = queue.Queue(self.queue_size)
+        posts: "queue.Queue" = queue.Queue(self.queue_size)
+        scans: Dict[ListingTarget, ListingScan] = {}
+        threads = [
+            threading.Thread(
+                target=self._guard, args=(self._fetch, pages, high_water_marks, backfill, scans),
+                name='refresh-fetch', daemon=True
+            ),
+            threading.Thread(
+                target=self._guard, args=(self._parse, pages, posts), name='refresh-parse', daemon=True
+            ),
+        ]
+        for thread in threads:
+            thread.start()
+        try:
+            self._write(posts)
+        except BaseException as e:
+            self._fail(e)
+        finally:
+            for thread in threads:
+                thread.join()
+            self.elapsed = time.perf_counter() - started
+        if self._errors:
+            raise self._errors[0]
+        return scans
+    
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get per-stage timings.
+        
+        Returns:
+            Items, busy time and time blocked on input/output for each stage,
+            and the number of already-stored posts skipped
+        """
+        return {
+            'total_seconds': round(self.elapsed, 4),
+            'skipped_known_posts': self.skipped_known,
+            **{name: timer.to_dict() for name, timer in self.timers.items()},
+        }
+    
+    def _guard(self, stage: Callable, *args) -> None:
+        try:
+            stage(*args)
+        except PipelineAborted:
+            pass
+        except BaseException as e:
+            self._fail(e)
+    
+    def _fail(self, error: BaseException) -> None:
+        if not isinstance(error, PipelineAborted):
+            self._errors.append(error)
+        self._abort.set()
+    
+    def _put(self, target: "queue.Queue", item: Any, timer: StageTimer) -> None:
+        """Block until ``item`` fits in ``target``, giving up if the pipeline aborts."""
+        started = time.perf_counter()
+        try:
+            while True:
+                if self._abort.is_set():
+                    raise PipelineAborted()
+                try:
+                    target.put(item, timeout=0.1)
+                    return
+                except queue.Full:
+                    continue
+        finally:
+            timer.output_wait += time.perf_counter() - started
+    
+    def _get(self, source: "queue.Queue", timer: StageTimer, deadline: Optional[float] = None) -> Any:
+        """
+        Block until ``source`` has an item, giving up if the pipeline aborts.
+        
+        Returns None if ``deadline`` (a ``time.perf_counter`` value) passes first.
+        """
+        started = time.perf_counter()
+        try:
+            while True:
+                if self._abort.is_set():
+                    raise PipelineAborted()
+                timeout = 0.1
+                if deadline is not None:
+                    timeout = min(timeout, deadline - time.perf_counter())
+                    if timeout <= 0:
+                        return None
+                try:
+                    return source.get(timeout=timeout)
+                except queue.Empty:
+                    continue
+        finally:
+            timer.input_wait += time.perf_counter() - started
+    
+    def _fetch(
+        self, pages: "queue.Queue", high_water_marks: Optional[Dict[Tuple[str, str], HighWaterMark]],
+        backfill: bool, scans: Dict[ListingTarget, ListingScan]
+    ) -> None:
+        timer = self.timers['fetch']
+        started = time.perf_counter()
+        
+        async def on_page(walk: ListingWalk) -> None:
+            timer.items += 1
+            matches = walk.take_matches()
+            if matches:
+                await asyncio.to_thread(self._put, pages, matches, timer)
+        
+        try:
+            scans.update(self.reddit_service.scan_recent_posts(
+                high_water_marks=high_water_marks,
+                backfill=backfill,
+                on_page=on_page,
+                defer_locations=True
+            ))
+        finally:
+            timer.busy = time.perf_counter() - started - timer.output_wait
+            self._put(pages, _DONE, timer)
+    
+    def _parse(self, pages: "queue.Queue", posts: "queue.Queue") -> None:
+        timer = self.timers['parse']
+        while True:
+            matches = self._get(pages, timer)
+            if matches is _DONE:
+                self._put(posts, _DONE, timer)
+                return
+            started = time.perf_counter()
+            parsed = []
+            for title, _, username in matches:
+                if (self.known_posts is not None and username not in self._passed_users
+                        and self.known_posts.contains(username, title)):
+                    self.skipped_known += 1
+                elif self.reddit_service.is_valid_username(username):
+                    self._passed_users.add(username)
+                    parsed.append((title, parse_location_from_title(title), username))
+            timer.items += len(matches)
+            timer.busy += time.perf_counter() - started
+            if parsed:
+                self._put(posts, parsed, timer)
+    
+    def _write(self, posts: "queue.Queue") -> None:
+        timer = self.timers['write']
+        done = False
+        while not done:
+            chunk = self._get(posts, timer)
+            if chunk is _DONE:
+                break
+            # Let the chunk fill for up to write_interval before committing it
+            deadline = time.perf_counter() + self.write_interval
+            while len(chunk) < self.chunk_size:
+                more = self._get(posts, timer, deadline)
+                if more is None:
+                    break
+                if more is _DONE:
+                    done = True
+                    break
+                chunk = chunk + more
+            started = time.perf_counter()
+            self.write(chunk)
+            timer.items += len(chunk)
+            timer.busy += time.perf_counter() - started
@@ -0,0 +1,178 @@
+"""Write-behind buffer for auto-mark-sent clicks."""
+
+import threading
+import time
+from typing import Any, Dict, Iterable, Optional
+from flask import Flask
+from services.outreach_service import OutreachService
+
+
+class StatusWriteBuffer:
+    """
+    Coalesce profile-link clicks and write them in batched transactions.
+    
+    ``add`` only records the username in memory, so the HTTP request returns
+    without touching the database. A daemon thread flushes the pending set
+    with ``OutreachService.set_status_many`` every ``flush_interval`` seconds,
+    or as soon as ``max_batch`` usernames are waiting. Repeated clicks on the
+    same user collapse into one write. An undo must call ``discard`` before
+    writing 'Not Sent', so a queued click cannot land after it. ``stop``
+    drains whatever is pending, so a clean shutdown loses nothing and a crash
+    loses at most the clicks of the current flush window.
+    """
+    
+    def __init__(
+        self, app: Flask, outreach_service: OutreachService,
+        flush_interval: float = 0.25, max_batch: int = 50
+    ):
+        self.app = app
+        self.outreach_service = outreach_service
+        self.flush_interval = flush_interval
+        self.max_batch = max_batch
+        self._pending: Dict[str, None] = {}
+        self._in_flight = 0
+        self._condition = threading.Condition()
+        self._flush_lock = threading.Lock()
+        self._stopping = False
+        self._thread: Optional[threading.Thread] = None
+        self.received = 0
+        self.coalesced = 0
+        self.flushed = 0
+        self.not_found = 0
+        self.discarded = 0
+        self.flushes = 0
+        self.errors = 0
+        self.last_flush_ms = 0.0
+        self.last_error: Optional[str] = None
+    
+    def add(self, username: str) -> None:
+        """
+        Queue a user to be marked as sent.
+        
+        Args:
+            username: Reddit username
+        """
+        with self._condition:
+            self.received += 1
+            if username in self._pending:
+                self.coalesced += 1
+                return
+            self._pending[username] = None
+            self._start()
+            # The first click opens a flush window; a full batch closes it early
+            if len(self._pending) in (1, self.max_batch):
+                self._condition.notify()
+    
+    def discard(self, usernames: Iterable[str]) -> int:
+        """
+        Drop queued clicks for users about to be marked as not sent.
+        
+        Waits for a flush in flight to finish (or put its batch back after a
+        failure) first, so no click taken before the call is written after it.
+        
+        Args:
+            usernames: Reddit usernames
+            
+        Returns:
+            Number of queued clicks dropped
+        """
+        with self._flush_lock:
+            with self._condition:
+                dropped = 0
+                for username in usernames:
+                    if username in self._pending:
+                        del self._pending[username]
+                        dropped += 1
+                self.discarded += dropped
+                return dropped
+    
+    def flush(self) -> int:
+        """
+        Write every pending username now.
+        
+        A failed batch is put back in front of the queue and retried on the
+        next flush.
+        
+        Returns:
+            Number of usernames written
+        """
+        with self._flush_lock:
+            with self._condition:
+                batch = list(self._pending)
+                self._pending.clear()
+                self._in_flight = len(batch)
+            if not batch:
+                return 0
+            started = time.perf_counter()
+            try:
+                with self.app.app_context():
+                    result = self.outreach_service.set_status_many(batch, 'Sent')
+            except Exception as e:
+                with self._condition:
+                    self._pending = {**dict.fromkeys(batch), **self._pending}
+                    self._in_flight = 0
+                    self.errors += 1
+                    self.last_error = str(e)
+                print(f"Auto-mark flush error: {e}")
+                return 0
+            with self._condition:
+                self._in_flight = 0
+                self.flushes += 1
+                self.flushed += len(result['updated'])
+                self.not_found += len(result['not_found'])
+                self.last_flush_ms = round((time.perf_counter() - started) * 1000, 2)
+            return len(result['updated'])
+    
+    def stop(self, timeout: Optional[float] = None) -> None:
+        """Stop the flusher after draining every pending username."""
+        with self._condition:
+            self._stopping = True
+            self._condition.notify()
+            thread = self._thread
+        if thread is not None:
+            thread.join(timeout)
+        # Covers clicks that raced the flusher's last pass
+        self.flush()
+    
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get buffer counters.
+        
+        Returns:
+            Dictionary with pending, in-flight and flushed click counts
+        """
+        with self._condition:
+            return {
+                'pending': len(self._pending),
+                'in_flight': self._in_flight,
+                'received': self.received,
+                'coalesced': self.coalesced,
+                'flushed': self.flushed,
+                'not_found': self.not_found,
+                'discarded': self.discarded,
+                'flushes': self.flushes,
+                'errors': self.errors,
+                'last_error': self.last_error,
+                'last_flush_ms': self.last_flush_ms,
+                'flush_interval_ms': round(self.flush_interval * 1000),
+                'max_batch': self.max_batch,
+            }
+    
+    def _start(self) -> None:
+        """Start the flusher thread if needed; the caller holds the condition."""
+        if self._stopping or (self._thread is not None and self._thread.is_alive()):
+            return
+        self._thread = threading.Thread(target=self._run, name='status-write-buffer', daemon=True)
+        self._thread.start()
+    
+    def _run(self) -> None:
+        while True:
+            with self._condition:
+                while not self._pending and not self._stopping:
+                    self._condition.wait()
+                if not self._stopping and len(self._pending) < self.max_batch:
+                    self._condition.wait(self.flush_interval)
+                stopping = self._stopping
+            self.flush()
+            if stopping:
+                return
@@ -0,0 +1,129 @@
+"""SQLite storage profiles: per-connection pragmas and pool sizing.
+
+The ``default`` profile leaves SQLite as the driver opens it (rollback
+journal, ``synchronous=FULL``), so every dashboard read waits for the commit
+in progress. The ``production`` profile switches the database to WAL, where
+readers keep working off the last committed snapshot while one writer
+appends, relaxes fsyncs to ``synchronous=NORMAL`` (still safe in WAL; a power
+cut can only drop the last commits), waits on the write lock instead of
+failing with "database is locked", and gives every pooled connection a
+larger page cache and a memory-mapped read path.
+
+Run ``python -m benchmarks.load_sqlite_profile`` to compare the two.
+"""
+
+from typing import Any, Dict
+
+from flask import Flask
+from sqlalchemy import event
+from sqlalchemy.engine import Engine, make_url
+
+from models import db
+
+PROFILES: Dict[str, Dict[str, Any]] = {
+    'default': {},
+    'production': {
+        'journal_mode': 'WAL',
+        'synchronous': 'NORMAL',
+        'busy_timeout': 5000,  # milliseconds
+        'mmap_size': 256 * 1024 * 1024,
+        'cache_size': -64 * 1024,  # negative means KiB: 64 MiB per connection
+        'temp_store': 'MEMORY',
+    },
+}
+
+
+def get_profile(name: str) -> Dict[str, Any]:
+    """
+    Look up a storage profile's pragmas.
+
+    Raises:
+        ValueError: If the profile is unknown
+    """
+    try:
+        return PROFILES[name]
+    except KeyError:
+        raise ValueError(f"Unknown SQLite profile '{name}'; choose from {', '.join(PROFILES)}")
+
+
+def is_sqlite_file(uri: str) -> bool:
+    """Return True for a file-backed SQLite URI (pragmas and pooling do not apply to :memory:)."""
+    url = make_url(uri)
+    return url.get_backend_name() == 'sqlite' and url.database not in (None, '', ':memory:')
+
+
+def engine_options(config: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    SQLAlchemy engine options for the configured profile.
+
+    Args:
+        config: Flask app config
+
+    Returns:
+        Options to merge into ``SQLALCHEMY_ENGINE_OPTIONS`` (empty for the
+        default profile or non-file databases)
+    """
+    pragmas = get_profile(config.get('SQLITE_PROFILE', 'default'))
+    if not pragmas or not is_sqlite_file(config['SQLALCHEMY_DATABASE_URI']):
+        return {}
+    return {
+        'pool_size': config.get('SQLITE_POOL_SIZE', 10),
+        'max_overflow': config.get('SQLITE_POOL_OVERFLOW', 10),
+        'pool_timeout': 30,
+        'connect_args': {
+            # Pooled connections move between request and worker threads
+            'check_same_thread': False,
+            # Driver-level lock wait, in seconds, matching busy_timeout
+            'timeout': pragmas.get('busy_timeout', 5000) / 1000,
+        },
+    }
+
+
+def install_pragmas(engine: Engine, profile: str) -> None:
+    """
+    Set the profile's pragmas on every new DBAPI connection of ``engine``.
+
+    Args:
+        engine: Engine to hook
+        profile: Profile name
+    """
+    pragmas = get_profile(profile)
+    if not pragmas or engine.dialect.name != 'sqlite':
+        return
+
+    @event.listens_for(engine, 'connect')
+    def set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for name, value in pragmas.items():
+                cursor.execute(f"PRAGMA {name}={value}")
+        finally:
+            cursor.close()
+
+
+def init_storage(app: Flask) -> None:
+    """
+    Initialize Flask-SQLAlchemy for ``app`` with its configured SQLite profile.
+
+    Use instead of ``db.init_app(app)``.
+    """
+    options = engine_options(app.config)
+    if options:
+        app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {**app.config.get('SQLALCHEMY_ENGINE_OPTIONS', {}), **options}
+    db.init_app(app)
+    with app.app_context():
+        install_pragmas(db.engine, app.config.get('SQLITE_PROFILE', 'default'))
+
+
+def pragma_values(connection) -> Dict[str, Any]:
+    """
+    Read the effective pragmas on an open connection.
+
+    Args:
+        connection: SQLAlchemy connection
+
+    Returns:
+        Dictionary of pragma name to current value
+    """
+    names = PROFILES['production'].keys()
+    return {name: connection.exec_driver_sql(f"PRAGMA {name}").scalar() for name in names}
@@ -0,0 +1,34 @@
+"""Shared fixtures; the app uses flat imports, so its directory goes on the path."""
+
+import os
+import sys
+import tempfile
+
+_DATA_DIR = tempfile.mkdtemp(prefix='finalmile_tests_')
+os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(_DATA_DIR, 'test.db')}"
+for name in ('HTTP_CACHE_PATH', 'LOCATION_CACHE_PATH', 'LISTING_ARCHIVE_PATH', 'GAZETTEER_PATH'):
+    os.environ[name] = ''
+# Flushes only happen when a test asks for one
+os.environ['AUTO_MARK_FLUSH_MS'] = '600000'
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest  # noqa: E402
+
+from app import create_app  # noqa: E402
+from models import db, create_missing_columns, create_missing_indexes, create_search_index  # noqa: E402
+
+
+@pytest.fixture
+def app():
+    app = create_app('development')
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        create_missing_columns()
+        create_missing_indexes()
+        create_search_index()
+    yield app
+    app.extensions['status_buffer'].stop()
+    with app.app_context():
+        db.session.remove()
+        db.engine.dispose()
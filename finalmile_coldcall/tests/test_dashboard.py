@@ -0,0 +1,31 @@
+"""The dashboard template renders under both the app factory and the legacy dashboard app."""
+
+import pytest
+
+from models import db
+
+
+@pytest.fixture
+def legacy_app(app):
+    # Shares the test database the ``app`` fixture has just created
+    import dashboard
+    return dashboard.app
+
+
+def seed(flask_app):
+    service = flask_app.extensions['status_buffer'].outreach_service
+    with flask_app.app_context():
+        service.upsert_posts([
+            ("Got the keys in Austin, TX!", "Austin, TX", "alice"),
+            ("Closed in Reno, NV today", "Reno, NV", "bob"),
+        ])
+        db.session.commit()
+
+
+@pytest.mark.parametrize('query', ['', '?state=TX', '?state=TX&city=Austin', '?q=keys', '?status=Sent'])
+def test_dashboard_renders(app, legacy_app, query):
+    seed(app)
+    for flask_app in (app, legacy_app):
+        response = flask_app.test_client().get('/' + query)
+        assert response.status_code == 200, (flask_app.name, query)
+        assert b'alice' in response.data or query == '?status=Sent'
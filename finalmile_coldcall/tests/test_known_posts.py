@@ -0,0 +1,65 @@
+"""The known-posts filter skips a post only when the upsert would be a no-op."""
+
+import known_posts
+from known_posts import KnownPosts
+
+
+def test_title_change_replaces_the_stored_title():
+    known = KnownPosts()
+    known.warm(iter([('alice', 'T1'), ('bob', 'B1')]))
+    assert known.contains('alice', 'T1')
+
+    known.add_many([('alice', 'T2')])
+
+    assert known.contains('alice', 'T2')
+    # The upsert would write T1 back, so it must not be skipped
+    assert not known.contains('alice', 'T1')
+    assert known.contains('bob', 'B1')
+
+
+def test_pending_and_merged_entries_agree(monkeypatch):
+    monkeypatch.setattr(known_posts, '_MERGE_MIN', 4)
+    known = KnownPosts()
+    known.add_many([(f'user{index}', 'first') for index in range(10)])
+    known.add_many([('user3', 'second'), ('user11', 'first')])
+
+    assert len(known) == 11
+    assert known.contains('user3', 'second') and not known.contains('user3', 'first')
+    assert all(known.contains(f'user{index}', 'first') for index in (0, 9, 11))
+
+
+def test_full_filter_still_tracks_title_changes():
+    known = KnownPosts(max_entries=1)
+    assert known.warm(iter([('alice', 'T1'), ('bob', 'B1')])) == 1
+
+    known.add_many([('alice', 'T2'), ('carol', 'C1')])
+
+    assert known.contains('alice', 'T2') and not known.contains('alice', 'T1')
+    assert not known.contains('bob', 'B1') and not known.contains('carol', 'C1')
+
+
+class _ValidUsernames:
+    def is_valid_username(self, username):
+        return True
+
+
+def test_refresh_does_not_skip_an_author_whose_title_is_changing():
+    import queue
+    from services.refresh_pipeline import RefreshPipeline, _DONE
+
+    known = KnownPosts()
+    known.warm(iter([('alice', 'T1'), ('bob', 'B1')]))
+    pipeline = RefreshPipeline(_ValidUsernames(), write=None, known_posts=known)
+    pages, posts = queue.Queue(), queue.Queue()
+    # T2 is not committed yet when T1 comes round again; the upsert would write T1 back
+    pages.put([('T2', None, 'alice'), ('B1', None, 'bob')])
+    pages.put([('T1', None, 'alice')])
+    pages.put(_DONE)
+
+    pipeline._parse(pages, posts)
+
+    written = []
+    while (chunk := posts.get()) is not _DONE:
+        written += [(username, title) for title, _, username in chunk]
+    assert written == [('alice', 'T2'), ('alice', 'T1')]
+    assert pipeline.stats()['skipped_known_posts'] == 1
@@ -0,0 +1,38 @@
+"""The listing archive reads pages back in fetch order."""
+
+import json
+
+from listing_archive import ListingArchive
+
+DAY = 1792195200.0  # a UTC midnight
+
+
+def page(name):
+    return json.dumps({"data": {"children": [], "after": None, "name": name}}).encode()
+
+
+def test_pages_merge_listings_and_segments_by_fetch_time(tmp_path):
+    first, second = ListingArchive(str(tmp_path)), ListingArchive(str(tmp_path))
+    second.segment = first.segment + "-b"
+    first.append("ZSub", "new", None, page("z1"), fetched_at=DAY + 10)
+    first.append("ASub", "new", None, page("a1"), fetched_at=DAY + 20)
+    second.append("ZSub", "new", None, page("z2"), fetched_at=DAY + 15)
+    first.append("ZSub", "new", None, page("z3"), fetched_at=DAY + 30)
+    second.append("ASub", "new", None, page("a2"), fetched_at=DAY + 86400 + 5)
+    first.append("ZSub", "new", None, page("z4"), fetched_at=DAY + 86400 + 1)
+
+    names = [archived.page["data"]["name"] for archived in first.pages()]
+
+    assert names == ["z1", "z2", "a1", "z3", "z4", "a2"]
+    assert [archived.page["data"]["name"] for archived in first.pages(subreddits=["asub"])] == ["a1", "a2"]
+
+
+def test_torn_tail_keeps_earlier_records(tmp_path):
+    archive = ListingArchive(str(tmp_path))
+    archive.append("Sub", "new", None, page("p1"), fetched_at=DAY + 1)
+    archive.append("Sub", "new", None, page("p2"), fetched_at=DAY + 2)
+    path = archive.partitions()[0]
+    # Cut into the last record, as a crash mid-write would
+    path.write_bytes(path.read_bytes()[:-30])
+
+    assert [archived.page["data"]["name"] for archived in archive.pages()] == ["p1"]
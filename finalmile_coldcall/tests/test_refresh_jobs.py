@@ -0,0 +1,68 @@
+"""Refresh jobs left running by a dead process are failed, not shared."""
+
+import time
+from datetime import datetime, timedelta
+
+import pytest
+
+from models import db, RefreshJob
+from services.job_service import DatabaseLock
+
+
+@pytest.fixture
+def job_service(app):
+    with app.app_context():
+        yield app.extensions['refresh_worker'].job_service
+
+
+def running_job(started_seconds_ago):
+    job = RefreshJob(
+        status='running', backfill=False, progress='fetching posts',
+        started_at=datetime.utcnow() - timedelta(seconds=started_seconds_ago)
+    )
+    db.session.add(job)
+    db.session.commit()
+    return job.id
+
+
+def test_dead_running_job_is_failed_and_replaced(job_service):
+    dead_id = running_job(300)
+
+    job, created = job_service.enqueue_refresh()
+
+    assert created and job.id != dead_id
+    dead = db.session.get(RefreshJob, dead_id)
+    assert dead.status == 'failed' and dead.error == 'The refresh stopped without finishing'
+
+
+def test_running_job_holding_its_lease_is_shared(job_service):
+    live_id = running_job(300)
+    lease = job_service._job_lease(live_id)
+    with lease.hold():
+        job, created = job_service.enqueue_refresh()
+    assert not created and job.id == live_id
+
+
+def test_just_claimed_job_is_shared_before_taking_its_lease(job_service):
+    live_id = running_job(1)
+    job, created = job_service.enqueue_refresh()
+    assert not created and job.id == live_id
+
+
+def test_fail_stale_jobs(job_service):
+    dead_id, live_id, timed_out_id = running_job(300), running_job(300), running_job(3600)
+    with job_service._job_lease(live_id).hold(), job_service._job_lease(timed_out_id).hold():
+        assert job_service.fail_stale_jobs() == 2
+    statuses = {job_id: db.session.get(RefreshJob, job_id) for job_id in (dead_id, live_id, timed_out_id)}
+    assert statuses[live_id].status == 'running'
+    assert statuses[dead_id].error == 'The refresh stopped without finishing'
+    assert statuses[timed_out_id].error == 'Timed out'
+
+
+def test_kept_alive_lease_outlives_its_ttl(job_service):
+    lock = DatabaseLock('test-lease', ttl=0.3)
+    with lock.hold(keep_alive=10):
+        time.sleep(0.8)
+        assert lock.is_held()
+        assert not DatabaseLock('test-lease').try_acquire()
+    assert not lock.is_held()
@@ -0,0 +1,40 @@
+"""Search limits and the LIKE fallback used without the FTS5 index."""
+
+import pytest
+
+from models import db
+from services import outreach_service as outreach_module
+
+
+@pytest.fixture
+def seeded(app):
+    service = app.extensions['status_buffer'].outreach_service
+    with app.app_context():
+        service.upsert_posts([
+            ("Closed on a_b street condo", "Austin, TX", "alice"),
+            ("Closed on axb street condo", "Austin, TX", "bob"),
+            ("Closed on a%b street condo", "Austin, TX", "carol"),
+        ])
+        db.session.commit()
+    return app
+
+
+@pytest.mark.parametrize('index', [True, False])
+def test_underscore_matches_literally(seeded, monkeypatch, index):
+    monkeypatch.setattr(outreach_module, 'search_index_supported', lambda: index)
+    service = seeded.extensions['status_buffer'].outreach_service
+    with seeded.app_context():
+        usernames = [post.username for post in service.search_posts('a_b').items]
+        # The index splits "a_b" into the phrase "a b", which "a%b" also holds
+        assert 'alice' in usernames and 'bob' not in usernames
+
+
+def test_search_limit_has_its_own_setting(seeded):
+    client = seeded.test_client()
+    seeded.config['SEARCH_MAX_LIMIT'] = 50
+    seeded.config['MAX_BATCH_SIZE'] = 5
+
+    assert client.get('/search?q=condo&limit=50').status_code == 200
+    response = client.get('/search?q=condo&limit=51')
+    assert response.status_code == 400
+    assert response.get_json()['error'] == 'limit must be between 1 and 50'
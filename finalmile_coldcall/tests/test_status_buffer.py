@@ -0,0 +1,64 @@
+"""Ordering of buffered auto-mark clicks against undos."""
+
+from models import db, OutreachStatus
+
+
+def seed(app, *usernames):
+    service = app.extensions['status_buffer'].outreach_service
+    with app.app_context():
+        service.upsert_posts([(f"Got the keys #{name}", "Austin, TX", name) for name in usernames])
+        db.session.commit()
+
+
+def status_of(app, username):
+    with app.app_context():
+        return OutreachStatus.query.filter_by(username=username).one().status
+
+
+def test_click_undo_flush_keeps_undo(app):
+    seed(app, 'alice')
+    client = app.test_client()
+    buffer = app.extensions['status_buffer']
+
+    assert client.get('/auto_mark_sent/alice').status_code == 202
+    assert client.get('/mark_not_sent/alice', headers={'Accept': 'application/json'}).get_json()['success']
+    buffer.flush()
+
+    assert status_of(app, 'alice') == 'Not Sent'
+    assert buffer.stats()['discarded'] == 1
+
+
+def test_batch_undo_drops_queued_clicks(app):
+    seed(app, 'alice', 'bob', 'carol')
+    client = app.test_client()
+    buffer = app.extensions['status_buffer']
+
+    for name in ('alice', 'bob', 'carol'):
+        client.get(f'/auto_mark_sent/{name}')
+    response = client.post('/mark_not_sent_batch', json={'usernames': ['alice', 'bob']})
+    assert response.get_json()['success']
+    buffer.flush()
+
+    assert [status_of(app, name) for name in ('alice', 'bob', 'carol')] == ['Not Sent', 'Not Sent', 'Sent']
+
+
+def test_failed_flush_retry_does_not_overwrite_undo(app, monkeypatch):
+    seed(app, 'alice')
+    client = app.test_client()
+    buffer = app.extensions['status_buffer']
+    service = buffer.outreach_service
+    set_status_many = service.set_status_many
+
+    def failing(usernames, status):
+        raise RuntimeError('database is locked')
+
+    client.get('/auto_mark_sent/alice')
+    monkeypatch.setattr(service, 'set_status_many', failing)
+    assert buffer.flush() == 0
+    assert buffer.stats()['pending'] == 1
+    monkeypatch.setattr(service, 'set_status_many', set_status_many)
+
+    client.get('/mark_not_sent/alice', headers={'Accept': 'application/json'})
+    buffer.flush()
+
+    assert status_of(app, 'alice') == 'Not Sent'
@@ -0,0 +1,76 @@
+"""post_counters stays equal to a recount when status changes race."""
+
+import threading
+from collections import Counter
+
+from models import db, OutreachStatus, PostCounter
+from services.outreach_service import counter_key
+
+USERNAMES = [f'user{index}' for index in range(10)]
+
+
+def seed(app):
+    service = app.extensions['status_buffer'].outreach_service
+    with app.app_context():
+        service.upsert_posts([
+            (f"Got the keys #{index}", ('Austin, TX', 'Reno, NV')[index % 2], username)
+            for index, username in enumerate(USERNAMES)
+        ])
+        db.session.commit()
+        service.reconcile_counters()
+    return service
+
+
+def assert_counters_match(app):
+    with app.app_context():
+        counted = Counter(
+            counter_key(status, location)
+            for status, location in db.session.query(OutreachStatus.status, OutreachStatus.location)
+        )
+        stored = Counter({
+            (row.status, row.location): row.posts for row in PostCounter.query if row.posts
+        })
+        assert stored == counted
+
+
+def test_repeated_changes_move_the_counter_once(app):
+    service = seed(app)
+    with app.app_context():
+        assert service.mark_as_sent('user0') and service.mark_as_sent('user0')
+        assert not service.mark_as_not_sent('nobody')
+        assert service.set_status_many(['user0', 'user1', 'nobody'], 'Sent') == {
+            'updated': ['user0', 'user1'], 'not_found': ['nobody'],
+        }
+        assert service.get_statistics()['sent_posts'] == 2
+    assert_counters_match(app)
+
+
+def test_racing_changes_keep_counters_exact(app):
+    service = seed(app)
+    errors = []
+    barrier = threading.Barrier(8)
+
+    def toggle(worker):
+        with app.app_context():
+            barrier.wait()
+            for round_ in range(15):
+                status = ('Sent', 'Not Sent')[(worker + round_) % 2]
+                try:
+                    if worker % 2:
+                        service.set_status_many(USERNAMES, status)
+                    elif status == 'Sent':
+                        service.mark_as_sent(USERNAMES[round_ % len(USERNAMES)])
+                    else:
+                        service.mark_as_not_sent(USERNAMES[round_ % len(USERNAMES)])
+                except Exception as e:
+                    errors.append(str(e))
+            db.session.remove()
+
+    threads = [threading.Thread(target=toggle, args=(worker,)) for worker in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    assert_counters_match(app)